@@ -1,5 +1,4 @@
 import streamlit as st
-import akshare as ak
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
@@ -8,9 +7,14 @@ import os
 import httpx
 from dotenv import load_dotenv
 from technical_analysis import calculate_all_indicators
-from deepseek_client import DeepSeekClient
-import numpy as np
-from datetime import date, time
+from deepseek_client import DeepSeekClient, completion_text
+from data_access import fetch_symbol_universe
+from cache import cache_stats
+from config import CACHE_SYMBOLS_TTL, STREAMLIT_QUOTE_TTL, STREAMLIT_HISTORY_TTL, STREAMLIT_NEWS_TTL, CHART_MAX_POINTS
+from prompt_builder import build_analysis_messages
+from chart_utils import candlestick_trace, line_trace, bar_trace
+import futures_service
+from datetime import date
 
 # 加载环境变量
 load_dotenv()
@@ -22,115 +26,79 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 初始化DeepSeek客户端
-deepseek_client = DeepSeekClient()
+# 初始化DeepSeek客户端，脚本每次重新运行时复用同一个实例及其连接池
+@st.cache_resource
+def get_deepseek_client():
+    return DeepSeekClient()
+
+deepseek_client = get_deepseek_client()
+
+# 以下数据函数带有缓存：脚本每次重新运行（切换标签页、调整控件）时直接复用结果，
+# 过期后才重新访问上游；抛出的异常不会被缓存
+@st.cache_data(ttl=CACHE_SYMBOLS_TTL, show_spinner=False)
+def load_symbol_list():
+    # 获取所有期货品种的标记
+    futures_list = fetch_symbol_universe()
+    if 'symbol' not in futures_list.columns:
+        raise ValueError("返回数据格式不正确")
+    return futures_list['symbol'].tolist()
+
+@st.cache_data(ttl=STREAMLIT_QUOTE_TTL, show_spinner=False)
+def load_quote(symbol):
+    # 使用内盘期货实时行情接口
+    return futures_service.get_quotes(symbol).iloc[0].to_dict()
+
+@st.cache_data(ttl=STREAMLIT_HISTORY_TTL, show_spinner=False)
+def load_market_data(symbol, start_date, end_date):
+    # 日线只获取一次（向前多取指标的预热期），技术指标只计算一次，裁剪后各标签页共用
+    history = futures_service.get_history(symbol, futures_service.warmup_start_date(start_date), end_date)
+    df_tech = calculate_all_indicators(history)
+    return futures_service.select_rows(history, start_date), futures_service.select_rows(df_tech, start_date)
+
+@st.cache_data(ttl=STREAMLIT_NEWS_TTL, show_spinner=False)
+def load_news(symbol):
+    return futures_service.get_news(symbol)
 
 # 获取期货实时价格
 def get_current_price(symbol):
     try:
-        # 使用内盘期货实时行情接口
-        df = ak.futures_zh_realtime(symbol=symbol)
-        if df.empty:
-            return {"error": f"未找到期货代码 {symbol}"}
-        return df.iloc[0].to_dict()
+        return load_quote(symbol)
     except Exception as e:
         return {"error": str(e)}
 
-# 获取期货历史价格
-def get_prices(symbol, start_date=None, end_date=None):
+# 获取期货历史价格及技术分析指标
+def get_market_data(symbol, start_date, end_date):
     try:
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).strftime("%Y%m%d")
-        if not end_date:
-            end_date = datetime.now().strftime("%Y%m%d")
-            
-        # 获取历史数据
-        # 首先获取主力合约代码
-        symbol_info = ak.futures_zh_realtime(symbol=symbol)
-        if symbol_info.empty:
-            return {"error": f"未找到期货代码 {symbol}"}
-        
-        main_contract = symbol_info.iloc[0]['symbol']
-        # 使用期货历史行情接口
-        df = ak.futures_main_sina(symbol=main_contract, start_date=start_date, end_date=end_date)
-        
-        # 确保列名统一
-        if 'date' not in df.columns and '日期' in df.columns:
-            df = df.rename(columns={
-                '日期': 'date',
-                '开盘价': 'open',
-                '最高价': 'high',
-                '最低价': 'low',
-                '收盘价': 'close',
-                '成交量': 'volume'
-            })
-        return df
+        return load_market_data(symbol, start_date, end_date)
     except Exception as e:
         return {"error": str(e)}
 
 # 获取期货相关新闻
 def get_news(symbol):
     try:
-        df = ak.futures_news_shmet(symbol="全部")
-        # 使用模糊匹配查找相关新闻
-        result = df[df['内容'].str.contains(symbol, case=False, na=False)]
-        # 取最新的10条新闻
-        result = result.head(10)
-        return result.rename(columns={"发布时间": "date", "内容": "title"})
+        return load_news(symbol)
     except Exception as e:
         return {"error": str(e)}
 
-# 获取技术分析指标
-def get_technical_indicators(df):
-    try:
-        return calculate_all_indicators(df)
-    except Exception as e:
-        return {"error": str(e)}
+# 日期控件的值转换为YYYYMMDD字符串
+def to_date_str(value):
+    return value.strftime("%Y%m%d") if isinstance(value, (datetime, date)) else value
 
 # 调用DeepSeek API进行分析
-def analyze_with_deepseek(symbol, data):
+def analyze_with_deepseek(symbol, current_data, df_hist, df_tech, news_df):
     try:
-        # 处理日期序列化问题
-        def json_serial(obj):
-            """JSON序列化函数，处理日期/时间和其他特殊类型"""
-            if isinstance(obj, (datetime, pd.Timestamp)):
-                return obj.isoformat()
-            if isinstance(obj, pd.DatetimeIndex):
-                return obj.astype(str).tolist()
-            if isinstance(obj, pd.Series):
-                return obj.tolist()
-            if isinstance(obj, pd.DataFrame):
-                return obj.to_dict(orient='records')
-            if isinstance(obj, np.integer):
-                return int(obj)
-            if isinstance(obj, np.floating):
-                return float(obj)
-            if isinstance(obj, np.ndarray):
-                return obj.tolist()
-            if isinstance(obj, (date, time)):
-                return obj.isoformat()
-            raise TypeError(f"Type {type(obj)} not serializable")
-        
-        messages = [
-            {
-                "role": "system",
-                "content": "你是一个专业的期货分析师，请根据提供的数据进行简明扼要的分析。"
-            },
-            {
-                "role": "user",
-                "content": f"请分析{symbol}的以下数据：\n{json.dumps(data, default=json_serial, ensure_ascii=False)}"
-            }
-        ]
+        # 行情和技术信号压缩为紧凑文本，新闻按相关度排序后在token预算内截断
+        messages = build_analysis_messages(symbol, current_data, df_hist, df_tech, news_df)
         
-        # 使用DeepSeekClient进行调用
-        response = deepseek_client.client.chat.completions.create(
+        # 使用DeepSeekClient进行调用，请求在客户端的后台事件循环中执行并复用连接
+        response = deepseek_client.chat_completion_sync(
+            messages,
             model="bot-20250329163710-8zcqm",
-            messages=messages,
             temperature=0.7,
             max_tokens=2000
         )
         
-        return response.choices[0].message.content
+        return completion_text(response)
     except Exception as e:
         return f"AI分析调用失败: {str(e)}"
 
@@ -143,17 +111,13 @@ with st.sidebar:
     # 获取期货品种列表，使用内盘期货品种表
     with st.spinner("加载期货列表..."):
         try:
-            # 获取所有期货品种的标记
-            futures_list = ak.futures_symbol_mark()
-            if 'symbol' not in futures_list.columns:
-                st.error("加载期货列表失败: 返回数据格式不正确")
-                futures_list = pd.DataFrame({"symbol": ["白糖"]})  # 提供默认值
+            symbol_options = load_symbol_list()
         except Exception as e:
             st.error(f"加载期货列表失败: {e}")
-            futures_list = pd.DataFrame({"symbol": ["白糖"]})  # 提供默认值
+            symbol_options = ["白糖"]  # 提供默认值
     symbol = st.selectbox(
         "选择期货品种",
-        options=futures_list['symbol'].tolist(),
+        options=symbol_options,
         index=0
     )
     
@@ -171,6 +135,10 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # 行情缓存统计
+    with st.expander("缓存统计"):
+        st.dataframe(pd.DataFrame(cache_stats()).T)
+    
     # MCP服务信息
     st.info("本应用同时提供MCP服务，可与Claude等AI助手集成")
     if st.button("如何使用MCP?"):
@@ -181,6 +149,34 @@ with st.sidebar:
         3. 通过AI助手使用期货分析工具
         """)
 
+# 确保日期是字符串格式，只选了开始日期时结束日期取当天
+start_str = to_date_str(date_range[0])
+end_str = to_date_str(date_range[1] if len(date_range) > 1 else end_date)
+
+# 本次运行所需的数据只获取一次，各标签页共用
+with st.spinner("获取行情数据..."):
+    current_data = get_current_price(symbol)
+    market_data = get_market_data(symbol, start_str, end_str)
+    news_df = get_news(symbol)
+if isinstance(market_data, tuple):
+    df_hist, df_tech = market_data
+else:
+    df_hist, df_tech = market_data, market_data
+
+# 长区间只绘制选中的显示区间，拖动滑块后按新区间重新聚合
+chart_hist, chart_tech = df_hist, df_tech
+if isinstance(df_tech, pd.DataFrame) and len(df_tech) > CHART_MAX_POINTS:
+    first_day, last_day = df_tech['date'].iloc[0].date(), df_tech['date'].iloc[-1].date()
+    view_range = st.sidebar.slider(
+        "图表显示区间",
+        min_value=first_day,
+        max_value=last_day,
+        value=(first_day, last_day)
+    )
+    view_start, view_end = pd.Timestamp(view_range[0]), pd.Timestamp(view_range[1]) + pd.Timedelta(days=1)
+    chart_hist = df_hist[(df_hist['date'] >= view_start) & (df_hist['date'] < view_end)]
+    chart_tech = df_tech[(df_tech['date'] >= view_start) & (df_tech['date'] < view_end)]
+
 # 主页面
 tab1, tab2, tab3, tab4 = st.tabs(["行情概览", "技术指标", "相关新闻", "AI分析"])
 
@@ -190,9 +186,6 @@ with tab1:
     
     with col1:
         st.subheader("实时行情")
-        with st.spinner("获取实时行情..."):
-            current_data = get_current_price(symbol)
-        
         if "error" in current_data:
             st.error(f"获取实时行情失败: {current_data['error']}")
         else:
@@ -207,26 +200,10 @@ with tab1:
     
     with col2:
         st.subheader("历史走势")
-        with st.spinner("获取历史数据..."):
-            # 确保日期是字符串格式
-            start_str = date_range[0].strftime("%Y%m%d") if isinstance(date_range[0], (datetime, date)) else date_range[0]
-            end_str = date_range[1].strftime("%Y%m%d") if isinstance(date_range[1], (datetime, date)) else date_range[1]
-            
-            df_hist = get_prices(
-                symbol, 
-                start_date=start_str,
-                end_date=end_str
-            )
-        
         if isinstance(df_hist, pd.DataFrame) and not df_hist.empty:
             # 绘制K线图
-            fig = go.Figure(data=[go.Candlestick(
-                x=df_hist['date'],
-                open=df_hist['open'],
-                high=df_hist['high'],
-                low=df_hist['low'],
-                close=df_hist['close']
-            )])
+            # 超过CHART_MAX_POINTS根时聚合为较长周期的K线
+            fig = go.Figure(data=[candlestick_trace(chart_hist)])
             
             fig.update_layout(
                 title=f"{symbol} K线图",
@@ -242,96 +219,78 @@ with tab2:
     # 技术指标标签页
     st.subheader("技术分析指标")
     
-    with st.spinner("计算技术指标..."):
-        # 确保日期是字符串格式
-        start_str = date_range[0].strftime("%Y%m%d") if isinstance(date_range[0], (datetime, date)) else date_range[0]
-        end_str = date_range[1].strftime("%Y%m%d") if isinstance(date_range[1], (datetime, date)) else date_range[1]
+    if isinstance(df_tech, pd.DataFrame) and not df_tech.empty:
+        df = chart_tech
+        # 技术指标子标签页
+        subtab1, subtab2, subtab3, subtab4 = st.tabs(["移动平均", "MACD", "RSI & KDJ", "布林带"])
         
-        df_hist = get_prices(
-            symbol, 
-            start_date=start_str,
-            end_date=end_str
-        )
+        with subtab1:
+            # 移动平均线
+            fig_ma = go.Figure()
+            fig_ma.add_trace(line_trace(df['date'], df['close'], '价格'))
+            for period in [5, 10, 20, 60]:
+                if f'MA{period}' in df.columns:
+                    fig_ma.add_trace(line_trace(df['date'], df[f'MA{period}'], f'MA{period}'))
+            fig_ma.update_layout(title='移动平均线')
+            st.plotly_chart(fig_ma, use_container_width=True)
+            
+        with subtab2:
+            # MACD
+            if 'MACD' in df.columns and 'Signal' in df.columns and 'MACD_Hist' in df.columns:
+                fig_macd = go.Figure()
+                fig_macd.add_trace(line_trace(df['date'], df['MACD'], 'MACD'))
+                fig_macd.add_trace(line_trace(df['date'], df['Signal'], 'Signal'))
+                fig_macd.add_trace(bar_trace(df['date'], df['MACD_Hist'], 'Histogram'))
+                fig_macd.update_layout(title='MACD')
+                st.plotly_chart(fig_macd, use_container_width=True)
+            else:
+                st.info("MACD数据不完整")
         
-        if isinstance(df_hist, pd.DataFrame) and not df_hist.empty:
-            df = get_technical_indicators(df_hist)
+        with subtab3:
+            col1, col2 = st.columns(2)
+            with col1:
+                # RSI
+                if 'RSI' in df.columns:
+                    fig_rsi = go.Figure()
+                    fig_rsi.add_trace(line_trace(df['date'], df['RSI'], 'RSI'))
+                    fig_rsi.add_hline(y=70, line_dash="dash", line_color="red")
+                    fig_rsi.add_hline(y=30, line_dash="dash", line_color="green")
+                    fig_rsi.update_layout(title='RSI')
+                    st.plotly_chart(fig_rsi, use_container_width=True)
+                else:
+                    st.info("RSI数据不完整")
             
-            if isinstance(df, pd.DataFrame):
-                # 技术指标子标签页
-                subtab1, subtab2, subtab3, subtab4 = st.tabs(["移动平均", "MACD", "RSI & KDJ", "布林带"])
-                
-                with subtab1:
-                    # 移动平均线
-                    fig_ma = go.Figure()
-                    fig_ma.add_trace(go.Scatter(x=df['date'], y=df['close'], name='价格'))
-                    for period in [5, 10, 20, 60]:
-                        if f'MA{period}' in df.columns:
-                            fig_ma.add_trace(go.Scatter(x=df['date'], y=df[f'MA{period}'], name=f'MA{period}'))
-                    fig_ma.update_layout(title='移动平均线')
-                    st.plotly_chart(fig_ma, use_container_width=True)
-                    
-                with subtab2:
-                    # MACD
-                    if 'MACD' in df.columns and 'Signal' in df.columns and 'MACD_Hist' in df.columns:
-                        fig_macd = go.Figure()
-                        fig_macd.add_trace(go.Scatter(x=df['date'], y=df['MACD'], name='MACD'))
-                        fig_macd.add_trace(go.Scatter(x=df['date'], y=df['Signal'], name='Signal'))
-                        fig_macd.add_trace(go.Bar(x=df['date'], y=df['MACD_Hist'], name='Histogram'))
-                        fig_macd.update_layout(title='MACD')
-                        st.plotly_chart(fig_macd, use_container_width=True)
-                    else:
-                        st.info("MACD数据不完整")
-                
-                with subtab3:
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        # RSI
-                        if 'RSI' in df.columns:
-                            fig_rsi = go.Figure()
-                            fig_rsi.add_trace(go.Scatter(x=df['date'], y=df['RSI'], name='RSI'))
-                            fig_rsi.add_hline(y=70, line_dash="dash", line_color="red")
-                            fig_rsi.add_hline(y=30, line_dash="dash", line_color="green")
-                            fig_rsi.update_layout(title='RSI')
-                            st.plotly_chart(fig_rsi, use_container_width=True)
-                        else:
-                            st.info("RSI数据不完整")
-                    
-                    with col2:
-                        # KDJ
-                        if 'K' in df.columns and 'D' in df.columns and 'J' in df.columns:
-                            fig_kdj = go.Figure()
-                            fig_kdj.add_trace(go.Scatter(x=df['date'], y=df['K'], name='K'))
-                            fig_kdj.add_trace(go.Scatter(x=df['date'], y=df['D'], name='D'))
-                            fig_kdj.add_trace(go.Scatter(x=df['date'], y=df['J'], name='J'))
-                            fig_kdj.update_layout(title='KDJ')
-                            st.plotly_chart(fig_kdj, use_container_width=True)
-                        else:
-                            st.info("KDJ数据不完整")
-                
-                with subtab4:
-                    # 布林带
-                    if 'BB_Upper' in df.columns and 'BB_Middle' in df.columns and 'BB_Lower' in df.columns:
-                        fig_bb = go.Figure()
-                        fig_bb.add_trace(go.Scatter(x=df['date'], y=df['close'], name='价格'))
-                        fig_bb.add_trace(go.Scatter(x=df['date'], y=df['BB_Upper'], name='上轨', line=dict(dash='dash')))
-                        fig_bb.add_trace(go.Scatter(x=df['date'], y=df['BB_Middle'], name='中轨'))
-                        fig_bb.add_trace(go.Scatter(x=df['date'], y=df['BB_Lower'], name='下轨', line=dict(dash='dash')))
-                        fig_bb.update_layout(title='布林带')
-                        st.plotly_chart(fig_bb, use_container_width=True)
-                    else:
-                        st.info("布林带数据不完整")
+            with col2:
+                # KDJ
+                if 'K' in df.columns and 'D' in df.columns and 'J' in df.columns:
+                    fig_kdj = go.Figure()
+                    fig_kdj.add_trace(line_trace(df['date'], df['K'], 'K'))
+                    fig_kdj.add_trace(line_trace(df['date'], df['D'], 'D'))
+                    fig_kdj.add_trace(line_trace(df['date'], df['J'], 'J'))
+                    fig_kdj.update_layout(title='KDJ')
+                    st.plotly_chart(fig_kdj, use_container_width=True)
+                else:
+                    st.info("KDJ数据不完整")
+        
+        with subtab4:
+            # 布林带
+            if 'BB_Upper' in df.columns and 'BB_Middle' in df.columns and 'BB_Lower' in df.columns:
+                fig_bb = go.Figure()
+                fig_bb.add_trace(line_trace(df['date'], df['close'], '价格'))
+                fig_bb.add_trace(line_trace(df['date'], df['BB_Upper'], '上轨', line=dict(dash='dash')))
+                fig_bb.add_trace(line_trace(df['date'], df['BB_Middle'], '中轨'))
+                fig_bb.add_trace(line_trace(df['date'], df['BB_Lower'], '下轨', line=dict(dash='dash')))
+                fig_bb.update_layout(title='布林带')
+                st.plotly_chart(fig_bb, use_container_width=True)
             else:
-                st.error(f"技术指标计算失败: {df}")
-        else:
-            st.error(f"无法获取历史数据: {df_hist}")
+                st.info("布林带数据不完整")
+    else:
+        st.error(f"无法获取历史数据: {df_tech}")
 
 with tab3:
     # 相关新闻标签页
     st.subheader("相关新闻")
     
-    with st.spinner("获取相关新闻..."):
-        news_df = get_news(symbol)
-    
     if isinstance(news_df, pd.DataFrame):
         if not news_df.empty:
             for idx, news in news_df.iterrows():
@@ -348,53 +307,21 @@ with tab4:
     if analyze_clicked or ('analysis_result' in st.session_state and st.session_state.analysis_result.get('symbol') == symbol):
         if analyze_clicked:
             with st.spinner("正在分析数据..."):
-                # 获取所需数据
-                current_data = get_current_price(symbol)
-                df_hist = get_prices(symbol)
-                
-                if isinstance(df_hist, pd.DataFrame) and not df_hist.empty:
-                    # 确保日期列是字符串类型，避免JSON序列化问题
-                    if 'date' in df_hist.columns:
-                        df_hist['date'] = df_hist['date'].astype(str)
-                    
-                    df_tech = get_technical_indicators(df_hist)
-                    
-                    # 确保技术指标中的日期列是字符串
-                    if isinstance(df_tech, pd.DataFrame) and 'date' in df_tech.columns:
-                        df_tech['date'] = df_tech['date'].astype(str)
-                        
-                    historical_data = df_hist.to_dict(orient='records')
-                    
-                    if isinstance(df_tech, pd.DataFrame):
-                        indicators = df_tech.to_dict(orient='records')
-                        
-                        news_df = get_news(symbol)
-                        if isinstance(news_df, pd.DataFrame):
-                            news = news_df.to_dict(orient='records')
-                            
-                            # 整合数据
-                            data = {
-                                "current_price": current_data,
-                                "historical_data": historical_data[-5:],  # 最近5条记录
-                                "technical_indicators": indicators[-5:],  # 最近5条记录
-                                "news": news[:5] if len(news) > 0 else []  # 最新5条新闻
-                            }
-                            
-                            # 调用DeepSeek API进行分析
-                            analysis = analyze_with_deepseek(symbol, data)
-                            
-                            # 保存结果到session_state
-                            st.session_state.analysis_result = {
-                                "symbol": symbol,
-                                "analysis": analysis,
-                                "timestamp": datetime.now().isoformat()
-                            }
-                        else:
-                            st.error(f"获取新闻失败: {news_df}")
-                    else:
-                        st.error(f"计算技术指标失败: {df_tech}")
-                else:
+                # 复用本次运行已获取的行情、日线、技术指标和新闻
+                if not isinstance(df_hist, pd.DataFrame) or df_hist.empty:
                     st.error(f"获取历史数据失败: {df_hist}")
+                elif not isinstance(news_df, pd.DataFrame):
+                    st.error(f"获取新闻失败: {news_df}")
+                else:
+                    # 调用DeepSeek API进行分析
+                    analysis = analyze_with_deepseek(symbol, current_data, df_hist, df_tech, news_df)
+                    
+                    # 保存结果到session_state
+                    st.session_state.analysis_result = {
+                        "symbol": symbol,
+                        "analysis": analysis,
+                        "timestamp": datetime.now().isoformat()
+                    }
         
         # 显示分析结果
         st.markdown(st.session_state.analysis_result.get("analysis", ""))
@@ -0,0 +1,391 @@
+"""向量化回测
+
+在技术指标列上生成目标仓位（1做多、-1做空、0空仓），信号在K线收盘时产生、下一根K线开始持仓，
+按换手收取手续费和滑点（均为成交金额的比例），计算净值曲线、回撤、夏普比率和交易列表。
+
+参数扫描时全部参数组合需要的指标在一次compute_indicators中算出（共用的中间结果只算一次），
+每批参数组合的仓位排成(时间 × 组合)的矩阵一次性计算收益和指标；组合较多时分块提交到进程池并行执行。
+"""
+import itertools
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import BACKTEST_MAX_COMBINATIONS, BACKTEST_MAX_WORKERS, BACKTEST_PARALLEL_THRESHOLD
+from technical_analysis import INDICATORS, compute_indicators
+
+logger = logging.getLogger("futures-mcp")
+
+# 每批参与矩阵运算的元素数（K线数 × 组合数）上限，控制内存占用
+BATCH_ELEMENTS = 4_000_000
+
+# 参数扫描结果中的指标
+SWEEP_METRICS = ["total_return", "annual_return", "volatility", "sharpe", "max_drawdown", "trades", "exposure"]
+
+
+class Strategy:
+    """已注册的回测策略"""
+
+    def __init__(self, name: str, func, defaults: Dict[str, Any], indicators, validate, description: str):
+        self.name = name
+        self.func = func
+        self.defaults = defaults
+        self.indicators = indicators
+        self.validate = validate
+        self.description = description
+
+    def resolve_params(self, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """合并默认参数，并把参数转换为默认值的类型"""
+        resolved = dict(self.defaults)
+        for key, value in (params or {}).items():
+            if key not in self.defaults:
+                raise ValueError(f"{self.name}不支持参数{key}，可用参数: {', '.join(self.defaults)}")
+            resolved[key] = type(self.defaults[key])(value)
+        if not self.validate(resolved):
+            raise ValueError(f"{self.name}的参数无效: {resolved}")
+        return resolved
+
+
+# 回测策略注册表
+STRATEGIES: Dict[str, Strategy] = {}
+
+
+def register_strategy(
+    name: str,
+    defaults: Dict[str, Any],
+    indicators: Callable[[Dict[str, Any]], List[str]],
+    validate: Callable[[Dict[str, Any]], bool] = lambda p: True,
+    description: str = ""
+):
+    """注册回测策略
+
+    Args:
+        name: 策略名称
+        defaults: 默认参数
+        indicators: 根据参数返回所需指标请求的函数，格式见technical_analysis.parse_indicator_spec
+        validate: 检查参数组合是否有效的函数
+        description: 策略说明
+
+    Returns:
+        装饰器，被装饰函数签名为func(columns, allow_short, **params)，返回目标仓位数组
+    """
+    def decorator(func):
+        STRATEGIES[name.upper()] = Strategy(name, func, defaults, indicators, validate, description)
+        return func
+    return decorator
+
+
+def get_strategy(name: str) -> Strategy:
+    strategy = STRATEGIES.get(name.strip().upper())
+    if strategy is None:
+        raise ValueError(f"不支持的策略: {name}，可选: {', '.join(key.lower() for key in STRATEGIES)}")
+    return strategy
+
+
+def _sign_positions(diff: np.ndarray, allow_short: bool) -> np.ndarray:
+    """diff为正时做多，为负时做空（不允许做空时空仓），NaN时空仓"""
+    return np.where(diff > 0, 1.0, np.where(diff < 0, -1.0 if allow_short else 0.0, 0.0))
+
+
+@register_strategy(
+    "MA_CROSS", {"fast": 5, "slow": 20},
+    lambda p: [f"MA:{p['fast']},{p['slow']}"],
+    lambda p: 0 < p["fast"] < p["slow"],
+    "均线交叉：快线在慢线之上做多，之下做空或空仓"
+)
+def _ma_cross(columns: Dict[str, np.ndarray], allow_short: bool, fast: int, slow: int) -> np.ndarray:
+    return _sign_positions(columns[f"MA{fast}"] - columns[f"MA{slow}"], allow_short)
+
+
+@register_strategy(
+    "MACD", {"fast": 12, "slow": 26, "signal": 9},
+    lambda p: [f"MACD:{p['fast']},{p['slow']},{p['signal']}"],
+    lambda p: 0 < p["fast"] < p["slow"] and p["signal"] > 0,
+    "MACD：DIF在DEA之上做多，之下做空或空仓"
+)
+def _macd(columns: Dict[str, np.ndarray], allow_short: bool, fast: int, slow: int, signal: int) -> np.ndarray:
+    suffix = INDICATORS["MACD"].suffix({"fast": fast, "slow": slow, "signal": signal})
+    return _sign_positions(columns[f"MACD{suffix}"] - columns[f"Signal{suffix}"], allow_short)
+
+
+@register_strategy(
+    "RSI_REVERSION", {"period": 14, "lower": 30.0, "upper": 70.0},
+    lambda p: [f"RSI:{p['period']}"],
+    lambda p: p["period"] > 0 and 0 <= p["lower"] < p["upper"] <= 100,
+    "RSI均值回归：RSI低于lower时做多，高于upper时平多（允许做空时反手做空），其余时间保持仓位"
+)
+def _rsi_reversion(columns: Dict[str, np.ndarray], allow_short: bool, period: int, lower: float, upper: float) -> np.ndarray:
+    rsi = columns[f"RSI{INDICATORS['RSI'].suffix({'period': period})}"]
+    events = np.full(len(rsi), np.nan)
+    events[rsi > upper] = -1.0 if allow_short else 0.0
+    events[rsi < lower] = 1.0
+    return pd.Series(events).ffill().fillna(0.0).to_numpy()
+
+
+def _positions(targets: np.ndarray) -> np.ndarray:
+    """目标仓位后移一根K线：收盘时产生的信号从下一根K线开始持仓，回测区间从空仓开始"""
+    positions = np.zeros_like(targets)
+    positions[1:] = targets[:-1]
+    return positions
+
+
+def _strategy_returns(returns: np.ndarray, positions: np.ndarray, cost: float) -> np.ndarray:
+    """每根K线的策略收益，positions可以是(时间,)或(时间 × 组合)"""
+    if positions.ndim == 2:
+        returns = returns[:, None]
+    turnover = np.abs(np.diff(positions, axis=0, prepend=np.zeros_like(positions[:1])))
+    return positions * returns - turnover * cost
+
+
+def _metrics(strategy_returns: np.ndarray, positions: np.ndarray, periods_per_year: float) -> Dict[str, np.ndarray]:
+    """按列计算绩效指标"""
+    n = len(strategy_returns)
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=0), 1.0)
+    final = equity[-1]
+    years = n / periods_per_year
+    std = strategy_returns.std(axis=0, ddof=1) if n > 1 else np.zeros_like(final)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, strategy_returns.mean(axis=0) / std * math.sqrt(periods_per_year), 0.0)
+        annual = np.where(final > 0, np.power(np.maximum(final, 0), 1 / years) - 1, -1.0)
+    previous = np.zeros_like(positions)
+    previous[1:] = positions[:-1]
+    return {
+        "total_return": final - 1,
+        "annual_return": annual,
+        "volatility": std * math.sqrt(periods_per_year),
+        "sharpe": sharpe,
+        "max_drawdown": (equity / peak - 1).min(axis=0),
+        "trades": ((positions != 0) & (positions != previous)).sum(axis=0),
+        "exposure": (positions != 0).mean(axis=0),
+    }
+
+
+def _evaluate_batch(
+    strategy_name: str,
+    columns: Dict[str, np.ndarray],
+    returns: np.ndarray,
+    first: int,
+    combos: List[Dict[str, Any]],
+    cost: float,
+    allow_short: bool,
+    periods_per_year: float
+) -> Dict[str, np.ndarray]:
+    """计算一批参数组合的绩效指标，在进程池中执行时各参数都可以被pickle"""
+    strategy = STRATEGIES[strategy_name]
+    batch = max(1, BATCH_ELEMENTS // max(len(returns), 1))
+    results = {metric: [] for metric in SWEEP_METRICS}
+    for offset in range(0, len(combos), batch):
+        chunk = combos[offset:offset + batch]
+        # 仓位在含预热期的完整数据上生成（有状态的信号需要完整历史），再截取回测区间
+        targets = np.column_stack([strategy.func(columns, allow_short, **params)[first:] for params in chunk])
+        positions = _positions(targets)
+        metrics = _metrics(_strategy_returns(returns, positions, cost), positions, periods_per_year)
+        for metric in SWEEP_METRICS:
+            results[metric].append(metrics[metric])
+    return {metric: np.concatenate(values) for metric, values in results.items()}
+
+
+# 参数扫描使用的进程池，首次使用时创建，之后各次扫描复用已启动的进程
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """获取（必要时创建）参数扫描使用的进程池
+
+    使用spawn方式启动子进程，避免在多线程的服务进程中fork。
+    """
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=max(BACKTEST_MAX_WORKERS, 1),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _process_pool
+
+
+def shutdown_process_pool(wait: bool = False) -> None:
+    """关闭参数扫描的进程池"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=wait, cancel_futures=True)
+            _process_pool = None
+
+
+def expand_grid(strategy: Strategy, grid: Dict[str, List[Any]], params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """展开参数网格，跳过无效的组合（如快线周期不小于慢线周期）
+
+    Args:
+        strategy: 回测策略
+        grid: {参数名: 取值列表}
+        params: 固定参数，未出现在网格中的参数取该值或默认值
+
+    Returns:
+        参数组合列表
+    """
+    unknown = [key for key in grid if key not in strategy.defaults]
+    if unknown:
+        raise ValueError(f"{strategy.name}不支持参数{', '.join(unknown)}，可用参数: {', '.join(strategy.defaults)}")
+    total = math.prod(len(values) for values in grid.values())
+    if total > BACKTEST_MAX_COMBINATIONS:
+        raise ValueError(f"参数组合数{total}超过上限{BACKTEST_MAX_COMBINATIONS}")
+    keys = list(grid)
+    combos = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        try:
+            combos.append(strategy.resolve_params({**(params or {}), **dict(zip(keys, values))}))
+        except ValueError:
+            continue
+    if not combos:
+        raise ValueError("参数网格中没有有效的参数组合")
+    return combos
+
+
+def _prepare(df: pd.DataFrame, strategy: Strategy, combos: List[Dict[str, Any]], start_date: Optional[Any]):
+    """一次算出全部组合需要的指标，返回(指标列, 回测区间的收盘价收益率, 回测区间起点)"""
+    specs = list(dict.fromkeys(spec for params in combos for spec in strategy.indicators(params)))
+    frame = compute_indicators(df, specs)
+    added = [column for column in frame.columns if column not in df.columns]
+    columns = {column: frame[column].to_numpy(dtype=np.float64) for column in added}
+    first = int(np.searchsorted(df["date"].to_numpy(), np.datetime64(pd.Timestamp(start_date)))) if start_date else 0
+    if first >= len(df) - 1:
+        raise ValueError("回测区间内的K线不足")
+    close = df["close"].to_numpy(dtype=np.float64)[first:]
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1
+    return columns, returns, first
+
+
+def sweep(
+    df: pd.DataFrame,
+    strategy_name: str,
+    grid: Dict[str, List[Any]],
+    params: Optional[Dict[str, Any]] = None,
+    commission: float = 0.0001,
+    slippage: float = 0.0001,
+    allow_short: bool = False,
+    start_date: Optional[Any] = None,
+    periods_per_year: float = 240,
+    workers: Optional[int] = None
+) -> pd.DataFrame:
+    """参数扫描
+
+    Args:
+        df: 包含date和close列的K线，可以包含回测区间之前的预热期
+        strategy_name: 策略名称，见STRATEGIES
+        grid: {参数名: 取值列表}
+        params: 固定参数
+        commission: 手续费，成交金额的比例
+        slippage: 滑点，成交金额的比例
+        allow_short: 是否允许做空
+        start_date: 回测区间开始日期，之前的K线只用于指标预热
+        periods_per_year: 每年的K线数，用于年化
+        workers: 最多使用的进程数，默认BACKTEST_MAX_WORKERS
+
+    Returns:
+        每个参数组合一行，包含参数和绩效指标
+    """
+    strategy = get_strategy(strategy_name)
+    combos = expand_grid(strategy, grid, params)
+    columns, returns, first = _prepare(df, strategy, combos, start_date)
+    cost = commission + slippage
+    name = strategy.name.upper()
+
+    workers = min(workers or BACKTEST_MAX_WORKERS, math.ceil(len(combos) / BACKTEST_PARALLEL_THRESHOLD))
+    if workers <= 1:
+        metrics = _evaluate_batch(name, columns, returns, first, combos, cost, allow_short, periods_per_year)
+    else:
+        size = math.ceil(len(combos) / workers)
+        chunks = [combos[i:i + size] for i in range(0, len(combos), size)]
+        futures = [
+            get_process_pool().submit(_evaluate_batch, name, columns, returns, first, chunk, cost, allow_short, periods_per_year)
+            for chunk in chunks
+        ]
+        parts = [future.result() for future in futures]
+        metrics = {metric: np.concatenate([part[metric] for part in parts]) for metric in SWEEP_METRICS}
+    logger.info(f"{strategy.name}参数扫描: {len(combos)}个组合，{len(returns)}根K线，{workers}个进程")
+    return pd.concat([pd.DataFrame(combos), pd.DataFrame(metrics)], axis=1)
+
+
+def _trades(dates: np.ndarray, close: np.ndarray, positions: np.ndarray, cost: float) -> List[Dict[str, Any]]:
+    """从仓位序列中提取交易，开平仓价为信号K线的收盘价"""
+    changes = np.flatnonzero(np.diff(positions, prepend=0.0) != 0)
+    trades = []
+    for i, start in enumerate(changes):
+        direction = positions[start]
+        if direction == 0:
+            continue
+        end = changes[i + 1] if i + 1 < len(changes) else None
+        entry_price = close[start - 1]
+        exit_index = (end if end is not None else len(close)) - 1
+        exit_price = close[exit_index]
+        trades.append({
+            "direction": "long" if direction > 0 else "short",
+            "entry_date": pd.Timestamp(dates[start - 1]),
+            "entry_price": float(entry_price),
+            "exit_date": pd.Timestamp(dates[exit_index]) if end is not None else None,
+            "exit_price": float(exit_price),
+            "bars": int(exit_index - start + 1),
+            "return": float(direction * (exit_price / entry_price - 1) - cost * (2 if end is not None else 1)),
+            "open": end is None,
+        })
+    return trades
+
+
+def run_backtest(
+    df: pd.DataFrame,
+    strategy_name: str,
+    params: Optional[Dict[str, Any]] = None,
+    commission: float = 0.0001,
+    slippage: float = 0.0001,
+    allow_short: bool = False,
+    start_date: Optional[Any] = None,
+    periods_per_year: float = 240
+) -> Dict[str, Any]:
+    """回测单个参数组合
+
+    Args:
+        df: 包含date和close列的K线，可以包含回测区间之前的预热期
+        strategy_name: 策略名称，见STRATEGIES
+        params: 策略参数，缺省的参数取默认值
+        commission: 手续费，成交金额的比例
+        slippage: 滑点，成交金额的比例
+        allow_short: 是否允许做空
+        start_date: 回测区间开始日期，之前的K线只用于指标预热
+        periods_per_year: 每年的K线数，用于年化
+
+    Returns:
+        {"params", "metrics", "trades", "curve"}，curve为包含date、close、position、equity、drawdown列的DataFrame
+    """
+    strategy = get_strategy(strategy_name)
+    params = strategy.resolve_params(params)
+    columns, returns, first = _prepare(df, strategy, [params], start_date)
+    cost = commission + slippage
+    positions = _positions(strategy.func(columns, allow_short, **params)[first:])
+    strategy_returns = _strategy_returns(returns, positions, cost)
+    metrics = {key: value.item() for key, value in _metrics(strategy_returns[:, None], positions[:, None], periods_per_year).items()}
+
+    equity = np.cumprod(1 + strategy_returns)
+    dates = df["date"].to_numpy()[first:]
+    close = df["close"].to_numpy(dtype=np.float64)[first:]
+    trades = _trades(dates, close, positions, cost)
+    closed = [trade["return"] for trade in trades if not trade["open"]]
+    metrics["win_rate"] = sum(r > 0 for r in closed) / len(closed) if closed else None
+    curve = pd.DataFrame({
+        "date": dates,
+        "close": close,
+        "position": positions,
+        "equity": equity,
+        "drawdown": equity / np.maximum(np.maximum.accumulate(equity), 1.0) - 1,
+    })
+    return {"params": params, "metrics": metrics, "trades": trades, "curve": curve}
@@ -0,0 +1,71 @@
+"""回测参数扫描基准测试
+
+对3年日线的均线交叉策略做参数扫描，比较逐个组合用pandas回测、矩阵化单进程和进程池三种方式的耗时，
+并校验矩阵化结果与逐个回测、run_backtest的结果一致。结果不一致时以非零状态退出。
+
+用法:
+    python benchmarks/bench_backtest.py --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import run_backtest, shutdown_process_pool, sweep
+from bench_indicators import make_ohlcv
+
+COST = 0.0002
+GRID = {"fast": list(range(2, 62)), "slow": list(range(10, 250, 2))}
+
+
+def pandas_backtest(df: pd.DataFrame, fast: int, slow: int) -> float:
+    """逐个组合的pandas实现，作为对照"""
+    close = df["close"]
+    target = (close.rolling(fast).mean() > close.rolling(slow).mean()).astype(float)
+    position = target.shift(1).fillna(0.0)
+    returns = position * close.pct_change().fillna(0.0) - position.diff().abs().fillna(position) * COST
+    return float((1 + returns).prod() - 1)
+
+
+def main(args) -> int:
+    df = make_ohlcv(args.bars)
+    ok = True
+
+    start = time.perf_counter()
+    table = sweep(df, "ma_cross", GRID, commission=COST, slippage=0.0, workers=1)
+    single = time.perf_counter() - start
+    print(f"{len(table)}个组合 x {len(df)}根K线  矩阵化单进程 {single:6.2f}s")
+
+    # 首次使用时启动进程池，计时第二次扫描
+    sweep(df, "ma_cross", GRID, commission=COST, slippage=0.0, workers=args.workers)
+    start = time.perf_counter()
+    parallel = sweep(df, "ma_cross", GRID, commission=COST, slippage=0.0, workers=args.workers)
+    pooled = time.perf_counter() - start
+    print(f"{len(table)}个组合 x {len(df)}根K线  进程池({args.workers}) {pooled:6.2f}s")
+    ok = np.allclose(table["total_return"], parallel["total_return"]) and ok
+
+    sample = table.sample(50, random_state=0)
+    start = time.perf_counter()
+    expected = [pandas_backtest(df, row.fast, row.slow) for row in sample.itertuples()]
+    per_combo = (time.perf_counter() - start) / len(sample)
+    print(f"逐个组合pandas回测 {per_combo * 1e3:6.2f}ms/组合，估计全部组合 {per_combo * len(table):6.2f}s")
+    ok = np.allclose(sample["total_return"], expected) and ok
+    for row in sample.head(5).itertuples():
+        detail = run_backtest(df, "ma_cross", {"fast": row.fast, "slow": row.slow}, commission=COST, slippage=0.0)
+        ok = np.isclose(detail["metrics"]["sharpe"], row.sharpe) and ok
+
+    shutdown_process_pool(wait=True)
+    print("一致性校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回测参数扫描基准测试")
+    parser.add_argument("--bars", type=int, default=720, help="K线数，默认约3年日线")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程池的进程数")
+    sys.exit(main(parser.parse_args()))
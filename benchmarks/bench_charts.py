@@ -0,0 +1,78 @@
+"""长区间图表降采样基准测试
+
+对不同长度的K线+默认技术指标，比较直接绘制与降采样后K线图、均线图的Plotly JSON大小和构造耗时，
+并校验降采样保留了序列的形状：聚合K线的最高/最低价等于原始区间的最高/最低价，
+LTTB保留了首尾两点。校验失败时以非零状态退出。
+
+用法:
+    python benchmarks/bench_charts.py --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indicators import make_ohlcv
+from chart_utils import aggregate_ohlc, candlestick_trace, line_trace, lttb_indices
+from config import CHART_MAX_POINTS
+from technical_analysis import compute_indicators
+
+# 1年、5年、20年日线，以及约1年的1分钟K线
+PERIODS = {"1年日线": 250, "5年日线": 1250, "20年日线": 5000, "1年分钟线": 80000}
+LINES = ["close", "MA5", "MA20", "MA60"]
+
+
+def build_raw(df) -> list:
+    candles = go.Figure(data=[go.Candlestick(x=df["date"], open=df["open"], high=df["high"], low=df["low"], close=df["close"])])
+    lines = go.Figure(data=[go.Scatter(x=df["date"], y=df[column], name=column) for column in LINES])
+    return [candles, lines]
+
+
+def build_downsampled(df) -> list:
+    candles = go.Figure(data=[candlestick_trace(df)])
+    lines = go.Figure(data=[line_trace(df["date"], df[column], column) for column in LINES])
+    return [candles, lines]
+
+
+def check_shape(df) -> bool:
+    bars = aggregate_ohlc(df, CHART_MAX_POINTS)
+    if len(bars) > CHART_MAX_POINTS:
+        return False
+    if bars["high"].max() != df["high"].max() or bars["low"].min() != df["low"].min():
+        return False
+    if bars["open"].iloc[0] != df["open"].iloc[0] or bars["close"].iloc[-1] != df["close"].iloc[-1]:
+        return False
+    index = lttb_indices(df["date"], df["close"], CHART_MAX_POINTS)
+    expected_ends = (0, len(df) - 1)
+    return len(index) <= CHART_MAX_POINTS and (index[0], index[-1]) == expected_ends and bool(np.all(np.diff(index) > 0))
+
+
+def measure(build, df, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = "".join(figure.to_json() for figure in build(df))
+    return len(payload.encode("utf-8")), (time.perf_counter() - start) / repeat
+
+
+def main(args) -> int:
+    ok = True
+    for label, rows in PERIODS.items():
+        df = compute_indicators(make_ohlcv(rows))
+        ok = check_shape(df) and ok
+        raw_size, raw_time = measure(build_raw, df, args.repeat)
+        size, elapsed = measure(build_downsampled, df, args.repeat)
+        print(f"{label}({rows}根) 直接绘制 {raw_size / 1024:9.1f}KB {raw_time * 1e3:8.1f}ms  "
+              f"降采样 {size / 1024:7.1f}KB ({size / raw_size:5.0%}) {elapsed * 1e3:7.1f}ms")
+    print("形状校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图表降采样基准测试")
+    parser.add_argument("--repeat", type=int, default=3, help="每种绘制方式的重复次数")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""并发工具调用基准测试
+
+对比N个并发的get_current_price调用在"直接阻塞调用"与"线程池执行"两种方式下的耗时。
+默认使用模拟的上游延迟，加 --live 参数则请求真实的akshare接口。
+每个调用使用不同的品种，避免被行情缓存命中或被singleflight合并；任何调用返回错误时以非零状态退出。
+
+用法:
+    python benchmarks/bench_concurrency.py -n 8 --latency 0.5
+    python benchmarks/bench_concurrency.py -n 4 --live --symbol 豆粕
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+# 主力合约映射、本地日线库和AI分析缓存写到临时目录，避免测试品种写入正式数据
+STATE_DIR = tempfile.mkdtemp(prefix="bench_concurrency_")
+os.environ["RESOLVER_STATE_PATH"] = os.path.join(STATE_DIR, "main_contracts.json")
+os.environ["OHLCV_STORE_DIR"] = os.path.join(STATE_DIR, "ohlcv")
+os.environ["LLM_CACHE_DIR"] = os.path.join(STATE_DIR, "llm_cache")
+
+import pandas as pd
+
+import data_access
+import futures_service
+import mcp_server
+
+
+def make_fake_fetch(latency: float):
+    def fake_fetch_realtime(symbol, refresh=False):
+        time.sleep(latency)
+        return pd.DataFrame([{"symbol": f"{symbol}0", "trade": 3000.0}])
+    return fake_fetch_realtime
+
+
+async def blocking_get_current_price(symbol):
+    # 改造前的写法：在协程中直接调用同步接口
+    df = futures_service.get_quotes(symbol)
+    return json.dumps(df.iloc[0].to_dict(), ensure_ascii=False, default=str)
+
+
+async def timed_gather(coro_factory, symbols):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(coro_factory(symbol) for symbol in symbols))
+    elapsed = time.perf_counter() - start
+    errors = [result for result in results if "error" in json.loads(result)]
+    if errors:
+        raise RuntimeError(f"{len(errors)}个调用返回错误，例如: {errors[0]}")
+    return elapsed
+
+
+async def main(args) -> int:
+    if not args.live:
+        # get_quotes通过futures_service模块中的fetch_realtime绑定访问上游
+        futures_service.fetch_realtime = make_fake_fetch(args.latency)
+        symbols = [[f"{args.symbol}{phase}_{i}" for i in range(args.n)] for phase in range(3)]
+    else:
+        # 真实接口只能查询存在的品种，每轮调用前清空行情缓存，并发调用仍会被singleflight合并
+        symbols = [[args.symbol] * args.n for _ in range(3)]
+
+    try:
+        data_access.quote_cache.clear()
+        single = await timed_gather(mcp_server.get_current_price, symbols[0][:1])
+        data_access.quote_cache.clear()
+        blocking = await timed_gather(blocking_get_current_price, symbols[1])
+        data_access.quote_cache.clear()
+        pooled = await timed_gather(mcp_server.get_current_price, symbols[2])
+    except RuntimeError as e:
+        print(f"基准测试失败: {e}")
+        return 1
+    finally:
+        data_access.shutdown_executor()
+        shutil.rmtree(STATE_DIR, ignore_errors=True)
+
+    print(f"单次调用:              {single:.3f}s")
+    print(f"{args.n}个并发（阻塞调用）:  {blocking:.3f}s  ({blocking / single:.1f}x)")
+    print(f"{args.n}个并发（线程池）:    {pooled:.3f}s  ({pooled / single:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="并发工具调用基准测试")
+    parser.add_argument("-n", type=int, default=8, help="并发调用数")
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟的上游延迟（秒）")
+    parser.add_argument("--symbol", default="豆粕", help="期货品种")
+    parser.add_argument("--live", action="store_true", help="请求真实的akshare接口")
+    sys.exit(asyncio.run(main(parser.parse_args())))
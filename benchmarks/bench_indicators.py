@@ -0,0 +1,111 @@
+"""技术指标计算基准测试与数值一致性校验
+
+对比逐个调用calculate_*函数（每个函数各自复制DataFrame）与compute_indicators
+的计算结果和耗时。数值不一致时以非零状态退出。
+
+用法:
+    python benchmarks/bench_indicators.py --rows 250 2500 25000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from technical_analysis import (
+    calculate_bollinger_bands,
+    compute_indicators,
+    calculate_kdj,
+    calculate_ma,
+    calculate_macd,
+    calculate_rsi,
+    calculate_volume_ma,
+)
+
+
+def make_ohlcv(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 20, rows))
+    high = close + np.abs(rng.normal(0, 10, rows))
+    low = close - np.abs(rng.normal(0, 10, rows))
+    # 插入一段停板行情，覆盖最高价等于最低价、涨跌为零的边界情况
+    flat = slice(rows // 2, rows // 2 + 12)
+    close[flat] = high[flat] = low[flat] = close[rows // 2]
+    return pd.DataFrame({
+        "date": pd.bdate_range("2000-01-03", periods=rows),
+        "open": close + rng.normal(0, 5, rows),
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": rng.integers(1000, 50000, rows).astype(float),
+    })
+
+
+def reference_indicators(data: pd.DataFrame) -> pd.DataFrame:
+    # 改用compute_indicators之前calculate_all_indicators的实现
+    df = data.copy()
+    df = calculate_ma(df)
+    df = calculate_macd(df)
+    df = calculate_rsi(df)
+    df = calculate_bollinger_bands(df)
+    df = calculate_kdj(df)
+    df = calculate_volume_ma(df)
+    return df
+
+
+def check_equivalence(data: pd.DataFrame, dtype, rtol: float, atol: float) -> bool:
+    expected = reference_indicators(data)
+    actual = compute_indicators(data, dtype=dtype)
+    ok = list(actual.columns) == list(expected.columns)
+    if not ok:
+        print(f"  列不一致: {list(actual.columns)} != {list(expected.columns)}")
+    for column in expected.columns.difference(data.columns):
+        a = actual[column].to_numpy(dtype=np.float64)
+        e = expected[column].to_numpy(dtype=np.float64)
+        close = np.isclose(a, e, rtol=rtol, atol=atol, equal_nan=True)
+        if not close.all():
+            ok = False
+            diff = np.nanmax(np.abs(a - e))
+            print(f"  {np.dtype(dtype).name} {column}: {(~close).sum()}个值不一致，最大误差 {diff:.3g}")
+    return ok
+
+
+def best_of(func, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(args) -> int:
+    ok = True
+    for rows in args.rows:
+        data = make_ohlcv(rows)
+        ok &= check_equivalence(data, np.float64, rtol=1e-9, atol=1e-9)
+        ok &= check_equivalence(data, np.float32, rtol=1e-3, atol=1e-2)
+
+        reference = best_of(lambda: reference_indicators(data))
+        fused64 = best_of(lambda: compute_indicators(data))
+        fused32 = best_of(lambda: compute_indicators(data, dtype=np.float32))
+        columns = reference_indicators(data).columns.difference(data.columns)
+        mem64 = compute_indicators(data)[columns].memory_usage(index=False).sum()
+        mem32 = compute_indicators(data, dtype=np.float32)[columns].memory_usage(index=False).sum()
+        print(
+            f"{rows:>7}行  逐个计算 {reference * 1000:8.2f}ms  "
+            f"融合float64 {fused64 * 1000:8.2f}ms ({reference / fused64:4.1f}x)  "
+            f"融合float32 {fused32 * 1000:8.2f}ms  指标内存 {mem64 / 1024:.0f}KB -> {mem32 / 1024:.0f}KB"
+        )
+    print("数值一致性校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="技术指标计算基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[30, 250, 2500, 25000], help="数据行数")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""多合约面板指标计算基准测试
+
+对比逐个合约调用compute_indicators与compute_panel_indicators一次性计算的耗时，
+各合约的上市时间随机错开以模拟长度不一的历史；同时校验两者结果一致，不一致时以非零状态退出。
+
+用法:
+    python benchmarks/bench_panel.py --symbols 10 100 500 --rows 500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_indicators import make_ohlcv
+from panel_indicators import Panel, compute_panel_indicators
+from technical_analysis import INDICATORS, compute_indicators
+
+ALL_INDICATORS = list(INDICATORS)
+
+
+def make_frames(symbols: int, rows: int):
+    rng = np.random.default_rng(symbols)
+    frames = {}
+    for i in range(symbols):
+        frame = make_ohlcv(rows, seed=i)
+        frames[f"S{i:03d}"] = frame.iloc[int(rng.integers(0, rows // 4)):].reset_index(drop=True)
+    return frames
+
+
+def check_equivalence(frames, panel, values) -> bool:
+    ok = True
+    symbol_index = {symbol: j for j, symbol in enumerate(panel.symbols)}
+    date_index = {date: i for i, date in enumerate(panel.dates)}
+    for symbol, frame in list(frames.items())[:20]:
+        expected = compute_indicators(frame, ALL_INDICATORS)
+        rows = [date_index[date] for date in frame["date"]]
+        for column, array in values.items():
+            actual = array[rows, symbol_index[symbol]]
+            if not np.allclose(actual, expected[column].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True):
+                print(f"  {symbol} {column}: 与逐个合约计算的结果不一致")
+                ok = False
+    return ok
+
+
+def main(args) -> int:
+    ok = True
+    for symbols in args.symbols:
+        frames = make_frames(symbols, args.rows)
+
+        start = time.perf_counter()
+        for frame in frames.values():
+            compute_indicators(frame, ALL_INDICATORS)
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        panel = Panel.from_frames(frames)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        values = compute_panel_indicators(panel, ALL_INDICATORS)
+        vectorized = time.perf_counter() - start
+
+        ok &= check_equivalence(frames, panel, values)
+        print(
+            f"{symbols:>4}个合约 x {args.rows}根K线  逐个计算 {loop * 1000:8.1f}ms  "
+            f"面板计算 {vectorized * 1000:7.1f}ms ({loop / vectorized:5.1f}x)  构造面板 {build * 1000:6.1f}ms"
+        )
+    print("一致性校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多合约面板指标计算基准测试")
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500], help="合约数")
+    parser.add_argument("--rows", type=int, default=500, help="每个合约的K线数")
+    sys.exit(main(parser.parse_args()))
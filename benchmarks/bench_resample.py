@@ -0,0 +1,78 @@
+"""分钟K线重采样基准测试
+
+生成约1年的商品期货1分钟K线（夜盘21:00-23:00，日盘含小节休息和午休），
+测量聚合为5/15/30/60分钟和日线的耗时，并校验各周期的成交量合计、最高/最低价与原始数据一致，
+且没有K线跨越交易时段或交易日。校验失败时以非零状态退出。
+
+用法:
+    python benchmarks/bench_resample.py --days 240 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resample import INTERVALS, SESSION_GAP, resample_bars, trading_days
+
+# (开始, 结束, 是否夜盘)，K线时间为每分钟的结束时间
+SESSIONS = [("21:00", "23:00", True), ("09:00", "10:15", False), ("10:30", "11:30", False), ("13:30", "15:00", False)]
+
+
+def make_minutes(days: int, seed: int = 0) -> pd.DataFrame:
+    parts = []
+    for day in pd.bdate_range(end="2025-12-31", periods=days):
+        previous = day - pd.offsets.BDay(1)
+        for start, end, night in SESSIONS:
+            base = (previous if night else day).date()
+            parts.append(pd.date_range(f"{base} {start}", f"{base} {end}", freq="1min")[1:])
+    dates = parts[0].append(parts[1:])
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, len(dates)))
+    return pd.DataFrame({
+        "date": dates,
+        "open": close + rng.normal(0, 0.5, len(dates)),
+        "high": close + np.abs(rng.normal(0, 1, len(dates))),
+        "low": close - np.abs(rng.normal(0, 1, len(dates))),
+        "close": close,
+        "volume": rng.integers(1, 500, len(dates)).astype(float),
+    })
+
+
+def check(minutes: pd.DataFrame, bars: pd.DataFrame, interval: str) -> bool:
+    if bars["volume"].sum() != minutes["volume"].sum():
+        return False
+    if bars["high"].max() != minutes["high"].max() or bars["low"].min() != minutes["low"].min():
+        return False
+    if INTERVALS[interval] is None:
+        return len(bars) == trading_days(minutes["date"]).nunique()
+    # 每根周期K线覆盖的分钟K线都在同一时段内，且不超过周期长度
+    position = np.searchsorted(bars["date"].to_numpy(), minutes["date"].to_numpy())
+    span = minutes.groupby(position)["date"].agg(["first", "last"])
+    gaps = minutes.groupby(position)["date"].diff().max()
+    return bool((span["last"] - span["first"] < pd.Timedelta(minutes=INTERVALS[interval])).all() and (pd.isna(gaps) or gaps <= SESSION_GAP))
+
+
+def main(args) -> int:
+    minutes = make_minutes(args.days)
+    ok = True
+    for interval in INTERVALS:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            bars = resample_bars(minutes, interval)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        ok = check(minutes, bars, interval) and ok
+        print(f"{len(minutes)}根1分钟K线 -> {interval:<5} {len(bars):7d}根 {elapsed * 1e3:8.1f}ms")
+    print("一致性校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分钟K线重采样基准测试")
+    parser.add_argument("--days", type=int, default=240, help="交易日数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个周期的重复次数")
+    sys.exit(main(parser.parse_args()))
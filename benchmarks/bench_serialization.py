@@ -0,0 +1,67 @@
+"""MCP返回结果序列化基准测试
+
+对1年和5年的日线+默认技术指标，比较legacy、records、columnar三种格式的字节数和编码耗时，
+并校验三种格式解码后的数值一致（legacy中的NaN对应其他格式的null）。数值不一致时以非零状态退出。
+
+用法:
+    python benchmarks/bench_serialization.py --repeat 20
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indicators import make_ohlcv
+from serialization import FRAME_FORMATS, encode_frame
+from technical_analysis import compute_indicators
+
+# 每年约250根日K线
+PERIODS = {"1年": 250, "5年": 1250}
+
+
+def check_formats(df) -> bool:
+    legacy = json.loads(encode_frame(df, "legacy"))
+    records = json.loads(encode_frame(df, "records"))
+    columnar = json.loads(encode_frame(df, "columnar"))
+    if len(legacy) != len(records) or columnar["rows"] != len(records):
+        return False
+    for i, (expected, actual) in enumerate(zip(legacy, records)):
+        for column, value in expected.items():
+            other = actual[column]
+            if isinstance(value, float) and math.isnan(value):
+                if other is not None:
+                    return False
+            elif value != other:
+                return False
+            if columnar["data"][column][i] != other:
+                return False
+    return True
+
+
+def main(args) -> int:
+    ok = True
+    for label, rows in PERIODS.items():
+        df = compute_indicators(make_ohlcv(rows))
+        ok = check_formats(df) and ok
+        baseline = None
+        for fmt in FRAME_FORMATS:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                payload = encode_frame(df, fmt)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            size = len(payload.encode("utf-8"))
+            baseline = baseline or (size, elapsed)
+            print(f"{label}({rows}行 x {len(df.columns)}列) {fmt:<9} {size / 1024:8.1f}KB ({size / baseline[0]:5.0%})  "
+                  f"{elapsed * 1e3:7.2f}ms ({baseline[1] / elapsed:4.1f}x)")
+    print("一致性校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="序列化格式基准测试")
+    parser.add_argument("--repeat", type=int, default=20, help="每种格式的重复次数")
+    sys.exit(main(parser.parse_args()))
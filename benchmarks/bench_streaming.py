@@ -0,0 +1,88 @@
+"""增量指标计算基准测试与一致性校验
+
+逐根K线回放历史数据，校验StreamingIndicators每一步的结果与compute_indicators一致，
+并校验revise_last()与断点保存/恢复；随后测量单次更新耗时，以及对多个合约刷新最后一根K线
+与全量重算的耗时对比。数值不一致时以非零状态退出。
+
+用法:
+    python benchmarks/bench_streaming.py --rows 2000 --contracts 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_indicators import make_ohlcv
+from streaming_indicators import StreamingIndicators
+from technical_analysis import compute_indicators
+
+ALL_INDICATORS = ["MA", "MACD", "RSI", "BB", "KDJ", "VOLUME_MA", "ATR", "OBV", "ADX", "RSI:6", "BB:10,2.5"]
+
+
+def check_replay(data, indicators) -> bool:
+    expected = compute_indicators(data, indicators)
+    bars = data.to_dict(orient="records")
+    columns = [c for c in expected.columns if c not in data.columns]
+    actual = np.full((len(data), len(columns)), np.nan)
+
+    streaming = StreamingIndicators(indicators)
+    for i, bar in enumerate(bars):
+        if i == len(bars) // 3:
+            # 中途保存并恢复状态
+            streaming = StreamingIndicators.from_state(json.loads(json.dumps(streaming.to_state())))
+        if i % 7 == 0 and i > 0:
+            # 先写入一根错误的K线，再修正为正确的数据
+            wrong = dict(bar, close=bar["close"] * 1.05, high=bar["high"] * 1.05, volume=bar["volume"] * 2)
+            streaming.update(wrong)
+            values = streaming.revise_last(bar)
+        else:
+            values = streaming.update(bar)
+        actual[i] = [values[c] for c in columns]
+
+    ok = True
+    for j, column in enumerate(columns):
+        e = expected[column].to_numpy(dtype=np.float64)
+        close = np.isclose(actual[:, j], e, rtol=1e-7, atol=1e-6, equal_nan=True)
+        if not close.all():
+            ok = False
+            first = int(np.argmin(close))
+            print(f"  {column}: {(~close).sum()}个值不一致，首个位置{first}: {actual[first, j]} != {e[first]}")
+    return ok
+
+
+def main(args) -> int:
+    data = make_ohlcv(args.rows)
+    ok = check_replay(data, ALL_INDICATORS)
+
+    bars = data.to_dict(orient="records")
+    streaming = StreamingIndicators.from_history(data.iloc[:-1])
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        streaming.update(bars[-1])
+        streaming.revise_last(bars[-2])
+    per_update = (time.perf_counter() - start) / (2 * args.repeat)
+
+    batch_start = time.perf_counter()
+    for _ in range(10):
+        compute_indicators(data)
+    per_batch = (time.perf_counter() - batch_start) / 10
+
+    print(f"单次增量更新（默认指标）: {per_update * 1e6:.1f}us")
+    print(f"全量重算{args.rows}根K线:     {per_batch * 1e3:.2f}ms")
+    print(f"{args.contracts}个合约刷新最后一根K线: 增量 {per_update * args.contracts * 1e3:.1f}ms，"
+          f"全量重算 {per_batch * args.contracts * 1e3:.0f}ms")
+    print("一致性校验: " + ("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量指标计算基准测试")
+    parser.add_argument("--rows", type=int, default=2000, help="历史K线数")
+    parser.add_argument("--contracts", type=int, default=500, help="合约数")
+    parser.add_argument("--repeat", type=int, default=2000, help="测量更新耗时的重复次数")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+from zoneinfo import ZoneInfo
+
+from config import (
+    CACHE_QUOTE_TTL, CACHE_QUOTE_MAXSIZE,
+    CACHE_HISTORY_LIVE_TTL, CACHE_HISTORY_MAXSIZE,
+    CACHE_NEWS_TTL, CACHE_NEWS_MAXSIZE,
+    CACHE_MINUTE_TTL, CACHE_MINUTE_MAXSIZE,
+    CACHE_SYMBOLS_TTL,
+)
+
+MARKET_TZ = ZoneInfo("Asia/Shanghai")
+# 日盘收盘时间，日线在此之后才算定型
+SESSION_CLOSE = (15, 0)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """带过期时间和LRU淘汰的线程安全缓存"""
+
+    def __init__(self, name: str, maxsize: int, ttl: Union[float, Callable[[], float]]):
+        """
+        Args:
+            name: 缓存名称，用于统计输出
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 默认过期时间（秒），也可以是返回秒数的函数
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _default_ttl(self) -> float:
+        return self.ttl() if callable(self.ttl) else self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，未命中或已过期时返回default"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），默认使用缓存的ttl
+        """
+        if ttl is None:
+            ttl = self._default_ttl()
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """读取缓存，未命中时调用loader加载并写入
+
+        Args:
+            key: 缓存键
+            loader: 加载函数
+            ttl: 过期时间（秒），默认使用缓存的ttl
+
+        Returns:
+            缓存值
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """删除指定缓存"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中/淘汰计数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def seconds_until_session_close(now: Optional[datetime] = None) -> float:
+    """距离下一次日盘收盘的秒数"""
+    now = now or datetime.now(MARKET_TZ)
+    close = now.replace(hour=SESSION_CLOSE[0], minute=SESSION_CLOSE[1], second=0, microsecond=0)
+    if now >= close:
+        close += timedelta(days=1)
+    return (close - now).total_seconds()
+
+
+def history_ttl(end_date: str, now: Optional[datetime] = None) -> float:
+    """日线数据的缓存时间
+
+    区间包含尚未收盘的交易日时，最后一根K线仍在变化，只缓存较短时间；
+    否则日线已经定型，缓存到下一次收盘。
+
+    Args:
+        end_date: 结束日期，格式：YYYYMMDD
+        now: 当前时间，默认取市场时区的当前时间
+
+    Returns:
+        缓存时间（秒）
+    """
+    now = now or datetime.now(MARKET_TZ)
+    today = now.strftime("%Y%m%d")
+    session_closed = (now.hour, now.minute) >= SESSION_CLOSE
+    if end_date >= today and not session_closed:
+        return CACHE_HISTORY_LIVE_TTL
+    return seconds_until_session_close(now)
+
+
+# 各类行情数据的缓存
+quote_cache = TTLCache("quote", CACHE_QUOTE_MAXSIZE, CACHE_QUOTE_TTL)
+history_cache = TTLCache("history", CACHE_HISTORY_MAXSIZE, seconds_until_session_close)
+news_cache = TTLCache("news", CACHE_NEWS_MAXSIZE, CACHE_NEWS_TTL)
+minute_cache = TTLCache("minute", CACHE_MINUTE_MAXSIZE, CACHE_MINUTE_TTL)
+symbols_cache = TTLCache("symbols", 1, CACHE_SYMBOLS_TTL)
+
+CACHES = [quote_cache, history_cache, news_cache, minute_cache, symbols_cache]
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """返回所有缓存的统计信息"""
+    return {cache.name: cache.stats() for cache in CACHES}
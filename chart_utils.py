@@ -0,0 +1,112 @@
+"""长区间图表的降采样
+
+K线按连续分桶聚合为OHLC（开盘取首、最高取最大、最低取最小、收盘取末、成交量求和），
+折线和柱状图用LTTB（Largest-Triangle-Three-Buckets）选点以保留形状，
+发送给浏览器的点数不超过CHART_MAX_POINTS；原始点数超过CHART_WEBGL_THRESHOLD时改用WebGL绘制。
+"""
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config import CHART_MAX_POINTS, CHART_WEBGL_THRESHOLD
+
+
+def _numeric_x(x: Any) -> np.ndarray:
+    """横轴转换为float64，日期按纳秒时间戳计算"""
+    values = pd.Series(x)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("int64").to_numpy(dtype=np.float64)
+    return values.to_numpy(dtype=np.float64)
+
+
+def lttb_indices(x: Any, y: Any, threshold: int) -> np.ndarray:
+    """LTTB降采样，返回保留的点的下标
+
+    首尾两点总是保留，中间的点均分到threshold-2个桶中，每个桶选出与上一个选中点、
+    下一个桶平均点构成的三角形面积最大的点。y为NaN的点（例如指标预热期）不参与选点。
+
+    Args:
+        x: 横轴，数值或日期
+        y: 纵轴
+        threshold: 最多保留的点数
+
+    Returns:
+        升序的下标数组
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(y))
+    if threshold >= len(valid):
+        return valid
+    if threshold < 3:
+        return valid[[0, -1]][:max(threshold, 0)]
+    xs = _numeric_x(x)[valid]
+    ys = y[valid]
+    n = len(valid)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    # 每个桶的平均点一次算出，第i个桶选点时使用第i+1个桶的平均点，最后一个桶以末点为准
+    counts = np.diff(np.append(edges, n - 1))
+    avg_x = np.append(np.add.reduceat(xs[:n - 1], edges[:-1]) / counts[:-1], xs[-1])
+    avg_y = np.append(np.add.reduceat(ys[:n - 1], edges[:-1]) / counts[:-1], ys[-1])
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (xs[a] - avg_x[i + 1]) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y[i + 1] - ys[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def aggregate_ohlc(df: pd.DataFrame, max_bars: int) -> pd.DataFrame:
+    """把K线按连续分桶聚合到不超过max_bars根
+
+    Args:
+        df: 包含date、open、high、low、close列的DataFrame，按时间升序
+        max_bars: 最多保留的K线数
+
+    Returns:
+        聚合后的DataFrame，date取每个桶的第一根K线的日期
+    """
+    if len(df) <= max_bars or max_bars <= 0:
+        return df
+    buckets = np.arange(len(df)) * max_bars // len(df)
+    rules = {"date": "first", "open": "first", "high": "max", "low": "min", "close": "last"}
+    if "volume" in df.columns:
+        rules["volume"] = "sum"
+    return df.groupby(buckets).agg(rules).reset_index(drop=True)
+
+
+def _use_webgl(points: int) -> bool:
+    return points > CHART_WEBGL_THRESHOLD
+
+
+def line_trace(x: Any, y: Any, name: str, max_points: int = CHART_MAX_POINTS, **kwargs) -> go.Scatter:
+    """折线图，超过max_points个点时用LTTB降采样，原始点数较多时使用Scattergl"""
+    x, y = pd.Series(x).reset_index(drop=True), pd.Series(y).reset_index(drop=True)
+    trace = go.Scattergl if _use_webgl(len(y)) else go.Scatter
+    if len(y) > max_points:
+        index = lttb_indices(x, y, max_points)
+        x, y = x.iloc[index], y.iloc[index]
+    return trace(x=x, y=y, name=name, mode="lines", **kwargs)
+
+
+def bar_trace(x: Any, y: Any, name: str, max_points: int = CHART_MAX_POINTS, **kwargs) -> go.Bar:
+    """柱状图，超过max_points个点时用LTTB选出保留峰谷的柱子"""
+    x, y = pd.Series(x).reset_index(drop=True), pd.Series(y).reset_index(drop=True)
+    if len(y) > max_points:
+        index = lttb_indices(x, y, max_points)
+        x, y = x.iloc[index], y.iloc[index]
+    return go.Bar(x=x, y=y, name=name, **kwargs)
+
+
+def candlestick_trace(df: pd.DataFrame, max_bars: int = CHART_MAX_POINTS, name: Optional[str] = None) -> go.Candlestick:
+    """K线图，超过max_bars根时先聚合为较长周期的K线"""
+    bars = aggregate_ohlc(df, max_bars)
+    return go.Candlestick(
+        x=bars["date"], open=bars["open"], high=bars["high"], low=bars["low"], close=bars["close"], name=name
+    )
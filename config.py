@@ -6,10 +6,73 @@ load_dotenv()
 # DeepSeek API配置
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_API_BASE = "https://ark.cn-beijing.volces.com/api/v3/bots"
+DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "10"))  # 建立连接超时（秒）
+DEEPSEEK_READ_TIMEOUT = float(os.getenv("DEEPSEEK_READ_TIMEOUT", "120"))  # 等待响应数据超时（秒）
+DEEPSEEK_MAX_RETRIES = int(os.getenv("DEEPSEEK_MAX_RETRIES", "3"))  # 429/5xx/网络错误的最大重试次数
+DEEPSEEK_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "4"))  # 同时进行的请求数上限
+DEEPSEEK_MAX_CONNECTIONS = int(os.getenv("DEEPSEEK_MAX_CONNECTIONS", "10"))  # 连接池大小
 
 # MCP服务器配置
-MCP_HOST = "0.0.0.0"
-MCP_PORT = 8000
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio")  # stdio、sse或streamable-http
+MCP_HOST = os.getenv("MCP_HOST", "0.0.0.0")
+MCP_PORT = int(os.getenv("MCP_PORT", "8000"))
+MCP_CLIENT_MAX_CONCURRENCY = int(os.getenv("MCP_CLIENT_MAX_CONCURRENCY", "4"))  # 每个客户端会话同时执行的工具调用数，0表示不限制
 
 # Streamlit配置
-STREAMLIT_PORT = 8501 
\ No newline at end of file
+STREAMLIT_PORT = 8501
+STREAMLIT_QUOTE_TTL = float(os.getenv("STREAMLIT_QUOTE_TTL", "10"))  # 页面中实时行情的缓存时间（秒）
+STREAMLIT_HISTORY_TTL = float(os.getenv("STREAMLIT_HISTORY_TTL", "300"))  # 页面中日线和技术指标的缓存时间（秒）
+STREAMLIT_NEWS_TTL = float(os.getenv("STREAMLIT_NEWS_TTL", "300"))  # 页面中相关新闻的缓存时间（秒）
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "1000"))  # 每条曲线/K线图最多发送给浏览器的点数，约为图表的像素宽度
+CHART_WEBGL_THRESHOLD = int(os.getenv("CHART_WEBGL_THRESHOLD", "2000"))  # 原始点数超过该值时折线改用WebGL绘制
+
+# akshare上游调用配置
+AKSHARE_MAX_WORKERS = int(os.getenv("AKSHARE_MAX_WORKERS", "8"))  # 线程池最大并发数
+AKSHARE_TIMEOUT = float(os.getenv("AKSHARE_TIMEOUT", "20"))  # 单次调用超时（秒）
+
+# 行情数据缓存配置（过期时间单位：秒）
+CACHE_QUOTE_TTL = float(os.getenv("CACHE_QUOTE_TTL", "5"))  # 实时行情
+CACHE_QUOTE_MAXSIZE = int(os.getenv("CACHE_QUOTE_MAXSIZE", "256"))
+CACHE_HISTORY_LIVE_TTL = float(os.getenv("CACHE_HISTORY_LIVE_TTL", "60"))  # 包含未收盘交易日的日线
+CACHE_HISTORY_MAXSIZE = int(os.getenv("CACHE_HISTORY_MAXSIZE", "512"))
+CACHE_NEWS_TTL = float(os.getenv("CACHE_NEWS_TTL", "300"))  # 新闻快讯
+CACHE_NEWS_MAXSIZE = int(os.getenv("CACHE_NEWS_MAXSIZE", "4"))
+CACHE_MINUTE_TTL = float(os.getenv("CACHE_MINUTE_TTL", "60"))  # 1分钟K线
+CACHE_MINUTE_MAXSIZE = int(os.getenv("CACHE_MINUTE_MAXSIZE", "64"))
+CACHE_SYMBOLS_TTL = float(os.getenv("CACHE_SYMBOLS_TTL", "86400"))  # 期货品种列表
+
+# 本地日线库目录
+OHLCV_STORE_DIR = os.getenv("OHLCV_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ohlcv"))
+
+# 主力合约解析配置
+RESOLVER_TTL = float(os.getenv("RESOLVER_TTL", "21600"))  # 解析结果有效期（秒）
+RESOLVER_REFRESH_INTERVAL = float(os.getenv("RESOLVER_REFRESH_INTERVAL", "0"))  # 后台批量刷新间隔（秒），0表示关闭
+RESOLVER_STATE_PATH = os.getenv("RESOLVER_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "main_contracts.json"))
+
+# 全市场筛选配置
+SCREENER_MAX_CONCURRENCY = int(os.getenv("SCREENER_MAX_CONCURRENCY", "6"))  # 同时获取日线的品种数，低于线程池大小以给其他工具留出余量
+
+# AI分析结果缓存配置
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_cache"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "900"))  # 有效期（秒），0表示不缓存
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))  # 最多保留的条目数
+LLM_CACHE_PRICE_BAND = float(os.getenv("LLM_CACHE_PRICE_BAND", "0.5"))  # 缓存键中最新价按相对昨结算的涨跌幅分档的宽度（%），0表示使用精确价格
+
+# AI分析提示词配置
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))  # 提示词的token预算（估计值）
+PROMPT_NEWS_MAX_CHARS = int(os.getenv("PROMPT_NEWS_MAX_CHARS", "150"))  # 每条新闻截断后的最大字数
+PROMPT_NEWS_CANDIDATES = int(os.getenv("PROMPT_NEWS_CANDIDATES", "20"))  # 参与排序的候选新闻条数
+
+# 新闻库配置
+NEWS_REFRESH_INTERVAL = float(os.getenv("NEWS_REFRESH_INTERVAL", "300"))  # 刷新间隔（秒）
+NEWS_MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", "5000"))  # 最多保留的快讯条数
+
+# 实时行情轮询配置
+QUOTE_POLL_INTERVAL = float(os.getenv("QUOTE_POLL_INTERVAL", "0"))  # 刷新周期（秒），0表示关闭
+QUOTE_POLL_SYMBOLS = [s.strip() for s in os.getenv("QUOTE_POLL_SYMBOLS", "").split(",") if s.strip()]  # 关注的品种，逗号分隔，为空时轮询全部品种
+
+# 回测配置
+BACKTEST_MAX_WORKERS = int(os.getenv("BACKTEST_MAX_WORKERS", str(os.cpu_count() or 1)))  # 参数扫描的进程数
+BACKTEST_PARALLEL_THRESHOLD = int(os.getenv("BACKTEST_PARALLEL_THRESHOLD", "500"))  # 每个进程至少分到的参数组合数，组合较少时在当前进程计算
+BACKTEST_MAX_COMBINATIONS = int(os.getenv("BACKTEST_MAX_COMBINATIONS", "20000"))  # 单次参数扫描的组合数上限
+BACKTEST_TIMEOUT = float(os.getenv("BACKTEST_TIMEOUT", "120"))  # 单次回测的超时时间（秒）
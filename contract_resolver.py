@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from config import AKSHARE_MAX_WORKERS, RESOLVER_TTL, RESOLVER_STATE_PATH
+from data_access import fetch_realtime, fetch_symbol_universe
+
+logger = logging.getLogger("futures-mcp")
+
+
+class MainContractResolver:
+    """期货品种到主力合约的解析器
+
+    新浪实时行情按持仓量降序返回，第一行即主力合约。解析结果带时间戳缓存并持久化到磁盘，
+    过期后重新解析；任何途径拿到的实时行情都可以通过observe()顺带刷新映射，
+    持仓量变化导致主力切换时会立即生效。
+    """
+
+    def __init__(self, ttl: float = RESOLVER_TTL, state_path: Optional[str] = RESOLVER_STATE_PATH):
+        """
+        Args:
+            ttl: 解析结果的有效期（秒）
+            state_path: 持久化文件路径，为None时不持久化
+        """
+        self.ttl = ttl
+        self.state_path = state_path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with self._lock:
+            snapshot = dict(self._entries)
+        tmp_path = self.state_path + ".tmp"
+        with self._save_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+
+    def observe(self, symbol: str, quotes: pd.DataFrame) -> Optional[str]:
+        """用实时行情更新品种的主力合约
+
+        Args:
+            symbol: 期货品种，例如 豆粕
+            quotes: ak.futures_zh_realtime返回的实时行情
+
+        Returns:
+            主力合约代码，行情为空时返回None
+        """
+        if quotes is None or quotes.empty:
+            return None
+        contract = str(quotes.iloc[0]['symbol'])
+        now = time.time()
+        with self._lock:
+            previous = self._entries.get(symbol, {})
+            self._entries[symbol] = {"contract": contract, "resolved_at": now}
+        if previous.get("contract") != contract:
+            if previous:
+                logger.info(f"{symbol}主力合约切换: {previous['contract']} -> {contract}")
+            self._save()
+        elif now - previous["resolved_at"] >= self.ttl:
+            self._save()
+        return contract
+
+    def cached(self, symbol: str) -> Optional[str]:
+        """返回未过期的主力合约，没有时返回None"""
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry and time.time() - entry["resolved_at"] < self.ttl:
+            return entry["contract"]
+        return None
+
+    def resolve(self, symbol: str) -> str:
+        """解析品种的主力合约，缓存未命中时请求一次实时行情
+
+        Args:
+            symbol: 期货品种，例如 豆粕
+
+        Returns:
+            主力合约代码
+        """
+        contract = self.cached(symbol)
+        if contract:
+            return contract
+        contract = self.observe(symbol, fetch_realtime(symbol))
+        if not contract:
+            raise LookupError(f"未找到期货代码 {symbol}")
+        logger.info(f"获取{symbol}的主力合约: {contract}")
+        return contract
+
+    def refresh_all(self) -> Dict[str, Any]:
+        """批量刷新ak.futures_symbol_mark()中全部品种的主力合约
+
+        使用独立的线程池并发请求，可以在共享线程池之外安全调用。
+
+        Returns:
+            刷新结果统计
+        """
+        symbols = fetch_symbol_universe()['symbol'].tolist()
+
+        def refresh(symbol):
+            try:
+                return self.observe(symbol, fetch_realtime(symbol))
+            except Exception as e:
+                logger.warning(f"刷新{symbol}主力合约失败: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=AKSHARE_MAX_WORKERS, thread_name_prefix="resolver") as executor:
+            results = list(executor.map(refresh, symbols))
+        refreshed = sum(1 for contract in results if contract)
+        logger.info(f"主力合约批量刷新完成: {refreshed}/{len(symbols)}")
+        return {"total": len(symbols), "refreshed": refreshed, "failed": len(symbols) - refreshed}
+
+    def start_background_refresh(self, interval: float) -> threading.Thread:
+        """启动后台线程，定时批量刷新
+
+        Args:
+            interval: 刷新间隔（秒）
+
+        Returns:
+            后台线程
+        """
+        def loop():
+            while True:
+                try:
+                    self.refresh_all()
+                except Exception as e:
+                    logger.warning(f"主力合约批量刷新失败: {str(e)}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="main-contract-refresh", daemon=True)
+        thread.start()
+        return thread
+
+
+# 默认的主力合约解析器
+main_contract_resolver = MainContractResolver()
@@ -0,0 +1,199 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import akshare as ak
+import pandas as pd
+
+from cache import quote_cache, history_cache, news_cache, minute_cache, symbols_cache, history_ttl
+from config import AKSHARE_MAX_WORKERS, AKSHARE_TIMEOUT
+from ohlcv_store import ohlcv_store
+
+logger = logging.getLogger("futures-mcp")
+
+# 新浪日线接口的中文列名映射
+HISTORY_COLUMNS = {
+    '日期': 'date',
+    '开盘价': 'open',
+    '最高价': 'high',
+    '最低价': 'low',
+    '收盘价': 'close',
+    '成交量': 'volume'
+}
+
+# 新浪分钟线接口的列名映射
+MINUTE_COLUMNS = {
+    'datetime': 'date'
+}
+
+# akshare的接口都是同步阻塞的，统一放到有界线程池中执行，避免阻塞事件循环
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """获取（必要时创建）上游调用使用的线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=AKSHARE_MAX_WORKERS,
+                    thread_name_prefix="akshare"
+                )
+    return _executor
+
+
+def shutdown_executor(wait: bool = False) -> None:
+    """关闭线程池
+
+    Args:
+        wait: 是否等待正在执行的调用完成
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+async def run_blocking(
+    func: Callable[..., Any],
+    *args: Any,
+    timeout: Optional[float] = None,
+    **kwargs: Any
+) -> Any:
+    """在线程池中执行阻塞函数，并等待其结果
+
+    超时后协程会抛出TimeoutError立即返回，但线程无法被强制中断，
+    该调用会继续占用一个线程直到上游返回。
+
+    Args:
+        func: 需要执行的阻塞函数
+        *args: 位置参数
+        timeout: 超时时间（秒），默认使用AKSHARE_TIMEOUT
+        **kwargs: 关键字参数
+
+    Returns:
+        函数返回值
+    """
+    if timeout is None:
+        timeout = AKSHARE_TIMEOUT
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        name = getattr(func, "__name__", repr(func))
+        logger.warning(f"上游调用{name}超时（{timeout}秒）")
+        raise TimeoutError(f"上游调用{name}超时（{timeout}秒）") from None
+
+
+# 上游接口，结果按数据类别分级缓存；返回副本，调用方可以放心修改
+def fetch_realtime(symbol: str, refresh: bool = False) -> pd.DataFrame:
+    """获取期货实时行情
+
+    Args:
+        symbol: 期货品种，例如 白糖
+        refresh: 忽略缓存，直接请求上游并更新缓存
+
+    Returns:
+        实时行情DataFrame
+    """
+    if refresh:
+        quote_cache.invalidate(("realtime", symbol))
+    df = quote_cache.get_or_load(
+        ("realtime", symbol),
+        lambda: ak.futures_zh_realtime(symbol=symbol)
+    )
+    return df.copy()
+
+
+def fetch_main_history(contract: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """获取主力连续合约的日线历史行情
+
+    Args:
+        contract: 合约代码，例如 M0
+        start_date: 开始日期，格式：YYYYMMDD
+        end_date: 结束日期，格式：YYYYMMDD
+
+    Returns:
+        历史行情DataFrame
+    """
+    df = history_cache.get_or_load(
+        ("main_sina", contract, start_date, end_date),
+        lambda: ak.futures_main_sina(symbol=contract, start_date=start_date, end_date=end_date),
+        ttl=history_ttl(end_date)
+    )
+    return df.copy()
+
+
+def load_daily_history(contract: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """读取主力连续合约的日线数据，优先使用本地日线库，只向上游获取缺失部分
+
+    Args:
+        contract: 合约代码，例如 M0
+        start_date: 开始日期，格式：YYYYMMDD
+        end_date: 结束日期，格式：YYYYMMDD
+
+    Returns:
+        列名统一为英文、按日期排序的DataFrame
+    """
+    def fetch(contract, start_date, end_date):
+        return fetch_main_history(contract, start_date, end_date).rename(columns=HISTORY_COLUMNS)
+
+    return ohlcv_store.get_daily(contract, start_date, end_date, fetch)
+
+
+def fetch_minute_bars(contract: str) -> pd.DataFrame:
+    """获取合约最近一段时间的1分钟K线
+
+    Args:
+        contract: 合约代码，例如 M0
+
+    Returns:
+        分钟K线DataFrame
+    """
+    df = minute_cache.get_or_load(
+        ("minute_sina", contract),
+        lambda: ak.futures_zh_minute_sina(symbol=contract, period="1")
+    )
+    return df.copy()
+
+
+def load_minute_history(contract: str) -> pd.DataFrame:
+    """读取合约的1分钟K线，上游最新数据合并到本地库后返回本地积累的全部数据
+
+    Args:
+        contract: 合约代码，例如 M0
+
+    Returns:
+        列名统一为英文、按时间排序的DataFrame
+    """
+    def fetch(contract):
+        return fetch_minute_bars(contract).rename(columns=MINUTE_COLUMNS)
+
+    return ohlcv_store.get_minutes(contract, fetch)
+
+
+def fetch_news_feed() -> pd.DataFrame:
+    """获取上海金属网的全部快讯
+
+    Returns:
+        新闻DataFrame
+    """
+    df = news_cache.get_or_load("shmet", lambda: ak.futures_news_shmet(symbol="全部"))
+    return df.copy()
+
+
+def fetch_symbol_universe() -> pd.DataFrame:
+    """获取所有期货品种列表
+
+    Returns:
+        期货品种DataFrame
+    """
+    df = symbols_cache.get_or_load("symbol_mark", ak.futures_symbol_mark)
+    return df.copy()
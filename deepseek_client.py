@@ -1,48 +1,204 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
+
 import httpx
-from typing import Dict, Any, List
-from config import DEEPSEEK_API_KEY, DEEPSEEK_API_BASE
-from openai import OpenAI
+
+from config import (
+    DEEPSEEK_API_KEY,
+    DEEPSEEK_API_BASE,
+    DEEPSEEK_CONNECT_TIMEOUT,
+    DEEPSEEK_READ_TIMEOUT,
+    DEEPSEEK_MAX_RETRIES,
+    DEEPSEEK_MAX_CONCURRENCY,
+    DEEPSEEK_MAX_CONNECTIONS,
+)
+
+logger = logging.getLogger("futures-mcp")
+
+# 需要重试的HTTP状态码：限流和服务端错误
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def completion_text(response: Dict[str, Any]) -> str:
+    """从聊天完成API的响应中取出回复文本"""
+    return response["choices"][0]["message"]["content"]
+
 
 class DeepSeekClient:
-    """DeepSeek API客户端"""
-    
-    def __init__(self):
-        self.api_key = DEEPSEEK_API_KEY
-        self.base_url = DEEPSEEK_API_BASE
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
-    
+    """DeepSeek API客户端
+
+    基于httpx.AsyncClient，连接池在同一事件循环内的所有请求间共享并保持长连接；
+    对429和5xx响应以及网络错误按带抖动的指数退避重试；用信号量限制同时进行的请求数。
+
+    httpx.AsyncClient和信号量都绑定在创建它们的事件循环上，因此每个事件循环各自懒加载一份。
+    没有事件循环的同步代码（如Streamlit）通过*_sync方法在客户端自己的后台事件循环中执行，
+    多次调用之间同样复用连接。
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        connect_timeout: float = DEEPSEEK_CONNECT_TIMEOUT,
+        read_timeout: float = DEEPSEEK_READ_TIMEOUT,
+        max_retries: int = DEEPSEEK_MAX_RETRIES,
+        max_concurrency: int = DEEPSEEK_MAX_CONCURRENCY,
+        max_connections: int = DEEPSEEK_MAX_CONNECTIONS
+    ):
+        """
+        Args:
+            api_key: API密钥，默认读取DEEPSEEK_API_KEY
+            base_url: API地址，默认读取DEEPSEEK_API_BASE
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 等待响应数据超时（秒），生成长回复时需要足够长
+            max_retries: 429/5xx/网络错误的最大重试次数
+            max_concurrency: 同一事件循环内同时进行的请求数上限
+            max_connections: 连接池大小
+        """
+        self.api_key = api_key or DEEPSEEK_API_KEY
+        self.base_url = (base_url or DEEPSEEK_API_BASE).rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _resources(self) -> Dict[str, Any]:
+        """当前事件循环的HTTP客户端和并发信号量，不存在时创建"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            resources = self._per_loop.get(loop)
+            if resources is None:
+                resources = {
+                    "client": httpx.AsyncClient(
+                        base_url=self.base_url,
+                        headers={"Authorization": f"Bearer {self.api_key}"},
+                        timeout=self.timeout,
+                        limits=self.limits,
+                    ),
+                    "semaphore": asyncio.Semaphore(self.max_concurrency),
+                }
+                self._per_loop[loop] = resources
+        return resources
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """第attempt次重试前的等待时间：优先使用Retry-After，否则为带完全抖动的指数退避"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), 30.0)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(0.5 * 2 ** attempt, 8.0))
+
+    @staticmethod
+    def _payload(messages, model, temperature, max_tokens, stream) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
         model: str = "bot-20250329163710-8zcqm",
         temperature: float = 0.7,
-        max_tokens: int = 2000,
-        stream: bool = False
-    ) -> Any:
+        max_tokens: int = 2000
+    ) -> Dict[str, Any]:
         """调用DeepSeek聊天完成API
-        
+
         Args:
             messages: 消息列表
             model: 模型名称
             temperature: 温度参数
             max_tokens: 最大token数
-            stream: 是否流式输出
-            
+
         Returns:
-            API响应
+            API响应（JSON字典），回复文本可用completion_text()取出
         """
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            stream=stream
-        )
-        return response
-    
+        resources = self._resources()
+        payload = self._payload(messages, model, temperature, max_tokens, False)
+        async with resources["semaphore"]:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await resources["client"].post("/chat/completions", json=payload)
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(f"DeepSeek请求失败({type(e).__name__})，{delay:.1f}秒后重试")
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                        response.raise_for_status()
+                        return response.json()
+                    delay = self._backoff(attempt, response)
+                    logger.warning(f"DeepSeek返回{response.status_code}，{delay:.1f}秒后重试")
+                await asyncio.sleep(delay)
+
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "bot-20250329163710-8zcqm",
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """流式调用DeepSeek聊天完成API，逐段产出回复文本
+
+        只在收到第一段内容之前重试，已经产出内容后出错直接抛出。
+
+        Args:
+            messages: 消息列表
+            model: 模型名称
+            temperature: 温度参数
+            max_tokens: 最大token数
+
+        Yields:
+            回复文本片段
+        """
+        resources = self._resources()
+        payload = self._payload(messages, model, temperature, max_tokens, True)
+        async with resources["semaphore"]:
+            for attempt in range(self.max_retries + 1):
+                started = False
+                try:
+                    async with resources["client"].stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                            delay = self._backoff(attempt, response)
+                            logger.warning(f"DeepSeek返回{response.status_code}，{delay:.1f}秒后重试")
+                        else:
+                            if response.is_error:
+                                await response.aread()
+                                response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    break
+                                choices = json.loads(data).get("choices") or []
+                                content = choices[0].get("delta", {}).get("content") if choices else None
+                                if content:
+                                    started = True
+                                    yield content
+                            return
+                except httpx.TransportError as e:
+                    if started or attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(f"DeepSeek流式请求失败({type(e).__name__})，{delay:.1f}秒后重试")
+                await asyncio.sleep(delay)
+
     async def analyze_futures(
         self,
         symbol: str,
@@ -50,14 +206,14 @@ class DeepSeekClient:
         stream: bool = False
     ) -> Any:
         """分析期货数据
-        
+
         Args:
             symbol: 期货代码
             data: 期货数据
             stream: 是否流式输出
-            
+
         Returns:
-            分析结果
+            分析结果；流式输出时返回逐段产出文本的异步迭代器
         """
         messages = [
             {
@@ -69,12 +225,41 @@ class DeepSeekClient:
                 "content": f"请分析{symbol}的以下数据：\n{data}"
             }
         ]
-        
-        response = await self.chat_completion(messages, stream=stream)
-        if not stream:
-            return response.choices[0].message.content
-        return response
-    
+
+        if stream:
+            return self.stream_chat_completion(messages)
+        return completion_text(await self.chat_completion(messages))
+
+    def _run_sync(self, coroutine) -> Any:
+        """在客户端自己的后台事件循环中执行协程并等待结果，供没有事件循环的同步代码使用"""
+        with self._lock:
+            if self._sync_loop is None:
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._sync_loop.run_forever, name="deepseek-client", daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._sync_loop).result()
+
+    def chat_completion_sync(self, messages: List[Dict[str, str]], **kwargs: Any) -> Dict[str, Any]:
+        """chat_completion的同步版本，参数相同"""
+        return self._run_sync(self.chat_completion(messages, **kwargs))
+
+    async def aclose(self):
+        """关闭当前事件循环的HTTP客户端"""
+        with self._lock:
+            resources = self._per_loop.pop(asyncio.get_running_loop(), None)
+        if resources is not None:
+            await resources["client"].aclose()
+
     async def close(self):
         """关闭客户端"""
-        await self.client.aclose() 
\ No newline at end of file
+        await self.aclose()
+
+    def close_sync(self):
+        """关闭后台事件循环中的HTTP客户端并停止该事件循环"""
+        with self._lock:
+            loop, self._sync_loop = self._sync_loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
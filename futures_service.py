@@ -0,0 +1,240 @@
+"""期货数据服务层
+
+MCP工具和Streamlit界面共用的数据获取逻辑。所有函数都是同步的，返回带正确类型的DataFrame，
+出错时抛出异常；序列化只在MCP边界进行一次。
+"""
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+from contract_resolver import main_contract_resolver
+from data_access import fetch_realtime, load_daily_history, load_minute_history
+from news_store import news_store
+from ohlcv_store import normalize_date
+from resample import bars_per_day, parse_interval, resample_bars, session_start, trading_days
+from technical_analysis import compute_indicators, warmup_bars
+
+logger = logging.getLogger("futures-mcp")
+
+# 日线数据的列类型
+HISTORY_DTYPES = {
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'float64',
+    'hold': 'float64',
+}
+
+# 国内期货每年约240个交易日，用于把预热K线数换算为自然日
+TRADING_DAYS_PER_YEAR = 240
+# 换算时额外预留的自然日，覆盖春节、国庆等长假
+HOLIDAY_MARGIN_DAYS = 10
+
+
+def default_date_range(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    days: int = 30
+) -> Tuple[str, str]:
+    """补全默认的日期区间
+
+    Args:
+        start_date: 开始日期，格式：YYYYMMDD或YYYY-MM-DD，默认days天前
+        end_date: 结束日期，格式：YYYYMMDD或YYYY-MM-DD，默认当前日期
+        days: 默认区间天数
+
+    Returns:
+        规范为YYYYMMDD格式的(start_date, end_date)
+
+    Raises:
+        ValueError: 日期格式无效
+    """
+    if not start_date:
+        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d")
+    if not end_date:
+        end_date = datetime.now().strftime("%Y%m%d")
+    return normalize_date(start_date), normalize_date(end_date)
+
+
+def get_quotes(symbol: str) -> pd.DataFrame:
+    """获取品种全部合约的实时行情，并顺带刷新主力合约映射
+
+    Args:
+        symbol: 期货品种，例如 豆粕
+
+    Returns:
+        实时行情DataFrame，按持仓量降序，第一行为主力合约
+    """
+    df = fetch_realtime(symbol)
+    if df.empty:
+        raise LookupError(f"未找到期货代码 {symbol}")
+    main_contract_resolver.observe(symbol, df)
+    return df
+
+
+def get_history(
+    symbol: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    main_contract: Optional[str] = None,
+    interval: str = "daily"
+) -> pd.DataFrame:
+    """获取主力合约的K线数据
+
+    日线来自本地日线库；分钟级周期由本地积累的1分钟K线按交易时段聚合，
+    各周期共用同一份分钟数据。
+
+    Args:
+        symbol: 期货品种，例如 豆粕
+        start_date: 开始日期（交易日），格式：YYYYMMDD，默认30天前
+        end_date: 结束日期（交易日），格式：YYYYMMDD，默认当前日期
+        main_contract: 已知的主力合约代码，为空时通过解析器获取
+        interval: K线周期，1m、5m、15m、30m、60m或daily，默认daily
+
+    Returns:
+        date列为datetime64、价格和成交量为float64的DataFrame
+    """
+    interval = parse_interval(interval)
+    start_date, end_date = default_date_range(start_date, end_date)
+    if main_contract is None:
+        main_contract = main_contract_resolver.resolve(symbol)
+    if interval == "daily":
+        df = load_daily_history(main_contract, start_date, end_date)
+    else:
+        df = load_intraday_history(main_contract, start_date, end_date, interval)
+    if df.empty:
+        logger.warning(f"获取{main_contract}的历史数据为空")
+        raise LookupError(f"未找到{main_contract}的历史数据")
+    dtypes = {column: dtype for column, dtype in HISTORY_DTYPES.items() if column in df.columns}
+    return df.astype(dtypes)
+
+
+def load_intraday_history(contract: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+    """读取合约在交易日区间内的分钟级K线
+
+    Args:
+        contract: 合约代码，例如 M0
+        start_date: 开始交易日，格式：YYYYMMDD
+        end_date: 结束交易日，格式：YYYYMMDD
+        interval: K线周期，见resample.INTERVALS
+
+    Returns:
+        按周期聚合后的K线，夜盘K线计入所属交易日
+    """
+    minutes = load_minute_history(contract)
+    if minutes.empty:
+        return minutes
+    days = trading_days(minutes['date'])
+    mask = (days >= pd.Timestamp(start_date)) & (days <= pd.Timestamp(end_date))
+    return resample_bars(minutes[mask], interval, days[mask])
+
+
+def get_news(
+    symbol: str,
+    limit: int = 10,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> pd.DataFrame:
+    """获取相关新闻
+
+    Args:
+        symbol: 合约代码、品种代码或中文名称，例如 M2509、M、豆粕
+        limit: 最多返回的条数
+        start_date: 开始日期，格式：YYYYMMDD
+        end_date: 结束日期，格式：YYYYMMDD
+
+    Returns:
+        包含date和title列的DataFrame，最新的在前
+    """
+    return news_store.query(symbol, limit, start_date, end_date)
+
+
+def warmup_start_date(start_date: str, indicators: Optional[List[Any]] = None, interval: str = "daily") -> str:
+    """把开始日期提前所请求指标的预热期，保证开始日期当天的指标已收敛
+
+    Args:
+        start_date: 开始日期，格式：YYYYMMDD
+        indicators: 指标请求列表，默认计算全部常用指标
+        interval: K线周期，分钟级周期按每个交易日的K线数换算
+
+    Returns:
+        提前后的开始日期，格式：YYYYMMDD
+    """
+    bars = warmup_bars(indicators)
+    if bars == 0:
+        return start_date
+    sessions = math.ceil(bars / bars_per_day(interval))
+    days = math.ceil(sessions * 365 / TRADING_DAYS_PER_YEAR) + HOLIDAY_MARGIN_DAYS
+    return (datetime.strptime(start_date, "%Y%m%d") - timedelta(days=days)).strftime("%Y%m%d")
+
+
+def select_rows(
+    df: pd.DataFrame,
+    start_date: Optional[Any] = None,
+    fields: Optional[List[str]] = None,
+    last_n: Optional[int] = None
+) -> pd.DataFrame:
+    """裁剪到请求的日期区间，并只保留需要的行和列
+
+    Args:
+        df: 带date列的DataFrame
+        start_date: 开始日期（格式：YYYYMMDD）或开始时间，早于它的行（预热期）被丢弃
+        fields: 需要返回的列，date列总是保留，默认返回全部列
+        last_n: 只返回最后N行
+
+    Returns:
+        裁剪后的DataFrame
+    """
+    if start_date:
+        df = df[df['date'] >= pd.Timestamp(start_date)]
+    if last_n is not None:
+        if last_n <= 0:
+            raise ValueError("last_n必须为正整数")
+        df = df.tail(last_n)
+    if fields:
+        unknown = [field for field in fields if field not in df.columns]
+        if unknown:
+            raise ValueError(f"未知的字段: {', '.join(unknown)}，可用的字段: {', '.join(df.columns)}")
+        df = df[['date'] + [field for field in dict.fromkeys(fields) if field != 'date']]
+    return df.reset_index(drop=True)
+
+
+def get_indicators(
+    symbol: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    main_contract: Optional[str] = None,
+    indicators: Optional[List[Any]] = None,
+    fields: Optional[List[str]] = None,
+    last_n: Optional[int] = None,
+    interval: str = "daily"
+) -> pd.DataFrame:
+    """获取带技术指标的K线数据
+
+    上游数据按指标的预热期向前多取一段，计算完成后再裁剪回请求的区间，
+    返回区间内的指标值都已收敛。
+
+    Args:
+        symbol: 期货品种，例如 豆粕
+        start_date: 开始日期，格式：YYYYMMDD，默认30天前
+        end_date: 结束日期，格式：YYYYMMDD，默认当前日期
+        main_contract: 已知的主力合约代码，为空时通过解析器获取
+        indicators: 指标请求列表，例如 ["RSI:6", "MA:5,20"]，默认计算全部常用指标
+        fields: 需要返回的列，例如 ["close", "RSI"]，默认返回全部列
+        last_n: 只返回最后N行
+        interval: K线周期，1m、5m、15m、30m、60m或daily，默认daily
+
+    Returns:
+        添加了技术指标的DataFrame
+    """
+    interval = parse_interval(interval)
+    start_date, end_date = default_date_range(start_date, end_date)
+    history_start = warmup_start_date(start_date, indicators, interval)
+    df = get_history(symbol, history_start, end_date, main_contract, interval)
+    # 分钟级K线从开始交易日的夜盘算起
+    cutoff = start_date if interval == "daily" else session_start(start_date)
+    return select_rows(compute_indicators(df, indicators), cutoff, fields, last_n)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import LLM_CACHE_DIR, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES
+from serialization import json_serial
+
+logger = logging.getLogger("futures-mcp")
+
+
+def cache_key(model: str, temperature: float, inputs: Any) -> str:
+    """按模型、温度和规范化后的输入计算缓存键
+
+    输入按键排序、去掉多余空白后序列化，内容相同的请求得到相同的键。
+
+    Args:
+        model: 模型名称
+        temperature: 温度参数
+        inputs: 可序列化的输入，例如消息列表或prompt_builder.analysis_snapshot的结果
+
+    Returns:
+        sha256十六进制摘要
+    """
+    canonical = json.dumps(
+        {"model": model, "temperature": temperature, "inputs": inputs},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=json_serial
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """按内容寻址的AI分析结果磁盘缓存
+
+    每条结果一个以缓存键命名的JSON文件，超过有效期视为未命中；
+    条目数超过上限时按最后写入时间淘汰最旧的条目。
+    """
+
+    def __init__(self, root: str = LLM_CACHE_DIR, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            root: 存储目录
+            ttl: 有效期（秒），0表示不缓存
+            max_entries: 最多保留的条目数
+        """
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存条目，不存在或已过期时返回None"""
+        entry = None
+        if self.ttl > 0:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None and time.time() - entry.get("created_at", 0) >= self.ttl:
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """写入缓存条目，并在超过条目数上限时淘汰最旧的条目"""
+        if self.ttl <= 0:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(value, created_at=time.time()), f, ensure_ascii=False, default=json_serial)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        with self._lock:
+            try:
+                entries = [entry for entry in os.scandir(self.root) if entry.name.endswith(".json")]
+            except OSError:
+                return
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+            }
+
+
+# 默认的AI分析结果缓存
+llm_cache = LLMCache()
@@ -1,16 +1,43 @@
+import anyio
+import argparse
+import asyncio
 import json
 import os
 import httpx
 import logging
 import sys
-import akshare as ak
-from datetime import datetime, timedelta, date, time
+import time as time_module
+import weakref
+from datetime import datetime
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 from technical_analysis import calculate_all_indicators
-from deepseek_client import DeepSeekClient
+from deepseek_client import DeepSeekClient, completion_text
+from cache import cache_stats
+from config import (
+    MCP_CLIENT_MAX_CONCURRENCY,
+    MCP_HOST,
+    MCP_PORT,
+    MCP_TRANSPORT,
+    PROMPT_NEWS_CANDIDATES,
+    QUOTE_POLL_INTERVAL,
+    RESOLVER_REFRESH_INTERVAL,
+    SCREENER_MAX_CONCURRENCY,
+    BACKTEST_TIMEOUT,
+)
+from contract_resolver import main_contract_resolver
+from llm_cache import cache_key, llm_cache
+from news_store import news_store
+from prompt_builder import analysis_snapshot, build_analysis_messages
+from quote_poller import quote_poller
+from data_access import fetch_symbol_universe, run_blocking, shutdown_executor
+from screener import parse_condition, screen_frames
+from backtest import SWEEP_METRICS, expand_grid, get_strategy, run_backtest, shutdown_process_pool, sweep
+from resample import bars_per_day, parse_interval, session_start
+from singleflight import singleflight
+from serialization import FRAME_FORMATS, json_serial, dumps_frame, encode_frame, frame_to_records
+import futures_service
 import pandas as pd
-import numpy as np
 
 # 加载环境变量
 load_dotenv()
@@ -23,32 +50,122 @@ logging.basicConfig(
 )
 logger = logging.getLogger("futures-mcp")
 
+class FuturesMCP(FastMCP):
+    """按客户端会话限制并发工具调用数的FastMCP服务器
+
+    网络传输模式下一个进程同时服务多个客户端，共享全部缓存和连接池；
+    每个会话单独计数，避免单个客户端的大量并发调用占满上游线程池。
+    """
+
+    def __init__(self, name: str, max_concurrency_per_client: int = MCP_CLIENT_MAX_CONCURRENCY, **settings):
+        super().__init__(name, **settings)
+        self.max_concurrency_per_client = max_concurrency_per_client
+        self._client_limits: "weakref.WeakKeyDictionary[object, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    async def call_tool(self, name: str, arguments: dict):
+        if self.max_concurrency_per_client <= 0:
+            return await super().call_tool(name, arguments)
+        try:
+            session = self.get_context().session
+        except ValueError:
+            return await super().call_tool(name, arguments)
+        semaphore = self._client_limits.get(session)
+        if semaphore is None:
+            semaphore = self._client_limits.setdefault(session, asyncio.Semaphore(self.max_concurrency_per_client))
+        async with semaphore:
+            return await super().call_tool(name, arguments)
+
 # 初始化MCP服务器
-mcp = FastMCP("futures-mcp")
+mcp = FuturesMCP("futures-mcp", host=MCP_HOST, port=MCP_PORT)
 
 # 初始化DeepSeek客户端
 deepseek_client = DeepSeekClient()
 
-# 自定义JSON序列化函数
-def json_serial(obj):
-    """JSON序列化函数，处理日期/时间和其他特殊类型"""
-    if isinstance(obj, (datetime, pd.Timestamp)):
-        return obj.isoformat()
-    if isinstance(obj, pd.DatetimeIndex):
-        return obj.astype(str).tolist()
-    if isinstance(obj, pd.Series):
-        return obj.tolist()
-    if isinstance(obj, pd.DataFrame):
-        return obj.to_dict(orient='records')
-    if isinstance(obj, np.integer):
-        return int(obj)
-    if isinstance(obj, np.floating):
-        return float(obj)
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    if isinstance(obj, (date, time)):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} not serializable")
+# 内部数据获取，返回DataFrame，供各工具共享
+async def _load_history(
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    quotes_task: "asyncio.Task" = None
+) -> pd.DataFrame:
+    """获取主力合约的日线数据
+
+    主力合约映射未命中时，如果传入了正在进行的实时行情任务，则复用它的结果，
+    避免重复请求实时行情。
+    """
+    main_contract = main_contract_resolver.cached(symbol)
+    if main_contract is None and quotes_task is not None:
+        main_contract = main_contract_resolver.observe(symbol, await quotes_task)
+    return await singleflight.call(futures_service.get_history, symbol, start_date, end_date, main_contract)
+
+async def _timed(name: str, awaitable, timings: dict):
+    """等待awaitable并记录耗时（毫秒）"""
+    start = time_module.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round((time_module.perf_counter() - start) * 1000, 1)
+
+# AI分析使用的模型和温度，也是分析结果缓存键的一部分
+ANALYSIS_MODEL = "bot-20250329163710-8zcqm"
+ANALYSIS_TEMPERATURE = 0.7
+
+# 流式分析时合并文本片段、发送进度通知的最小间隔（秒）
+STREAM_PROGRESS_INTERVAL = 0.2
+
+# 回测结果中最多返回的交易笔数（最近的交易）
+BACKTEST_TRADES_LIMIT = 50
+
+async def _report_progress(ctx: Context, progress: float, message: str) -> None:
+    """发送MCP进度通知；不在MCP请求中（ctx为空）或客户端未请求进度时忽略"""
+    if ctx is None:
+        return
+    try:
+        await ctx.report_progress(progress, message=message)
+    except Exception as e:
+        logger.debug(f"发送进度通知失败: {str(e)}")
+
+async def _run_analysis(messages: list, stream: bool, ctx: Context, timings: dict) -> tuple:
+    """调用DeepSeek API，返回(分析文本, 是否成功)
+
+    流式输出时文本片段按时间间隔合并后作为进度通知发送，客户端按顺序拼接即为完整分析。
+    """
+    llm_start = time_module.perf_counter()
+    if not stream:
+        try:
+            analysis = await deepseek_client.chat_completion(
+                messages=messages, 
+                model=ANALYSIS_MODEL,
+                temperature=ANALYSIS_TEMPERATURE
+            )
+            return completion_text(analysis), True
+        except Exception as e:
+            return f"AI分析调用失败: {str(e)}", False
+    parts = []
+    pending = []
+    progress = 3
+    last_report = llm_start
+    try:
+        async for chunk in deepseek_client.stream_chat_completion(
+            messages=messages,
+            model=ANALYSIS_MODEL,
+            temperature=ANALYSIS_TEMPERATURE
+        ):
+            if not parts:
+                timings["llm_first_token"] = round((time_module.perf_counter() - llm_start) * 1000, 1)
+            parts.append(chunk)
+            pending.append(chunk)
+            now = time_module.perf_counter()
+            if now - last_report >= STREAM_PROGRESS_INTERVAL:
+                progress += 1
+                await _report_progress(ctx, progress, "".join(pending))
+                pending = []
+                last_report = now
+        if pending:
+            await _report_progress(ctx, progress + 1, "".join(pending))
+        return "".join(parts), True
+    except Exception as e:
+        return "".join(parts) + f"\nAI分析调用失败: {str(e)}", False
 
 # 工具定义
 @mcp.tool()
@@ -59,11 +176,22 @@ async def get_current_price(symbol: str) -> str:
         symbol: 期货代码，例如 M2509
     """
     try:
-        df = ak.futures_zh_realtime(symbol=symbol)
-        if df.empty:
-            return json.dumps({"error": f"未找到期货代码 {symbol}"}, indent=2, ensure_ascii=False)
+        # 后台轮询覆盖的品种直接读取内存快照，其他品种直接请求上游
+        snapshot = quote_poller.snapshot(symbol) if quote_poller.running else None
+        if snapshot is not None:
+            df, fetched_at = snapshot
+            freshness = dict(quote_poller.staleness(fetched_at), source="snapshot")
+        else:
+            try:
+                df = await singleflight.call(futures_service.get_quotes, symbol)
+            except LookupError as e:
+                return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+            fetched_at = time_module.time()
+            freshness = {"staleness_seconds": 0.0, "stale": False, "source": "direct"}
         # 不需要再过滤，直接返回第一行数据
         result = df.iloc[0].to_dict()
+        result["as_of"] = datetime.fromtimestamp(fetched_at).isoformat()
+        result.update(freshness)
         return json.dumps(result, indent=2, ensure_ascii=False, default=json_serial)
     except Exception as e:
         return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
@@ -73,7 +201,8 @@ async def get_prices(
     symbol: str,
     start_date: str = None,
     end_date: str = None,
-    interval: str = "daily"
+    interval: str = "daily",
+    format: str = "legacy"
 ) -> str:
     """获取期货历史价格数据
     
@@ -81,65 +210,42 @@ async def get_prices(
         symbol: 期货代码，例如 白糖
         start_date: 开始日期，格式：YYYYMMDD，默认30天前
         end_date: 结束日期，格式：YYYYMMDD，默认当前日期
-        interval: 时间间隔，默认daily
+        interval: K线周期，可选 1m、5m、15m、30m、60m、daily，默认daily；
+            分钟级K线由本地积累的1分钟K线按交易时段聚合（上游只提供最近一段时间），夜盘计入下一交易日
+        format: 返回格式，legacy（默认，缩进的记录列表）、records（压缩的记录列表）、
+            columnar（列式，列名只出现一次，长区间时体积最小）
     """
+    if format not in FRAME_FORMATS:
+        return json.dumps({"error": f"不支持的格式: {format}，可选: {', '.join(FRAME_FORMATS)}"}, indent=2, ensure_ascii=False)
     try:
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).strftime("%Y%m%d")
-        if not end_date:
-            end_date = datetime.now().strftime("%Y%m%d")
-            
-        # 首先获取主力合约代码
-        symbol_info = ak.futures_zh_realtime(symbol=symbol)
-        if symbol_info.empty:
-            return json.dumps({"error": f"未找到期货代码 {symbol}"}, indent=2)
-        
-        main_contract = symbol_info.iloc[0]['symbol']
-        logger.info(f"获取{symbol}的主力合约: {main_contract}")
-        
-        # 使用期货历史行情接口
-        df = ak.futures_main_sina(symbol=main_contract, start_date=start_date, end_date=end_date)
-        
-        if df.empty:
-            logger.warning(f"获取{main_contract}的历史数据为空")
-            return json.dumps({"error": f"未找到{main_contract}的历史数据"}, indent=2)
-        
-        # 确保列名统一
-        if 'date' not in df.columns and '日期' in df.columns:
-            df = df.rename(columns={
-                '日期': 'date',
-                '开盘价': 'open',
-                '最高价': 'high',
-                '最低价': 'low',
-                '收盘价': 'close',
-                '成交量': 'volume'
-            })
-        
-        # 确保日期列是字符串类型
-        if 'date' in df.columns:
-            df['date'] = df['date'].astype(str)
-            
-        return json.dumps(df.to_dict(orient='records'), indent=2, default=json_serial)
+        # 主力合约解析结果有缓存，日线优先从本地日线库读取
+        try:
+            df = await singleflight.call(futures_service.get_history, symbol, start_date, end_date, interval=interval)
+        except (LookupError, ValueError) as e:
+            return json.dumps({"error": str(e)}, indent=2)
+        return encode_frame(df, format)
     except Exception as e:
         logger.error(f"获取历史价格数据失败: {str(e)}", exc_info=True)
         return json.dumps({"error": str(e)}, indent=2)
 
 @mcp.tool()
-async def get_news(symbol: str) -> str:
+async def get_news(
+    symbol: str,
+    limit: int = 10,
+    start_date: str = None,
+    end_date: str = None
+) -> str:
     """获取期货相关新闻
     
     Args:
-        symbol: 期货代码，例如 M2509
+        symbol: 期货代码、品种代码或品种名称，例如 M2509、M、豆粕
+        limit: 最多返回的条数，默认10
+        start_date: 开始日期，格式：YYYYMMDD，默认不限
+        end_date: 结束日期，格式：YYYYMMDD，默认不限
     """
     try:
-        df_news = ak.futures_news_shmet(symbol="全部")
-        # 使用模糊匹配查找相关新闻
-        news_df = df_news[df_news['内容'].str.contains(symbol, case=False, na=False)]
-        # 取最新的10条新闻
-        news_df = news_df.head(10)
-        # 重命名列名
-        news_df = news_df.rename(columns={"发布时间": "date", "内容": "title"})
-        return json.dumps(news_df.to_dict(orient='records'), indent=2, default=json_serial)
+        news_df = await singleflight.call(futures_service.get_news, symbol, limit, start_date, end_date)
+        return dumps_frame(news_df)
     except Exception as e:
         return json.dumps({"error": str(e)}, indent=2)
 
@@ -147,7 +253,12 @@ async def get_news(symbol: str) -> str:
 async def get_technical_indicators(
     symbol: str,
     start_date: str = None,
-    end_date: str = None
+    end_date: str = None,
+    indicators: list[str] = None,
+    fields: list[str] = None,
+    last_n: int = None,
+    interval: str = "daily",
+    format: str = "legacy"
 ) -> str:
     """获取技术分析指标
     
@@ -155,164 +266,344 @@ async def get_technical_indicators(
         symbol: 期货代码，例如 白糖
         start_date: 开始日期，格式：YYYYMMDD，默认30天前
         end_date: 结束日期，格式：YYYYMMDD，默认当前日期
+        indicators: 需要计算的指标，可带参数，例如 ["RSI:6", "MA:5,20", "MACD:12,26,9"]；
+            可选 MA、MACD、RSI、BB、KDJ、VOLUME_MA、ATR、OBV、ADX，默认计算 MA、MACD、RSI、BB、KDJ、VOLUME_MA
+        fields: 只返回这些列（date列总是返回），例如 ["close", "RSI", "MACD"]，默认返回全部列
+        last_n: 只返回最后N条记录，默认返回区间内全部记录
+        interval: K线周期，可选 1m、5m、15m、30m、60m、daily，默认daily
+        format: 返回格式，legacy（默认，缩进的记录列表）、records（压缩的记录列表）、
+            columnar（列式，列名只出现一次，长区间时体积最小）
     """
+    if format not in FRAME_FORMATS:
+        return json.dumps({"error": f"不支持的格式: {format}，可选: {', '.join(FRAME_FORMATS)}"}, indent=2, ensure_ascii=False)
     try:
-        # 首先获取历史数据
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).strftime("%Y%m%d")
-        if not end_date:
-            end_date = datetime.now().strftime("%Y%m%d")
-        
-        # 获取历史价格数据
-        prices_response = await get_prices(
-            symbol=symbol, 
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        # 解析历史价格数据
         try:
-            prices_data = json.loads(prices_response)
-            
-            # 如果返回了错误信息而不是数据
-            if isinstance(prices_data, dict) and 'error' in prices_data:
-                return prices_response  # 直接返回错误
-            
-            # 确保有数据才创建DataFrame
-            if not prices_data:
-                return json.dumps({"error": "没有可用的历史价格数据"}, indent=2)
-                
-            df_hist = pd.DataFrame(prices_data)
-                
-            # 计算技术指标
-            df = calculate_all_indicators(df_hist)
-            
-            # 确保日期列是字符串类型
-            if 'date' in df.columns:
-                df['date'] = df['date'].astype(str)
-                
-            return json.dumps(df.to_dict(orient='records'), indent=2, default=json_serial)
-        except Exception as e:
-            logger.error(f"解析历史数据失败: {str(e)}", exc_info=True)
-            return json.dumps({"error": f"解析历史数据失败: {str(e)}"}, indent=2)
+            # 上游数据会按指标预热期自动向前多取，返回的区间内指标均已收敛
+            df = await singleflight.call(
+                futures_service.get_indicators, symbol, start_date, end_date,
+                indicators=indicators, fields=fields, last_n=last_n, interval=interval
+            )
+        except (LookupError, ValueError) as e:
+            return json.dumps({"error": str(e)}, indent=2)
+        return encode_frame(df, format)
     except Exception as e:
         logger.error(f"获取技术指标失败: {str(e)}", exc_info=True)
         return json.dumps({"error": str(e)}, indent=2)
 
 @mcp.tool()
-async def analyze_futures(symbol: str) -> str:
-    """使用AI分析期货数据
+async def screen_futures(
+    conditions: list[str],
+    indicators: list[str] = None,
+    symbols: list[str] = None
+) -> str:
+    """按技术指标条件筛选全市场期货品种（主力合约最后一根日K线）
     
     Args:
-        symbol: 期货代码，例如 白糖
+        conditions: 筛选条件，全部满足才算匹配，例如 ["RSI < 30", "MACD crosses_above Signal", "close > MA20"]；
+            比较运算符 <、<=、>、>=、==、!=，交叉运算符 crosses_above（上穿）、crosses_below（下穿）
+        indicators: 需要计算的指标，格式同get_technical_indicators，默认计算 MA、MACD、RSI、BB、KDJ、VOLUME_MA
+        symbols: 筛选的品种范围，例如 ["豆粕", "白糖"]，默认全部品种
     """
     try:
-        # 获取实时价格
-        current_price_resp = await get_current_price(symbol)
         try:
-            current_data = json.loads(current_price_resp)
-            if "error" in current_data:
-                # 如果获取实时价格失败，创建基本信息
-                current_data = {"symbol": symbol, "price": "未知", "error": current_data["error"]}
-        except Exception as e:
-            logger.warning(f"解析实时价格数据失败: {str(e)}")
-            current_data = {"symbol": symbol, "price": "未知", "error": str(e)}
+            for condition in conditions:
+                parse_condition(condition)
+            # 只判断最后两根K线，日线区间取最近几天再按指标预热期向前延伸
+            start_date, end_date = futures_service.default_date_range(days=7)
+            start_date = futures_service.warmup_start_date(start_date, indicators)
+        except ValueError as e:
+            return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+        start = time_module.perf_counter()
+        if not symbols:
+            universe = await singleflight.call(fetch_symbol_universe)
+            symbols = universe['symbol'].tolist()
         
-        # 获取历史数据
-        start_date = (datetime.now() - timedelta(days=30)).strftime("%Y%m%d")
-        end_date = datetime.now().strftime("%Y%m%d")
+        # 限制同时进行的品种数，避免全市场扫描占满共享线程池
+        semaphore = asyncio.Semaphore(SCREENER_MAX_CONCURRENCY)
         
-        prices_response = await get_prices(symbol, start_date, end_date)
-        try:
-            prices_data = json.loads(prices_response)
-            if isinstance(prices_data, dict) and "error" in prices_data:
-                # 处理错误情况
-                logger.warning(f"获取历史数据失败: {prices_data['error']}")
-                historical_data = []
-                df_hist = None
+        async def load(symbol):
+            async with semaphore:
+                return await _load_history(symbol, start_date, end_date)
+        
+        results = await asyncio.gather(*(load(symbol) for symbol in symbols), return_exceptions=True)
+        frames = {}
+        failed = []
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                failed.append(symbol)
             else:
-                historical_data = prices_data
-                if historical_data:
-                    df_hist = pd.DataFrame(historical_data)
-                else:
-                    logger.warning("历史数据为空")
-                    df_hist = None
-        except Exception as e:
-            logger.warning(f"解析历史数据失败: {str(e)}")
-            historical_data = []
-            df_hist = None
+                frames[symbol] = result
+        if failed:
+            logger.warning(f"筛选时{len(failed)}个品种获取日线失败: {failed}")
         
-        # 获取技术指标
-        indicators = []
-        if df_hist is not None and not df_hist.empty:
+        try:
+            matches = await run_blocking(screen_frames, frames, conditions, indicators)
+        except (LookupError, ValueError) as e:
+            return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+        matches = matches.rename_axis("symbol").reset_index()
+        matches.insert(1, "contract", [main_contract_resolver.cached(symbol) for symbol in matches["symbol"]])
+        result = {
+            "conditions": conditions,
+            "scanned": len(frames),
+            "failed": failed,
+            "matched": len(matches),
+            "results": frame_to_records(matches),
+            "elapsed_ms": round((time_module.perf_counter() - start) * 1000, 1)
+        }
+        return json.dumps(result, indent=2, ensure_ascii=False, default=json_serial)
+    except Exception as e:
+        logger.error(f"筛选期货品种失败: {str(e)}", exc_info=True)
+        return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+
+@mcp.tool()
+async def backtest_strategy(
+    symbol: str,
+    strategy: str = "ma_cross",
+    params: dict = None,
+    param_grid: dict[str, list] = None,
+    start_date: str = None,
+    end_date: str = None,
+    interval: str = "daily",
+    commission: float = 0.0001,
+    slippage: float = 0.0001,
+    allow_short: bool = False,
+    sort_by: str = "sharpe",
+    top_n: int = 10
+) -> str:
+    """回测技术指标策略，可选参数扫描
+    
+    Args:
+        symbol: 期货代码，例如 豆粕
+        strategy: 策略，可选 ma_cross（均线交叉，参数fast、slow）、macd（参数fast、slow、signal）、
+            rsi_reversion（RSI均值回归，参数period、lower、upper）
+        params: 策略参数，例如 {"fast": 5, "slow": 20}，默认使用策略的默认参数
+        param_grid: 参数扫描网格，例如 {"fast": [5, 10], "slow": [20, 30, 60]}，按sort_by排序返回前top_n个组合，
+            并对最优组合给出完整回测结果
+        start_date: 开始日期，格式：YYYYMMDD，默认3年前
+        end_date: 结束日期，格式：YYYYMMDD，默认当前日期
+        interval: K线周期，可选 1m、5m、15m、30m、60m、daily，默认daily
+        commission: 手续费，成交金额的比例，默认0.0001
+        slippage: 滑点，成交金额的比例，默认0.0001
+        allow_short: 是否允许做空，默认只做多
+        sort_by: 参数扫描的排序指标，可选 total_return、annual_return、sharpe、max_drawdown 等，默认sharpe
+        top_n: 参数扫描返回的组合数，默认10
+    """
+    try:
+        try:
+            selected = get_strategy(strategy)
+            interval = parse_interval(interval)
+            if sort_by not in SWEEP_METRICS:
+                raise ValueError(f"不支持的排序指标: {sort_by}，可选: {', '.join(SWEEP_METRICS)}")
+            combos = expand_grid(selected, param_grid, params) if param_grid else [selected.resolve_params(params)]
+            start_date, end_date = futures_service.default_date_range(start_date, end_date, days=3 * 365)
+            specs = list(dict.fromkeys(spec for combo in combos for spec in selected.indicators(combo)))
+            history_start = futures_service.warmup_start_date(start_date, specs, interval)
+        except ValueError as e:
+            return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+        start = time_module.perf_counter()
+        try:
+            df = await singleflight.call(futures_service.get_history, symbol, history_start, end_date, interval=interval)
+        except (LookupError, ValueError) as e:
+            return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+        
+        # 预热期的K线只用于计算指标，回测从开始日期（分钟级周期从该交易日的夜盘）算起
+        backtest_start = start_date if interval == "daily" else session_start(start_date)
+        periods_per_year = futures_service.TRADING_DAYS_PER_YEAR * bars_per_day(interval)
+        costs = dict(commission=commission, slippage=slippage, allow_short=allow_short,
+                     start_date=backtest_start, periods_per_year=periods_per_year)
+        try:
+            ranked = None
+            if param_grid:
+                table = await run_blocking(sweep, df, strategy, param_grid, params, timeout=BACKTEST_TIMEOUT, **costs)
+                ranked = table.sort_values(sort_by, ascending=False, kind="stable").reset_index(drop=True)
+                params = {key: ranked.at[0, key] for key in selected.defaults}
+            result = await run_blocking(run_backtest, df, strategy, params, timeout=BACKTEST_TIMEOUT, **costs)
+        except ValueError as e:
+            return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+        
+        curve = result["curve"]
+        output = {
+            "symbol": symbol,
+            "strategy": selected.name.lower(),
+            "interval": interval,
+            "start": curve["date"].iloc[0],
+            "end": curve["date"].iloc[-1],
+            "bars": len(curve),
+            "commission": commission,
+            "slippage": slippage,
+            "allow_short": allow_short,
+            "params": result["params"],
+            "metrics": result["metrics"],
+            "trade_count": len(result["trades"]),
+            "trades": result["trades"][-BACKTEST_TRADES_LIMIT:],
+        }
+        if ranked is not None:
+            output["sweep"] = {
+                "combinations": len(ranked),
+                "sort_by": sort_by,
+                "top": frame_to_records(ranked.head(top_n)),
+            }
+        output["elapsed_ms"] = round((time_module.perf_counter() - start) * 1000, 1)
+        return json.dumps(output, indent=2, ensure_ascii=False, default=json_serial)
+    except Exception as e:
+        logger.error(f"回测失败: {str(e)}", exc_info=True)
+        return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+
+@mcp.tool()
+async def analyze_futures(
+    symbol: str,
+    stream: bool = False,
+    force_refresh: bool = False,
+    ctx: Context = None
+) -> str:
+    """使用AI分析期货数据
+    
+    Args:
+        symbol: 期货代码，例如 白糖
+        stream: 是否流式输出；为True时AI分析的文本片段随进度通知陆续发送，最终仍返回完整结果
+        force_refresh: 忽略缓存的分析结果，重新调用AI分析
+    """
+    try:
+        timings = {}
+        total_start = time_module.perf_counter()
+        start_date, end_date = futures_service.default_date_range()
+        # 按指标预热期多取一段日线，保证最近几条记录的指标已收敛
+        history_start = futures_service.warmup_start_date(start_date)
+        
+        # 并发获取实时价格、历史数据和新闻；历史数据需要解析主力合约时复用同一次实时行情请求
+        quotes_task = asyncio.ensure_future(
+            _timed("quote", singleflight.call(futures_service.get_quotes, symbol), timings)
+        )
+        history_task = asyncio.ensure_future(
+            _timed("history", _load_history(symbol, history_start, end_date, quotes_task), timings)
+        )
+        news_task = asyncio.ensure_future(
+            _timed("news", singleflight.call(futures_service.get_news, symbol, PROMPT_NEWS_CANDIDATES), timings)
+        )
+        quotes, df_hist, news_df = await asyncio.gather(
+            quotes_task, history_task, news_task, return_exceptions=True
+        )
+        timings["fetch"] = round((time_module.perf_counter() - total_start) * 1000, 1)
+        await _report_progress(ctx, 1, "数据获取完成")
+        
+        # 实时价格
+        if isinstance(quotes, Exception):
+            logger.warning(f"获取实时价格失败: {str(quotes)}")
+            current_data = {"symbol": symbol, "price": "未知", "error": str(quotes)}
+        else:
+            current_data = quotes.iloc[0].to_dict()
+        
+        # 历史数据与技术指标
+        if isinstance(df_hist, Exception):
+            logger.warning(f"获取历史数据失败: {str(df_hist)}")
+            df_hist = None
+            df_tech = None
+        else:
             try:
-                # 计算技术指标
+                indicator_start = time_module.perf_counter()
                 df_tech = calculate_all_indicators(df_hist)
-                
-                # 确保日期列是字符串类型
-                if 'date' in df_tech.columns:
-                    df_tech['date'] = df_tech['date'].astype(str)
-                    
-                indicators = df_tech.to_dict(orient='records')
+                timings["indicators"] = round((time_module.perf_counter() - indicator_start) * 1000, 1)
             except Exception as e:
                 logger.warning(f"计算技术指标失败: {str(e)}")
+                df_tech = None
         
-        # 获取新闻
-        news_response = await get_news(symbol)
-        try:
-            news_data = json.loads(news_response)
-            if isinstance(news_data, dict) and "error" in news_data:
-                logger.warning(f"获取新闻失败: {news_data['error']}")
-                news = []
-            else:
-                news = news_data
-        except Exception as e:
-            logger.warning(f"解析新闻数据失败: {str(e)}")
-            news = []
+        await _report_progress(ctx, 2, "技术指标计算完成")
         
-        # 整合数据
-        data = {
-            "current_price": current_data,
-            "historical_data": historical_data[-5:] if historical_data else [],  # 最近5条记录
-            "technical_indicators": indicators[-5:] if indicators else [],  # 最近5条记录
-            "news": news[:5] if news and isinstance(news, list) else []  # 最新5条新闻
-        }
+        # 新闻
+        if isinstance(news_df, Exception):
+            logger.warning(f"获取新闻失败: {str(news_df)}")
+            news_df = None
         
-        # 准备AI分析请求
-        messages = [
-            {
-                "role": "system",
-                "content": "你是一个专业的期货分析师，请根据提供的数据进行简明扼要的分析。"
-            },
-            {
-                "role": "user",
-                "content": f"请分析{symbol}的以下数据：\n{json.dumps(data, ensure_ascii=False, default=json_serial)}"
-            }
-        ]
+        # 准备AI分析请求：行情和技术信号压缩为紧凑文本，新闻按相关度排序后在token预算内截断
+        messages = build_analysis_messages(symbol, current_data, df_hist, df_tech, news_df)
         
-        # 调用DeepSeek API
-        try:
-            analysis = await deepseek_client.chat_completion(
-                messages=messages, 
-                model="bot-20250329163710-8zcqm"
-            )
-            analysis_text = analysis.choices[0].message.content
-        except Exception as e:
-            analysis_text = f"AI分析调用失败: {str(e)}"
+        # 相同模型、温度和K线快照的分析结果直接从缓存返回；最新价按涨跌幅分档，跨档后重新分析
+        snapshot = analysis_snapshot(symbol, current_data, df_hist, df_tech, news_df)
+        key = cache_key(ANALYSIS_MODEL, ANALYSIS_TEMPERATURE, snapshot)
+        entry = None if force_refresh else await run_blocking(llm_cache.get, key)
+        llm_start = time_module.perf_counter()
+        if entry is not None:
+            analysis_text = entry["analysis"]
+            await _report_progress(ctx, 3, "命中AI分析缓存")
+            if stream:
+                await _report_progress(ctx, 4, analysis_text)
+        else:
+            # 调用DeepSeek API
+            await _report_progress(ctx, 3, "AI分析开始")
+            analysis_text, ok = await _run_analysis(messages, stream, ctx, timings)
+            if ok:
+                await run_blocking(llm_cache.set, key, {"symbol": symbol, "model": ANALYSIS_MODEL, "analysis": analysis_text})
+        timings["llm"] = round((time_module.perf_counter() - llm_start) * 1000, 1)
+        timings["total"] = round((time_module.perf_counter() - total_start) * 1000, 1)
+        logger.info(f"分析{symbol}耗时(ms): {timings}")
         
         # 返回分析结果
         result = {
             "symbol": symbol,
             "analysis": analysis_text,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "cached": entry is not None,
+            "cached_at": datetime.fromtimestamp(entry["created_at"]).isoformat() if entry else None,
+            "timings_ms": timings
         }
         return json.dumps(result, ensure_ascii=False, indent=2, default=json_serial)
     except Exception as e:
         logger.error(f"分析期货数据失败: {str(e)}", exc_info=True)
         return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
 
+@mcp.tool()
+async def get_cache_stats() -> str:
+    """获取行情数据缓存和AI分析结果缓存的命中/未命中/淘汰统计，以及合并的重复请求数"""
+    stats = cache_stats()
+    stats["llm"] = llm_cache.stats()
+    stats["singleflight"] = singleflight.stats()
+    if quote_poller.running:
+        stats["quote_poller"] = quote_poller.last_cycle
+    return json.dumps(stats, indent=2, ensure_ascii=False)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数，未指定时使用环境变量中的配置"""
+    parser = argparse.ArgumentParser(description="期货MCP服务器")
+    parser.add_argument(
+        "--transport", choices=["stdio", "sse", "streamable-http"], default=MCP_TRANSPORT,
+        help="传输方式：stdio为每个客户端启动一个子进程；sse/streamable-http为常驻网络服务，多个客户端共享一个进程"
+    )
+    parser.add_argument("--host", default=MCP_HOST, help="网络传输模式的监听地址")
+    parser.add_argument("--port", type=int, default=MCP_PORT, help="网络传输模式的监听端口")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    
     # 记录服务器启动
-    logger.info("启动期货MCP服务器...")
+    if args.transport == "stdio":
+        logger.info("启动期货MCP服务器...")
+    else:
+        logger.info(f"启动期货MCP服务器（{args.transport}），监听 {args.host}:{args.port}...")
+    if RESOLVER_REFRESH_INTERVAL > 0:
+        main_contract_resolver.start_background_refresh(RESOLVER_REFRESH_INTERVAL)
+    # 新闻库在后台定时刷新，查询时只做索引查找
+    news_store.start_background_refresh()
+    if QUOTE_POLL_INTERVAL > 0:
+        quote_poller.start()
+    
+    async def serve():
+        try:
+            if args.transport == "sse":
+                await mcp.run_sse_async()
+            elif args.transport == "streamable-http":
+                await mcp.run_streamable_http_async()
+            else:
+                await mcp.run_stdio_async()
+        finally:
+            # 在同一个事件循环中关闭DeepSeek客户端的连接池
+            await deepseek_client.aclose()
+    
     # 初始化并运行服务器
-    mcp.run(transport="stdio") 
\ No newline at end of file
+    try:
+        anyio.run(serve)
+    finally:
+        shutdown_executor()
+        shutdown_process_pool()
@@ -0,0 +1,231 @@
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from config import NEWS_REFRESH_INTERVAL, NEWS_MAX_ARTICLES
+from data_access import fetch_news_feed
+
+logger = logging.getLogger("futures-mcp")
+
+# 国内期货品种代码与中文名称
+PRODUCT_NAMES = {
+    # 大连商品交易所
+    "A": ["豆一", "大豆"], "B": ["豆二"], "M": ["豆粕"], "Y": ["豆油"], "P": ["棕榈油", "棕榈"],
+    "C": ["玉米"], "CS": ["玉米淀粉", "淀粉"], "JD": ["鸡蛋"], "LH": ["生猪"], "RR": ["粳米"],
+    "L": ["塑料", "聚乙烯"], "V": ["PVC", "聚氯乙烯"], "PP": ["聚丙烯"], "EG": ["乙二醇"],
+    "EB": ["苯乙烯"], "PG": ["液化石油气", "液化气"], "J": ["焦炭"], "JM": ["焦煤"], "I": ["铁矿石"],
+    "FB": ["纤维板"], "BB": ["胶合板"],
+    # 郑州商品交易所
+    "SR": ["白糖"], "CF": ["棉花"], "CY": ["棉纱"], "TA": ["PTA"], "MA": ["甲醇"], "FG": ["玻璃"],
+    "RM": ["菜粕"], "OI": ["菜油", "菜籽油"], "RS": ["菜籽"], "ZC": ["动力煤"], "SF": ["硅铁"],
+    "SM": ["锰硅"], "AP": ["苹果"], "CJ": ["红枣"], "UR": ["尿素"], "SA": ["纯碱"], "PF": ["短纤"],
+    "PK": ["花生"], "SH": ["烧碱"], "PX": ["对二甲苯"], "WH": ["强麦"], "PM": ["普麦"], "RI": ["早籼稻"],
+    "LR": ["晚籼稻"], "JR": ["粳稻"],
+    # 上海期货交易所
+    "CU": ["沪铜", "铜"], "AL": ["沪铝", "铝"], "ZN": ["沪锌", "锌"], "PB": ["沪铅", "铅"],
+    "NI": ["沪镍", "镍"], "SN": ["沪锡", "锡"], "AU": ["沪金", "黄金"], "AG": ["沪银", "白银"],
+    "RB": ["螺纹钢", "螺纹"], "WR": ["线材"], "HC": ["热卷", "热轧卷板"], "SS": ["不锈钢"],
+    "FU": ["燃料油"], "BU": ["沥青"], "RU": ["橡胶", "天然橡胶"], "SP": ["纸浆"], "AO": ["氧化铝"],
+    "BR": ["丁二烯橡胶"],
+    # 上海国际能源交易中心
+    "SC": ["原油"], "LU": ["低硫燃料油"], "NR": ["20号胶"], "BC": ["国际铜"], "EC": ["集运指数", "集运欧线"],
+    # 广州期货交易所
+    "SI": ["工业硅"], "LC": ["碳酸锂"], "PS": ["多晶硅"],
+    # 中国金融期货交易所
+    "IF": ["沪深300股指"], "IH": ["上证50股指"], "IC": ["中证500股指"], "IM": ["中证1000股指"],
+    "TS": ["2年期国债"], "TF": ["5年期国债"], "T": ["10年期国债"], "TL": ["30年期国债"],
+}
+
+# 中文名称到品种代码，较长的名称优先匹配（如"低硫燃料油"优先于"燃料油"）
+NAME_TO_PRODUCT = {name: product for product, names in PRODUCT_NAMES.items() for name in names}
+_NAME_PATTERN = re.compile("|".join(re.escape(name) for name in sorted(NAME_TO_PRODUCT, key=len, reverse=True)))
+# 合约代码：品种字母+3或4位数字，例如 M2509、SR509
+_CONTRACT_PATTERN = re.compile(r"(?<![A-Za-z])([A-Za-z]{1,2})(\d{3,4})(?!\d)")
+
+
+def product_of(symbol: str) -> Optional[str]:
+    """解析合约代码、品种代码或中文名称对应的品种代码
+
+    Args:
+        symbol: 例如 M2509、m、豆粕、豆粕2509
+
+    Returns:
+        品种代码，无法识别时返回None
+    """
+    symbol = symbol.strip()
+    match = _CONTRACT_PATTERN.fullmatch(symbol)
+    if match and match.group(1).upper() in PRODUCT_NAMES:
+        return match.group(1).upper()
+    if symbol.upper() in PRODUCT_NAMES:
+        return symbol.upper()
+    name = re.sub(r"\d+$", "", symbol)
+    return NAME_TO_PRODUCT.get(name)
+
+
+def index_keys(text: str) -> Set[str]:
+    """文章内容中出现的品种代码（提及合约代码或中文名称均计入）"""
+    keys = {NAME_TO_PRODUCT[name] for name in _NAME_PATTERN.findall(text)}
+    for letters, _ in _CONTRACT_PATTERN.findall(text):
+        if letters.upper() in PRODUCT_NAMES:
+            keys.add(letters.upper())
+    return keys
+
+
+class NewsStore:
+    """带倒排索引的新闻快讯库
+
+    增量合并上海金属网快讯，按发布时间和内容去重；倒排索引把品种代码映射到文章ID，
+    合约代码（M2509）、品种代码（M）和中文名称（豆粕）都归一到同一个品种代码。
+    查询只需一次字典查找，不再对全部快讯逐条做正则匹配。
+    """
+
+    def __init__(self, refresh_interval: float = NEWS_REFRESH_INTERVAL, max_articles: int = NEWS_MAX_ARTICLES):
+        """
+        Args:
+            refresh_interval: 刷新间隔（秒），查询时距上次刷新超过该间隔会先刷新
+            max_articles: 最多保留的文章数，超出时淘汰最旧的文章
+        """
+        self.refresh_interval = refresh_interval
+        self.max_articles = max_articles
+        self._articles: Dict[str, Dict] = {}
+        # 倒排索引：品种代码 -> 按发布时间升序的[(时间戳, 文章ID)]，取最新N条只需从尾部切片
+        self._index: Dict[str, List[Tuple[int, str]]] = {}
+        # 全部文章按发布时间升序，用于无法识别品种时的文本匹配
+        self._timeline: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = 0.0
+
+    @staticmethod
+    def _article_id(published: pd.Timestamp, content: str) -> str:
+        return hashlib.sha1(f"{published}|{content}".encode("utf-8")).hexdigest()[:16]
+
+    def refresh(self) -> int:
+        """拉取最新快讯并合并到库中
+
+        Returns:
+            新增的文章数
+        """
+        with self._refresh_lock:
+            feed = fetch_news_feed()
+            dates = pd.to_datetime(feed['发布时间'], errors='coerce')
+            contents = feed['内容'].fillna("").astype(str)
+            added = 0
+            with self._lock:
+                for published, content in zip(dates, contents):
+                    article_id = self._article_id(published, content)
+                    if article_id in self._articles:
+                        continue
+                    entry = (published.value, article_id)
+                    self._articles[article_id] = {"id": article_id, "date": published, "title": content, "entry": entry}
+                    bisect.insort(self._timeline, entry)
+                    for key in index_keys(content):
+                        bisect.insort(self._index.setdefault(key, []), entry)
+                    added += 1
+                self._prune()
+            self._refreshed_at = time.time()
+        if added:
+            logger.info(f"新闻库新增{added}条快讯，共{len(self._articles)}条")
+        return added
+
+    @staticmethod
+    def _remove(postings: List[Tuple[int, str]], entry: Tuple[int, str]) -> None:
+        position = bisect.bisect_left(postings, entry)
+        if position < len(postings) and postings[position] == entry:
+            del postings[position]
+
+    def _prune(self) -> None:
+        excess = len(self._articles) - self.max_articles
+        if excess <= 0:
+            return
+        removed, self._timeline = self._timeline[:excess], self._timeline[excess:]
+        for _, article_id in removed:
+            article = self._articles.pop(article_id)
+            for key in index_keys(article["title"]):
+                postings = self._index.get(key)
+                if postings is not None:
+                    self._remove(postings, article["entry"])
+                    if not postings:
+                        del self._index[key]
+
+    def ensure_fresh(self) -> None:
+        """距上次刷新超过刷新间隔时刷新"""
+        if time.time() - self._refreshed_at >= self.refresh_interval:
+            self.refresh()
+
+    def query(
+        self,
+        symbol: str,
+        limit: int = 10,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> pd.DataFrame:
+        """查询与品种相关的最新快讯
+
+        Args:
+            symbol: 合约代码、品种代码或中文名称，例如 M2509、M、豆粕
+            limit: 最多返回的条数
+            start_date: 开始日期，格式：YYYYMMDD
+            end_date: 结束日期（含当天），格式：YYYYMMDD
+
+        Returns:
+            包含date和title列的DataFrame，最新的在前
+        """
+        self.ensure_fresh()
+        product = product_of(symbol)
+        lower = pd.Timestamp(start_date).value if start_date else None
+        upper = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value if end_date else None
+        with self._lock:
+            postings = self._index.get(product, []) if product is not None else self._timeline
+            lo = bisect.bisect_left(postings, (lower, "")) if lower is not None else 0
+            hi = bisect.bisect_left(postings, (upper, "")) if upper is not None else len(postings)
+            if product is not None:
+                article_ids = [article_id for _, article_id in reversed(postings[max(lo, hi - limit):hi])]
+            else:
+                # 无法识别的品种按普通文本匹配（不当作正则表达式），从最新的文章开始找
+                needle = symbol.strip().lower()
+                article_ids = []
+                for i in range(hi - 1, lo - 1, -1):
+                    article_id = postings[i][1]
+                    if needle in self._articles[article_id]["title"].lower():
+                        article_ids.append(article_id)
+                        if len(article_ids) >= limit:
+                            break
+            rows = [
+                {"date": self._articles[article_id]["date"], "title": self._articles[article_id]["title"]}
+                for article_id in article_ids
+            ]
+        return pd.DataFrame(rows, columns=["date", "title"])
+
+    def start_background_refresh(self, interval: Optional[float] = None) -> threading.Thread:
+        """启动后台线程，定时刷新
+
+        Args:
+            interval: 刷新间隔（秒），默认使用refresh_interval
+
+        Returns:
+            后台线程
+        """
+        interval = interval or self.refresh_interval
+
+        def loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning(f"新闻库刷新失败: {str(e)}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="news-refresh", daemon=True)
+        thread.start()
+        return thread
+
+
+# 默认的新闻库
+news_store = NewsStore()
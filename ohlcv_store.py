@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from cache import MARKET_TZ, SESSION_CLOSE
+from config import OHLCV_STORE_DIR
+
+logger = logging.getLogger("futures-mcp")
+
+DATE_FORMAT = "%Y%m%d"
+
+
+def _shift_date(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, DATE_FORMAT) + timedelta(days=days)).strftime(DATE_FORMAT)
+
+
+def normalize_date(date_str: str) -> str:
+    """把YYYYMMDD或YYYY-MM-DD格式的日期规范为YYYYMMDD
+
+    Raises:
+        ValueError: 日期格式无效
+    """
+    for fmt in (DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(date_str), fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"日期格式无效: {date_str}，应为YYYYMMDD")
+
+
+def last_finalized_date(now: Optional[datetime] = None) -> str:
+    """最近一个已收盘（日线不再变化）的日期，格式：YYYYMMDD"""
+    now = now or datetime.now(MARKET_TZ)
+    if (now.hour, now.minute) >= SESSION_CLOSE:
+        return now.strftime(DATE_FORMAT)
+    return (now - timedelta(days=1)).strftime(DATE_FORMAT)
+
+
+class OHLCVStore:
+    """按合约存储的本地日线库
+
+    每个合约一个Parquet文件，另有一个JSON清单记录已覆盖的连续日期区间。
+    读取时只向上游补齐清单之外的部分；未收盘交易日的K线仍在变化，
+    只返回不落盘，下次请求时重新获取。1分钟K线单独存放在{合约}_1m.parquet中。
+    """
+
+    def __init__(self, root: str = OHLCV_STORE_DIR):
+        """
+        Args:
+            root: 存储目录
+        """
+        self.root = root
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, contract: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(contract, threading.Lock())
+
+    def _data_path(self, contract: str) -> str:
+        return os.path.join(self.root, f"{contract}.parquet")
+
+    def _manifest_path(self, contract: str) -> str:
+        return os.path.join(self.root, f"{contract}.json")
+
+    def coverage(self, contract: str) -> Optional[Tuple[str, str]]:
+        """返回合约已覆盖的日期区间(start, end)，没有本地数据时返回None"""
+        try:
+            with open(self._manifest_path(contract), encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest["start"], manifest["end"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _read(self, contract: str) -> pd.DataFrame:
+        try:
+            return pd.read_parquet(self._data_path(contract))
+        except (OSError, ValueError):
+            return pd.DataFrame()
+
+    def _write(self, contract: str, df: pd.DataFrame, start: str, end: str) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        data_path = self._data_path(contract)
+        df.to_parquet(data_path + ".tmp", index=False)
+        os.replace(data_path + ".tmp", data_path)
+        manifest_path = self._manifest_path(contract)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"start": start, "end": end, "rows": len(df)}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    @staticmethod
+    def _missing_ranges(
+        start_date: str,
+        end_date: str,
+        covered: Optional[Tuple[str, str]]
+    ) -> List[Tuple[str, str]]:
+        # 补齐后的覆盖区间始终保持连续，请求与已有区间不相邻时连同中间的空档一起获取
+        if covered is None:
+            return [(start_date, end_date)]
+        covered_start, covered_end = covered
+        ranges = []
+        if start_date < covered_start:
+            ranges.append((start_date, _shift_date(covered_start, -1)))
+        if end_date > covered_end:
+            ranges.append((_shift_date(covered_end, 1), end_date))
+        return ranges
+
+    def get_daily(
+        self,
+        contract: str,
+        start_date: str,
+        end_date: str,
+        fetcher: Callable[[str, str, str], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """读取合约的日线数据，缺失部分从上游补齐
+
+        Args:
+            contract: 合约代码，例如 M0
+            start_date: 开始日期，格式：YYYYMMDD或YYYY-MM-DD
+            end_date: 结束日期，格式：YYYYMMDD或YYYY-MM-DD
+            fetcher: 上游获取函数，参数为(contract, start_date, end_date)，
+                返回包含date列的DataFrame
+
+        Returns:
+            按日期排序、date列为datetime64的DataFrame
+
+        Raises:
+            ValueError: 日期格式无效
+        """
+        # 清单和区间比较都使用YYYYMMDD字符串，在获取和写入之前先规范化
+        start_date, end_date = normalize_date(start_date), normalize_date(end_date)
+        if start_date > end_date:
+            return pd.DataFrame()
+        with self._lock(contract):
+            covered = self.coverage(contract)
+            missing = self._missing_ranges(start_date, end_date, covered)
+            stored = self._read(contract) if covered else pd.DataFrame()
+            if not missing:
+                return self._slice(stored, start_date, end_date)
+
+            frames = [stored] if not stored.empty else []
+            new_start, new_end = covered if covered else (None, None)
+            for fetch_start, fetch_end in missing:
+                logger.info(f"本地日线库补齐{contract}: {fetch_start}-{fetch_end}")
+                fetched = fetcher(contract, fetch_start, fetch_end)
+                if fetched is None or fetched.empty:
+                    # 空结果可能是上游的临时故障，不计入覆盖区间，下次请求时重新获取
+                    continue
+                fetched = fetched.copy()
+                fetched["date"] = pd.to_datetime(fetched["date"])
+                frames.append(fetched)
+                # 覆盖区间只延伸到上游实际返回的最后一天，部分返回时剩余部分下次再补齐
+                last_date = fetched["date"].max().strftime(DATE_FORMAT)
+                new_start = fetch_start if new_start is None else min(new_start, fetch_start)
+                new_end = last_date if new_end is None else max(new_end, last_date)
+            if not frames:
+                return pd.DataFrame()
+            merged = pd.concat(frames, ignore_index=True)
+            merged = merged.drop_duplicates(subset="date", keep="last").sort_values("date", ignore_index=True)
+
+            # 只有已收盘的部分才落盘并计入覆盖区间
+            if new_start is not None:
+                new_end = min(new_end, last_finalized_date())
+                if new_start <= new_end and (new_start, new_end) != covered:
+                    cutoff = pd.Timestamp(datetime.strptime(new_end, DATE_FORMAT))
+                    self._write(contract, merged[merged["date"] <= cutoff], new_start, new_end)
+            return self._slice(merged, start_date, end_date)
+
+    def _minute_path(self, contract: str) -> str:
+        return os.path.join(self.root, f"{contract}_1m.parquet")
+
+    def get_minutes(
+        self,
+        contract: str,
+        fetcher: Callable[[str], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """读取合约的1分钟K线，并合并上游最新返回的部分
+
+        上游只提供最近一段时间的分钟K线，无法按区间补齐，因此每次获取后都合并到本地，
+        本地数据随使用逐渐积累。最后一根K线可能尚未走完，只返回不落盘。
+
+        Args:
+            contract: 合约代码，例如 M0
+            fetcher: 上游获取函数，参数为contract，返回包含date列的DataFrame
+
+        Returns:
+            按时间排序、date列为datetime64的DataFrame
+        """
+        with self._lock(contract):
+            path = self._minute_path(contract)
+            try:
+                stored = pd.read_parquet(path)
+            except (OSError, ValueError):
+                stored = pd.DataFrame()
+            fetched = fetcher(contract)
+            if fetched is None or fetched.empty:
+                return stored
+            fetched = fetched.copy()
+            fetched["date"] = pd.to_datetime(fetched["date"])
+            frames = [stored, fetched] if not stored.empty else [fetched]
+            merged = pd.concat(frames, ignore_index=True)
+            merged = merged.drop_duplicates(subset="date", keep="last").sort_values("date", ignore_index=True)
+
+            finalized = merged[merged["date"] < fetched["date"].max()]
+            if len(finalized) > len(stored):
+                os.makedirs(self.root, exist_ok=True)
+                finalized.to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+            return merged
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        if df.empty:
+            return df
+        start = pd.Timestamp(datetime.strptime(start_date, DATE_FORMAT))
+        end = pd.Timestamp(datetime.strptime(end_date, DATE_FORMAT))
+        mask = (df["date"] >= start) & (df["date"] <= end)
+        return df.loc[mask].reset_index(drop=True)
+
+
+# 默认的本地日线库
+ohlcv_store = OHLCVStore()
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from technical_analysis import DEFAULT_INDICATORS, IndicatorContext, parse_indicator_spec
+
+# 面板需要的行情字段
+PANEL_FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+class Panel:
+    """多合约行情面板
+
+    每个字段是一个(时间 × 合约)的二维数组，没有K线的位置为NaN。
+    """
+
+    def __init__(self, dates: pd.Index, symbols: pd.Index, fields: Dict[str, np.ndarray]):
+        """
+        Args:
+            dates: 时间轴
+            symbols: 合约轴
+            fields: {字段名: 二维数组}
+        """
+        self.dates = dates
+        self.symbols = symbols
+        self.fields = fields
+
+    @classmethod
+    def from_long(cls, data: pd.DataFrame, date_col: str = "date", symbol_col: str = "symbol") -> "Panel":
+        """从长格式（每行一个合约的一根K线）构造面板
+
+        Args:
+            data: 包含日期、合约和OHLCV列的DataFrame
+            date_col: 日期列名
+            symbol_col: 合约列名
+
+        Returns:
+            面板
+        """
+        fields = [field for field in PANEL_FIELDS if field in data.columns]
+        date_codes, dates = pd.factorize(data[date_col], sort=True)
+        symbol_codes, symbols = pd.factorize(data[symbol_col], sort=True)
+        arrays = {}
+        for field in fields:
+            # 重复的(日期, 合约)以最后一行为准
+            array = np.full((len(dates), len(symbols)), np.nan)
+            array[date_codes, symbol_codes] = data[field].to_numpy(dtype=np.float64)
+            arrays[field] = array
+        return cls(pd.Index(dates), pd.Index(symbols), arrays)
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], date_col: str = "date") -> "Panel":
+        """从{合约: 单合约DataFrame}构造面板，各合约的历史长度可以不同
+
+        Args:
+            frames: 每个合约的OHLCV数据
+            date_col: 日期列名
+
+        Returns:
+            面板
+        """
+        long = pd.concat(
+            [frame.assign(symbol=symbol) for symbol, frame in frames.items() if not frame.empty],
+            ignore_index=True
+        )
+        return cls.from_long(long, date_col=date_col)
+
+    def to_long(self, values: Dict[str, np.ndarray], date_col: str = "date", symbol_col: str = "symbol") -> pd.DataFrame:
+        """把面板数组转换回长格式，只保留有K线的位置
+
+        Args:
+            values: {列名: 二维数组}，通常为行情字段与指标的合并
+            date_col: 日期列名
+            symbol_col: 合约列名
+
+        Returns:
+            长格式DataFrame
+        """
+        valid = ~np.isnan(self.fields["close"])
+        rows, cols = np.nonzero(valid)
+        data = {date_col: self.dates[rows], symbol_col: self.symbols[cols]}
+        for name, array in values.items():
+            data[name] = array[rows, cols]
+        return pd.DataFrame(data)
+
+
+def compute_panel_indicators(
+    panel: Panel,
+    indicators: List[Any] = None,
+    dtype: Any = np.float64
+) -> Dict[str, np.ndarray]:
+    """对面板中的所有合约一次性计算技术指标
+
+    沿时间轴对整个二维数组做向量化计算，不再逐个合约循环。各合约历史长度不同（上市/退市时间不同）时，
+    结果与逐个合约调用compute_indicators一致；合约中途缺失的K线按NaN处理，跨越缺失的窗口结果为NaN。
+
+    Args:
+        panel: 多合约行情面板
+        indicators: 指标请求列表，格式见technical_analysis.parse_indicator_spec
+        dtype: 指标的数值类型
+
+    Returns:
+        {指标列名: (时间 × 合约)二维数组}，没有K线的位置为NaN
+    """
+    valid = ~np.isnan(panel.fields["close"])
+    ctx = IndicatorContext(panel.fields, dtype, valid=valid)
+    columns: Dict[str, np.ndarray] = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for spec in indicators or DEFAULT_INDICATORS:
+            indicator, params = parse_indicator_spec(spec)
+            columns.update(indicator.func(ctx, **params))
+    return {name: np.where(valid, values, np.nan).astype(dtype, copy=False) for name, values in columns.items()}
+
+
+def latest_values(panel: Panel, values: Dict[str, np.ndarray], offset: int = 0) -> pd.DataFrame:
+    """取每个合约最后一根（或倒数第offset+1根）K线的值
+
+    Args:
+        panel: 多合约行情面板
+        values: {列名: 二维数组}
+        offset: 0表示最后一根K线，1表示倒数第二根
+
+    Returns:
+        以合约为索引的DataFrame，K线不足的合约为NaN
+    """
+    valid = ~np.isnan(panel.fields["close"])
+    counts = valid.sum(axis=0)
+    # 每个合约第offset+1根有效K线（从后往前数）的行号
+    rank_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    target = valid & (rank_from_end == offset + 1)
+    has_row = counts > offset
+    row_index = np.argmax(target, axis=0)
+    cols = np.arange(len(panel.symbols))
+    result = {
+        name: np.where(has_row, array[row_index, cols], np.nan)
+        for name, array in values.items()
+    }
+    frame = pd.DataFrame(result, index=panel.symbols)
+    frame.insert(0, "date", pd.Series(panel.dates[row_index], index=panel.symbols).where(has_row))
+    return frame
@@ -0,0 +1,357 @@
+"""AI分析提示词构造
+
+把实时行情、日线、技术指标和新闻压缩成紧凑的文本：数值取整、去掉中间列，
+技术指标汇总为趋势、交叉、布林带位置等派生特征，新闻按相关度和时效排序后截断，
+整体控制在token预算之内。
+"""
+import logging
+import math
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import LLM_CACHE_PRICE_BAND, PROMPT_TOKEN_BUDGET, PROMPT_NEWS_MAX_CHARS
+from ohlcv_store import last_finalized_date
+
+logger = logging.getLogger("futures-mcp")
+
+SYSTEM_PROMPT = "你是一个专业的期货分析师，请根据提供的数据进行简明扼要的分析。"
+
+# 实时行情中保留的字段及其中文名
+QUOTE_FIELDS = {
+    "name": "名称",
+    "symbol": "合约",
+    "trade": "最新价",
+    "changepercent": "涨跌幅%",
+    "open": "开盘",
+    "high": "最高",
+    "low": "最低",
+    "presettlement": "昨结算",
+    "volume": "成交量",
+    "position": "持仓量",
+    "ticktime": "时间",
+}
+
+# 缓存键中原样保留的行情字段；最新价按涨跌幅分档后加入，最高/最低价、成交量、持仓量和时间逐笔变化，不参与缓存键
+SNAPSHOT_QUOTE_FIELDS = ("name", "symbol", "open", "presettlement")
+
+# K线表中保留的列
+BAR_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+# 判断交叉时回看的K线数
+CROSS_LOOKBACK = 5
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计文本的token数：中文字符约1个token，其他字符约4个字符1个token"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _fmt(value: Any, digits: int = 2) -> str:
+    """数值取整并去掉多余的0，其他类型转为字符串"""
+    if isinstance(value, (bool, np.bool_)):
+        return str(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        if not np.isfinite(value):
+            return ""
+        text = f"{float(value):.{digits}f}"
+        # 只去掉小数部分多余的0，整数部分的0是有效数字
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return text if text not in ("", "-0") else "0"
+    return str(value)
+
+
+def format_quote(quote: Dict[str, Any]) -> str:
+    """实时行情：只保留关键字段"""
+    if not quote or "error" in quote:
+        return "暂无"
+    items = []
+    for key, label in QUOTE_FIELDS.items():
+        value = quote.get(key)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        items.append(f"{label}={_fmt(value)}")
+    return " ".join(items)
+
+
+def format_bars(history: Optional[pd.DataFrame], rows: int) -> str:
+    """最近rows根K线，CSV格式，表头只出现一次"""
+    if history is None or history.empty or rows <= 0:
+        return "暂无"
+    bars = history[[column for column in BAR_COLUMNS if column in history.columns]].tail(rows)
+    lines = [",".join(bars.columns)]
+    for row in bars.itertuples(index=False):
+        cells = []
+        for column, value in zip(bars.columns, row):
+            if column == "date":
+                cells.append(pd.Timestamp(value).strftime("%m-%d"))
+            else:
+                cells.append(_fmt(value, 0 if column == "volume" else 2))
+        lines.append(",".join(cells))
+    return "\n".join(lines)
+
+
+def _last(df: pd.DataFrame, column: str) -> float:
+    if column not in df.columns:
+        return np.nan
+    return float(df[column].iloc[-1])
+
+
+def _cross(df: pd.DataFrame, fast: str, slow: str) -> Optional[Tuple[str, int]]:
+    """最近CROSS_LOOKBACK根K线内fast与slow的最后一次交叉，返回(方向, 距今K线数)"""
+    if fast not in df.columns or slow not in df.columns:
+        return None
+    diff = (df[fast] - df[slow]).to_numpy(dtype=np.float64)[-(CROSS_LOOKBACK + 1):]
+    sign = np.sign(diff)
+    for i in range(len(sign) - 1, 0, -1):
+        if sign[i - 1] <= 0 < sign[i]:
+            return "金叉", len(sign) - 1 - i
+        if sign[i - 1] >= 0 > sign[i]:
+            return "死叉", len(sign) - 1 - i
+    return None
+
+
+def _cross_text(cross: Optional[Tuple[str, int]]) -> str:
+    if cross is None:
+        return ""
+    direction, bars_ago = cross
+    return f"，{'今日' if bars_ago == 0 else f'{bars_ago}日前'}{direction}"
+
+
+def summarize_indicators(df: Optional[pd.DataFrame]) -> List[str]:
+    """把技术指标汇总为派生特征，缺少对应列或值为NaN的特征会被跳过"""
+    if df is None or df.empty:
+        return []
+    close = _last(df, "close")
+    features = []
+
+    averages = [(column, _last(df, column)) for column in ("MA5", "MA10", "MA20", "MA60")]
+    averages = [(column, value) for column, value in averages if not np.isnan(value)]
+    if len(averages) >= 2:
+        values = [value for _, value in averages]
+        if all(a > b for a, b in zip(values, values[1:])):
+            trend = "多头排列"
+        elif all(a < b for a, b in zip(values, values[1:])):
+            trend = "空头排列"
+        else:
+            trend = "均线交织"
+        detail = " ".join(f"{column}={_fmt(value)}" for column, value in averages)
+        features.append(f"趋势: {trend}（{detail}）")
+        ma20 = _last(df, "MA20")
+        if not np.isnan(ma20) and not np.isnan(close):
+            features.append(f"收盘价相对MA20: {_fmt((close / ma20 - 1) * 100)}%")
+
+    macd, signal, hist = _last(df, "MACD"), _last(df, "Signal"), _last(df, "MACD_Hist")
+    if not np.isnan(macd) and not np.isnan(signal):
+        momentum = ""
+        if "MACD_Hist" in df.columns and len(df) >= 2 and not np.isnan(hist):
+            momentum = "，柱线放大" if abs(hist) > abs(float(df["MACD_Hist"].iloc[-2])) else "，柱线缩小"
+        features.append(
+            f"MACD: DIF={_fmt(macd)} DEA={_fmt(signal)} {'零轴上方' if macd > 0 else '零轴下方'}"
+            f"{momentum}{_cross_text(_cross(df, 'MACD', 'Signal'))}"
+        )
+
+    rsi = _last(df, "RSI")
+    if not np.isnan(rsi):
+        zone = "超买" if rsi >= 70 else "超卖" if rsi <= 30 else "中性"
+        features.append(f"RSI14: {_fmt(rsi, 1)}（{zone}）")
+
+    upper, lower, middle = _last(df, "BB_Upper"), _last(df, "BB_Lower"), _last(df, "BB_Middle")
+    if not any(np.isnan(value) for value in (upper, lower, middle, close)) and upper > lower:
+        position = (close - lower) / (upper - lower) * 100
+        width = (upper - lower) / middle * 100
+        features.append(f"布林带: 位置{_fmt(position, 0)}%（0=下轨，100=上轨），带宽{_fmt(width)}%")
+
+    k, d, j = _last(df, "K"), _last(df, "D"), _last(df, "J")
+    if not any(np.isnan(value) for value in (k, d, j)):
+        features.append(f"KDJ: K={_fmt(k, 1)} D={_fmt(d, 1)} J={_fmt(j, 1)}{_cross_text(_cross(df, 'K', 'D'))}")
+
+    volume, volume_ma = _last(df, "volume"), _last(df, "Volume_MA5")
+    if not np.isnan(volume) and not np.isnan(volume_ma) and volume_ma > 0:
+        features.append(f"成交量: 为5日均量的{_fmt(volume / volume_ma)}倍")
+    return features
+
+
+def rank_news(news: Optional[pd.DataFrame], symbol: str, now: Optional[datetime] = None) -> List[Tuple[str, str]]:
+    """按相关度（提及次数）和时效排序新闻，内容截断到PROMPT_NEWS_MAX_CHARS
+
+    Args:
+        news: 包含date和title列的新闻DataFrame
+        symbol: 期货品种或代码
+        now: 计算时效的当前时间，默认当前时间
+
+    Returns:
+        [(时间, 内容)]，最相关的在前
+    """
+    if news is None or news.empty:
+        return []
+    now = pd.Timestamp(now or datetime.now())
+    dates = pd.to_datetime(news["date"], errors="coerce")
+    texts = news["title"].fillna("").astype(str)
+    mentions = texts.str.count(re.escape(symbol)).clip(lower=1)
+    age_days = ((now - dates).dt.total_seconds() / 86400).clip(lower=0).fillna(30)
+    scores = (mentions / (1 + age_days)).to_numpy()
+    ranked = []
+    for i in np.argsort(-scores, kind="stable"):
+        text = re.sub(r"\s+", " ", texts.iloc[i]).strip()
+        if len(text) > PROMPT_NEWS_MAX_CHARS:
+            text = text[:PROMPT_NEWS_MAX_CHARS] + "…"
+        date = dates.iloc[i]
+        ranked.append(("" if pd.isna(date) else date.strftime("%m-%d %H:%M"), text))
+    return ranked
+
+
+def _completed(df: Optional[pd.DataFrame], now: Optional[datetime]) -> Optional[pd.DataFrame]:
+    """去掉未收盘交易日的K线"""
+    if df is None or df.empty or "date" not in df.columns:
+        return df
+    cutoff = pd.Timestamp(last_finalized_date(now)) + pd.Timedelta(days=1)
+    return df[pd.to_datetime(df["date"]) < cutoff]
+
+
+def _number(value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return number if np.isfinite(number) else np.nan
+
+
+def price_band(quote: Dict[str, Any], reference: float = np.nan, band: float = LLM_CACHE_PRICE_BAND) -> Optional[str]:
+    """最新价所在的涨跌幅档位
+
+    涨跌幅相对昨结算价计算，缺少昨结算价时相对reference（通常为最近一根已收盘K线的收盘价），
+    再按band向下取整到档位，例如band=0.5时+1.2%落在[1.0%, 1.5%)档。
+
+    Args:
+        quote: 实时行情
+        reference: 缺少昨结算价时的参考价
+        band: 档位宽度（%），0表示返回精确价格
+
+    Returns:
+        档位下限（%）或精确价格，缺少最新价时返回None
+    """
+    trade = _number(quote.get("trade"))
+    if np.isnan(trade):
+        return None
+    if band <= 0:
+        return _fmt(trade)
+    base = _number(quote.get("presettlement"))
+    base = reference if np.isnan(base) or base <= 0 else base
+    if np.isnan(base) or base <= 0:
+        return _fmt(trade)
+    change = (trade / base - 1) * 100
+    return f"{_fmt(math.floor(change / band + 1e-9) * band)}%"
+
+
+def analysis_snapshot(
+    symbol: str,
+    quote: Optional[Dict[str, Any]],
+    history: Optional[pd.DataFrame],
+    indicators: Optional[pd.DataFrame],
+    news: Optional[pd.DataFrame],
+    bars: int = 5,
+    news_limit: int = 5,
+    now: Optional[datetime] = None,
+    band: float = LLM_CACHE_PRICE_BAND
+) -> Dict[str, Any]:
+    """AI分析输入的规范化快照，用于计算分析结果的缓存键
+
+    只使用已收盘的K线及其技术信号、行情中盘中不变的字段、最新价的涨跌幅档位和新闻标题，
+    同一根K线上价格没有跨档的请求得到相同的快照。其他参数与build_analysis_messages相同。
+
+    Args:
+        now: 判断K线是否已收盘的当前时间，默认当前时间
+        band: 最新价的档位宽度（%），见price_band
+
+    Returns:
+        可序列化的字典
+    """
+    history = _completed(history, now)
+    indicators = _completed(indicators if indicators is not None else history, now)
+    bar_date = None
+    if history is not None and not history.empty and "date" in history.columns:
+        bar_date = pd.Timestamp(history["date"].iloc[-1]).strftime("%Y-%m-%d")
+    quote_fields = {}
+    if quote and "error" not in quote:
+        for key in SNAPSHOT_QUOTE_FIELDS:
+            value = quote.get(key)
+            if value is not None and not (isinstance(value, float) and math.isnan(value)):
+                quote_fields[key] = _fmt(value)
+        reference = _last(history, "close") if history is not None and not history.empty else np.nan
+        quote_fields["price_band"] = price_band(quote, reference, band)
+    return {
+        "symbol": symbol,
+        "bar_date": bar_date,
+        "quote": quote_fields,
+        "bars": format_bars(history, bars),
+        "signals": summarize_indicators(indicators),
+        "news": sorted(text for _, text in rank_news(news, symbol, now)[:news_limit]),
+    }
+
+
+def build_analysis_messages(
+    symbol: str,
+    quote: Optional[Dict[str, Any]],
+    history: Optional[pd.DataFrame],
+    indicators: Optional[pd.DataFrame],
+    news: Optional[pd.DataFrame],
+    budget: int = PROMPT_TOKEN_BUDGET,
+    bars: int = 5,
+    news_limit: int = 5
+) -> List[Dict[str, str]]:
+    """构造AI分析的消息列表，估计的token数不超过预算
+
+    行情、技术信号和K线优先；剩余预算按排序依次加入新闻。超出预算时先去掉新闻，
+    再减少K线条数。
+
+    Args:
+        symbol: 期货品种，例如 豆粕
+        quote: 实时行情（主力合约一行）
+        history: 日线数据
+        indicators: 带技术指标的日线数据，至少包含最近几根K线
+        news: 包含date和title列的新闻DataFrame
+        budget: 提示词的token预算
+        bars: 最多包含的K线条数
+        news_limit: 最多包含的新闻条数
+
+    Returns:
+        消息列表
+    """
+    header = f"请分析{symbol}的以下数据：\n[实时行情] {format_quote(quote)}\n"
+    features = summarize_indicators(indicators if indicators is not None else history)
+    signals = "[技术信号]\n" + ("\n".join(features) if features else "暂无") + "\n"
+    base_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(header) + estimate_tokens(signals)
+
+    if history is None or history.empty:
+        bars = 0
+    for rows in range(bars, -1, -1):
+        table = f"[近{rows}日K线]\n{format_bars(history, rows)}\n" if rows else ""
+        if base_tokens + estimate_tokens(table) <= budget or rows == 0:
+            break
+    content = header + signals + table
+    tokens = base_tokens + estimate_tokens(table)
+
+    items = []
+    for date, text in rank_news(news, symbol)[:news_limit]:
+        line = f"{len(items) + 1}. ({date}) {text}\n" if date else f"{len(items) + 1}. {text}\n"
+        cost = estimate_tokens(line) + (estimate_tokens("[相关新闻]\n") if not items else 0)
+        if tokens + cost > budget:
+            break
+        items.append(line)
+        tokens += cost
+    if items:
+        content += "[相关新闻]\n" + "".join(items)
+
+    logger.info(f"{symbol}分析提示词: 约{tokens}个token（预算{budget}），K线{rows}条，新闻{len(items)}条")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content.rstrip("\n")},
+    ]
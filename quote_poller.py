@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config import AKSHARE_MAX_WORKERS, QUOTE_POLL_INTERVAL, QUOTE_POLL_SYMBOLS
+from contract_resolver import main_contract_resolver
+from data_access import fetch_realtime, fetch_symbol_universe
+
+logger = logging.getLogger("futures-mcp")
+
+
+class QuotePoller:
+    """后台批量刷新实时行情的轮询器
+
+    按固定周期批量获取关注列表（为空时为全部品种）的实时行情，保存在内存快照表中，
+    查询时直接读取快照，不再为每次请求访问上游。每轮刷新顺带更新主力合约映射。
+    """
+
+    def __init__(
+        self,
+        symbols: Optional[List[str]] = QUOTE_POLL_SYMBOLS,
+        interval: float = QUOTE_POLL_INTERVAL,
+        max_workers: int = AKSHARE_MAX_WORKERS
+    ):
+        """
+        Args:
+            symbols: 关注的品种列表，为空时轮询ak.futures_symbol_mark()中的全部品种
+            interval: 刷新周期（秒）
+            max_workers: 每轮刷新的并发请求数
+        """
+        self.symbols = list(symbols) if symbols else None
+        self.interval = interval
+        self.max_workers = max_workers
+        self._snapshots: Dict[str, Tuple[pd.DataFrame, float]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_cycle: Dict[str, Any] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll_once(self) -> Dict[str, Any]:
+        """刷新一轮全部关注品种的实时行情
+
+        Returns:
+            本轮刷新的统计
+        """
+        start = time.perf_counter()
+        symbols = self.symbols or fetch_symbol_universe()['symbol'].tolist()
+
+        def refresh(symbol):
+            try:
+                quotes = fetch_realtime(symbol, refresh=True)
+            except Exception as e:
+                logger.warning(f"轮询{symbol}实时行情失败: {str(e)}")
+                return False
+            if quotes.empty:
+                return False
+            fetched_at = time.time()
+            main_contract_resolver.observe(symbol, quotes)
+            with self._lock:
+                self._snapshots[symbol] = (quotes, fetched_at)
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="quote-poller") as executor:
+            results = list(executor.map(refresh, symbols))
+        refreshed = sum(results)
+        self.last_cycle = {
+            "total": len(symbols),
+            "refreshed": refreshed,
+            "failed": len(symbols) - refreshed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        logger.debug(f"实时行情轮询完成: {self.last_cycle}")
+        return self.last_cycle
+
+    def snapshot(self, symbol: str) -> Optional[Tuple[pd.DataFrame, float]]:
+        """返回品种的快照(实时行情, 获取时间戳)，没有快照时返回None"""
+        with self._lock:
+            return self._snapshots.get(symbol)
+
+    def staleness(self, fetched_at: float) -> Dict[str, Any]:
+        """快照的新鲜程度：超过两个刷新周期视为过期"""
+        age = time.time() - fetched_at
+        return {"staleness_seconds": round(age, 1), "stale": age > 2 * self.interval}
+
+    def start(self) -> threading.Thread:
+        """启动后台轮询线程，已在运行时直接返回"""
+        with self._lock:
+            if self.running:
+                return self._thread
+
+            def loop():
+                while True:
+                    cycle_start = time.monotonic()
+                    try:
+                        self.poll_once()
+                    except Exception as e:
+                        logger.warning(f"实时行情轮询失败: {str(e)}")
+                    time.sleep(max(0.0, self.interval - (time.monotonic() - cycle_start)))
+
+            self._thread = threading.Thread(target=loop, name="quote-poller", daemon=True)
+            self._thread.start()
+        logger.info(f"实时行情轮询已启动，周期{self.interval}秒，范围: {self.symbols or '全部品种'}")
+        return self._thread
+
+
+# 默认的实时行情轮询器
+quote_poller = QuotePoller()
@@ -0,0 +1,131 @@
+"""按交易时段重采样分钟K线
+
+1分钟K线只从上游获取一次，5/15/30/60分钟和日线都在本地由它聚合，不同周期不再各自请求上游。
+周期K线不跨越交易时段：小节休息、午休和夜盘到日盘之间的间隔会切分出新的时段，
+每个时段内从第一根K线起每N根分钟K线聚合为一根。夜盘K线归属下一个交易日。
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# 支持的K线周期及对应的分钟数，daily按交易日聚合
+INTERVALS = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "daily": None}
+
+# 常见写法到标准周期的映射
+INTERVAL_ALIASES = {
+    "1min": "1m", "5min": "5m", "15min": "15m", "30min": "30m", "60min": "60m", "1h": "60m",
+    "1d": "daily", "d": "daily", "day": "daily",
+}
+
+# 相邻分钟K线的间隔超过该值时视为进入新的交易时段
+SESSION_GAP = pd.Timedelta(minutes=10)
+# 日盘时间范围（小时），其余时间的K线属于夜盘
+DAY_SESSION_HOURS = (6, 18)
+# 商品期货日盘的交易分钟数，用于估算每个交易日的K线数
+DAY_SESSION_MINUTES = 225
+# 夜盘K线向后查找所属交易日时，允许的最大间隔（覆盖长假），超过时按下一个工作日推算
+MAX_NIGHT_LOOKAHEAD = pd.Timedelta(days=10)
+
+# 聚合规则，持仓量取时段末的值
+AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+    "hold": "last",
+}
+
+
+def parse_interval(interval: Optional[str]) -> str:
+    """解析K线周期
+
+    Args:
+        interval: 例如 5m、15min、60m、1h、daily，默认daily
+
+    Returns:
+        标准周期名称
+    """
+    name = (interval or "daily").strip().lower()
+    name = INTERVAL_ALIASES.get(name, name)
+    if name not in INTERVALS:
+        raise ValueError(f"不支持的K线周期: {interval}，可选: {', '.join(INTERVALS)}")
+    return name
+
+
+def bars_per_day(interval: str) -> float:
+    """每个交易日至少包含的K线数（只按日盘估算）"""
+    minutes = INTERVALS[parse_interval(interval)]
+    return 1.0 if minutes is None else DAY_SESSION_MINUTES / minutes
+
+
+def trading_days(dates: pd.Series) -> pd.Series:
+    """每根分钟K线所属的交易日
+
+    日盘K线属于当天；夜盘K线（含凌晨部分）属于其后第一根日盘K线所在的交易日，
+    数据中还没有后续日盘时按下一个工作日推算（周五夜盘属于下周一）。
+
+    Args:
+        dates: 分钟K线时间，升序
+
+    Returns:
+        与dates对齐的交易日（午夜零点的Timestamp）
+    """
+    hours = dates.dt.hour
+    day_session = (hours >= DAY_SESSION_HOURS[0]) & (hours < DAY_SESSION_HOURS[1])
+    calendar_days = dates.dt.normalize()
+    days = calendar_days.where(day_session).bfill()
+
+    # 按工作日推算：晚间K线属于下一个工作日，凌晨K线属于当天（周末顺延到周一）
+    evening = (hours >= DAY_SESSION_HOURS[1]).to_numpy()
+    base = calendar_days.to_numpy().astype("datetime64[D]")
+    estimated = np.busday_offset(base, evening.astype(int), roll="forward").astype("datetime64[ns]")
+    estimated = pd.Series(estimated, index=dates.index)
+    fallback = days.isna() | (days - calendar_days > MAX_NIGHT_LOOKAHEAD)
+    return days.where(~fallback, estimated)
+
+
+def resample_bars(df: pd.DataFrame, interval: str, days: Optional[pd.Series] = None) -> pd.DataFrame:
+    """把1分钟K线聚合为指定周期
+
+    Args:
+        df: 包含date、open、high、low、close、volume列的1分钟K线，按时间升序
+        interval: 目标周期，见INTERVALS
+        days: 每根K线所属的交易日，默认由trading_days计算
+
+    Returns:
+        聚合后的K线。分钟周期的date为时段内最后一根分钟K线的时间，日线的date为交易日
+    """
+    minutes = INTERVALS[parse_interval(interval)]
+    if minutes == 1 or df.empty:
+        return df.reset_index(drop=True)
+    if days is None:
+        days = trading_days(df["date"])
+    rules = {column: rule for column, rule in AGGREGATIONS.items() if column in df.columns}
+
+    if minutes is None:
+        bars = df.groupby(days.to_numpy(), sort=True).agg(rules)
+        bars.insert(0, "date", bars.index)
+        return bars.reset_index(drop=True)
+
+    dates = df["date"]
+    new_session = (dates.diff() > SESSION_GAP) | (days != days.shift())
+    session = new_session.cumsum().to_numpy()
+    session_start = dates.groupby(session).transform("first")
+    bucket = ((dates - session_start) // pd.Timedelta(minutes=minutes)).to_numpy()
+    rules = {"date": "last", **rules}
+    return df.groupby([session, bucket], sort=False).agg(rules).reset_index(drop=True)
+
+
+def session_start(trading_day: str) -> pd.Timestamp:
+    """交易日的夜盘开始时间（前一个工作日的傍晚），用于按交易日裁剪分钟K线
+
+    Args:
+        trading_day: 交易日，格式：YYYYMMDD
+
+    Returns:
+        前一个工作日DAY_SESSION_HOURS[1]点
+    """
+    previous = np.busday_offset(np.datetime64(pd.Timestamp(trading_day).date()), -1, roll="backward")
+    return pd.Timestamp(previous) + pd.Timedelta(hours=DAY_SESSION_HOURS[1])
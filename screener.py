@@ -0,0 +1,155 @@
+import operator
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from panel_indicators import Panel, compute_panel_indicators, latest_values
+from technical_analysis import DEFAULT_INDICATORS
+
+# 比较运算符
+COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# 交叉运算符及其中文别名
+CROSSES = {
+    "crosses_above": "crosses_above",
+    "crosses_below": "crosses_below",
+    "上穿": "crosses_above",
+    "下穿": "crosses_below",
+}
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)"
+_OPERAND = rf"(?:{_NUMBER}|[A-Za-z_][A-Za-z0-9_]*)"
+_CONDITION_PATTERN = re.compile(
+    rf"^\s*({_OPERAND})\s*(<=|>=|==|!=|<|>|crosses_above|crosses_below|上穿|下穿)\s*({_OPERAND})\s*$"
+)
+
+
+class Condition:
+    """筛选条件，例如 RSI < 30、MACD crosses_above Signal、close > MA20"""
+
+    def __init__(self, text: str, left: Any, op: str, right: Any):
+        self.text = text
+        self.left = left
+        self.op = op
+        self.right = right
+
+    @property
+    def columns(self) -> List[str]:
+        """条件引用的列名"""
+        return [operand for operand in (self.left, self.right) if isinstance(operand, str)]
+
+    @property
+    def needs_previous(self) -> bool:
+        """交叉条件需要上一根K线的值"""
+        return self.op in ("crosses_above", "crosses_below")
+
+
+def _parse_operand(token: str) -> Any:
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def parse_condition(text: str) -> Condition:
+    """解析筛选条件，不使用eval
+
+    Args:
+        text: 条件字符串，左右两边为指标列名、行情字段（open/high/low/close/volume）或数字，
+            运算符为 <、<=、>、>=、==、!=、crosses_above（上穿）、crosses_below（下穿）
+
+    Returns:
+        解析后的条件
+    """
+    match = _CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"无法解析筛选条件: {text}")
+    left, op, right = match.groups()
+    return Condition(text.strip(), _parse_operand(left), CROSSES.get(op, op), _parse_operand(right))
+
+
+def _operand_values(operand: Any, frame: pd.DataFrame) -> Any:
+    if isinstance(operand, str):
+        return frame[operand].to_numpy(dtype=np.float64)
+    return operand
+
+
+def evaluate_conditions(
+    conditions: List[Condition],
+    latest: pd.DataFrame,
+    previous: Optional[pd.DataFrame] = None
+) -> np.ndarray:
+    """对所有合约同时求值，返回同时满足全部条件的布尔掩码
+
+    Args:
+        conditions: 筛选条件
+        latest: 每个合约最后一根K线的值
+        previous: 每个合约倒数第二根K线的值，有交叉条件时必需
+
+    Returns:
+        与latest行对齐的布尔数组
+    """
+    mask = np.ones(len(latest), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        for condition in conditions:
+            left = _operand_values(condition.left, latest)
+            right = _operand_values(condition.right, latest)
+            if condition.needs_previous:
+                prev_left = _operand_values(condition.left, previous)
+                prev_right = _operand_values(condition.right, previous)
+                if condition.op == "crosses_above":
+                    matched = (prev_left <= prev_right) & (left > right)
+                else:
+                    matched = (prev_left >= prev_right) & (left < right)
+            else:
+                matched = COMPARISONS[condition.op](left, right)
+            # NaN参与的比较结果均为False，指标未预热完成的合约不会被选中
+            mask &= np.asarray(matched, dtype=bool)
+    return mask
+
+
+def screen_frames(
+    frames: Dict[str, pd.DataFrame],
+    conditions: List[str],
+    indicators: Optional[List[Any]] = None
+) -> pd.DataFrame:
+    """在多个合约上按条件筛选最后一根K线
+
+    所有合约拼成一个面板后一次性计算指标、一次性求值，不逐个合约循环。
+
+    Args:
+        frames: {合约: 日线DataFrame}
+        conditions: 条件字符串列表，全部满足才算匹配
+        indicators: 需要计算的指标，格式见technical_analysis.parse_indicator_spec，默认计算常用指标
+
+    Returns:
+        以合约为索引的DataFrame，只包含匹配的合约，列为date和条件引用的列
+    """
+    parsed = [parse_condition(text) for text in conditions]
+    if not parsed:
+        raise ValueError("至少需要一个筛选条件")
+    referenced = list(dict.fromkeys(column for condition in parsed for column in condition.columns))
+    if not frames:
+        return pd.DataFrame(columns=["date"] + referenced)
+
+    panel = Panel.from_frames(frames)
+    values = dict(panel.fields)
+    values.update(compute_panel_indicators(panel, indicators or DEFAULT_INDICATORS))
+    unknown = [column for column in referenced if column not in values]
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(unknown)}，可用的列: {', '.join(values)}")
+
+    values = {column: values[column] for column in referenced}
+    latest = latest_values(panel, values)
+    previous = latest_values(panel, values, offset=1) if any(c.needs_previous for c in parsed) else None
+    mask = evaluate_conditions(parsed, latest, previous)
+    return latest[mask]
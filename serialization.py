@@ -0,0 +1,136 @@
+import json
+from datetime import datetime, date, time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+# 自定义JSON序列化函数
+def json_serial(obj):
+    """JSON序列化函数，处理日期/时间和其他特殊类型"""
+    if isinstance(obj, (datetime, pd.Timestamp)):
+        return obj.isoformat()
+    if isinstance(obj, pd.DatetimeIndex):
+        return obj.astype(str).tolist()
+    if isinstance(obj, pd.Series):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient='records')
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def frame_to_records(df: pd.DataFrame) -> list:
+    """DataFrame转换为记录列表，日期列转换为字符串
+
+    Args:
+        df: 待转换的DataFrame
+
+    Returns:
+        记录列表
+    """
+    if 'date' in df.columns:
+        df = df.assign(date=df['date'].astype(str))
+    return df.to_dict(orient='records')
+
+
+def dumps_frame(df: pd.DataFrame, **kwargs: Any) -> str:
+    """DataFrame序列化为JSON字符串（MCP工具的返回格式）
+
+    Args:
+        df: 待序列化的DataFrame
+        **kwargs: 传给json.dumps的额外参数
+
+    Returns:
+        JSON字符串
+    """
+    return json.dumps(frame_to_records(df), indent=2, default=json_serial, **kwargs)
+
+
+# MCP工具支持的DataFrame返回格式
+#   legacy:   缩进的记录列表（默认，与原有返回一致）
+#   records:  压缩的记录列表
+#   columnar: 列式，{"schema": [...], "rows": N, "data": {列名: [值...]}}，列名只出现一次
+FRAME_FORMATS = ("legacy", "records", "columnar")
+
+_SCHEMA_TYPES = {"f": "float", "i": "int", "u": "int", "b": "bool", "M": "datetime"}
+
+
+def _column_values(series: pd.Series) -> list:
+    """整列转换为原生Python列表，缺失值为None
+
+    按列向量化转换，不对每个值调用json_serial；浮点数保留完整精度。
+    """
+    kind = series.dtype.kind
+    if kind in "iub":
+        return series.tolist()
+    if kind == "f":
+        array = series.to_numpy()
+        missing = np.isnan(array)
+        return np.where(missing, None, array).tolist() if missing.any() else array.tolist()
+    missing = series.isna().to_numpy()
+    values = (series.astype(str) if kind == "M" else series).to_numpy(dtype=object)
+    if missing.any():
+        values = values.copy()
+        values[missing] = None
+    return values.tolist()
+
+
+def frame_to_columns(df: pd.DataFrame) -> Dict[str, list]:
+    """DataFrame转换为{列名: 值列表}
+
+    Args:
+        df: 待转换的DataFrame
+
+    Returns:
+        列式字典，日期列为字符串，缺失值为None
+    """
+    return {str(column): _column_values(df[column]) for column in df.columns}
+
+
+def frame_schema(df: pd.DataFrame) -> List[Dict[str, str]]:
+    """列名与类型
+
+    Args:
+        df: DataFrame
+
+    Returns:
+        [{"name": 列名, "type": float/int/bool/datetime/string}]
+    """
+    return [
+        {"name": str(column), "type": _SCHEMA_TYPES.get(dtype.kind, "string")}
+        for column, dtype in df.dtypes.items()
+    ]
+
+
+def encode_frame(df: pd.DataFrame, format: str = "legacy") -> str:
+    """按指定格式把DataFrame序列化为JSON字符串
+
+    records和columnar格式不缩进、缺失值输出为null，是合法的JSON；legacy格式与原有返回完全一致。
+
+    Args:
+        df: 待序列化的DataFrame
+        format: legacy、records或columnar
+
+    Returns:
+        JSON字符串
+    """
+    if format == "legacy":
+        return dumps_frame(df)
+    if format not in FRAME_FORMATS:
+        raise ValueError(f"不支持的格式: {format}，可选: {', '.join(FRAME_FORMATS)}")
+    columns = frame_to_columns(df)
+    if format == "columnar":
+        payload = {"schema": frame_schema(df), "rows": len(df), "data": columns}
+    else:
+        names = list(columns)
+        payload = [dict(zip(names, row)) for row in zip(*columns.values())]
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
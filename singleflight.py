@@ -0,0 +1,104 @@
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+import pandas as pd
+
+from data_access import run_blocking
+
+
+def _freeze(value: Any) -> Hashable:
+    """把参数转换为可哈希的形式，列表和字典按内容比较"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def call_key(func: Callable, *args: Any, **kwargs: Any) -> Hashable:
+    """按函数和规范化后的参数计算合并键
+
+    位置参数和关键字参数绑定到函数签名并补全默认值，
+    因此 f("豆粕") 与 f(symbol="豆粕") 得到相同的键。
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple(bound.arguments.items())
+    except (TypeError, ValueError):
+        arguments = (args, tuple(sorted(kwargs.items())))
+    return (func.__module__, func.__qualname__, _freeze(arguments))
+
+
+class SingleFlight:
+    """合并相同的进行中请求
+
+    同一时刻对同一函数、同一参数的多个调用只执行一次上游请求，其余调用等待并共享结果；
+    上游请求抛出的异常同样传递给所有等待者。请求完成后即移除，之后的调用重新请求
+    （结果缓存由cache.py负责）。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._coalesced_by_func: Dict[str, int] = {}
+
+    async def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """在线程池中执行阻塞函数，相同的进行中调用只执行一次
+
+        Args:
+            func: 阻塞函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值；DataFrame结果对每个调用方返回独立的副本，调用方可以放心修改
+        """
+        key = call_key(func, *args, **kwargs)
+        task = self._inflight.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(run_blocking(func, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        with self._lock:
+            self.calls += 1
+            if leader:
+                self.executed += 1
+            else:
+                self.coalesced += 1
+                name = func.__qualname__
+                self._coalesced_by_func[name] = self._coalesced_by_func.get(name, 0) + 1
+        # 某个调用方被取消时不影响共享的上游请求
+        result = await asyncio.shield(task)
+        if isinstance(result, pd.DataFrame):
+            return result.copy()
+        return result
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # 所有调用方都已取消时避免"异常未被获取"的警告
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """合并统计"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "coalesce_rate": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+                "inflight": len(self._inflight),
+                "coalesced_by_function": dict(self._coalesced_by_func),
+            }
+
+
+# MCP服务器共用的请求合并器
+singleflight = SingleFlight()
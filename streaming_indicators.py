@@ -0,0 +1,550 @@
+import math
+from collections import deque
+from typing import Any, Dict, List, Mapping
+
+import pandas as pd
+
+from technical_analysis import DEFAULT_INDICATORS, parse_indicator_spec
+
+NAN = float("nan")
+
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+
+class _Component:
+    """增量计算组件
+
+    每次push()都会记录撤销信息，undo()可以在O(1)时间内回到上一次push()之前的状态，
+    用于修正最后一根K线。状态可以导出为普通字典用于断点保存与恢复。
+    """
+
+    _deques: tuple = ()
+
+    def to_state(self) -> Dict[str, Any]:
+        state = {}
+        for key, value in self.__dict__.items():
+            state[key] = [list(item) if isinstance(item, list) else item for item in value] \
+                if key in self._deques else value
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "_Component":
+        component = cls.__new__(cls)
+        for key, value in state.items():
+            if key in cls._deques:
+                value = deque(value)
+            elif isinstance(value, list) and key == "_undo":
+                value = tuple(value)
+            component.__dict__[key] = value
+        return component
+
+
+class _Diff(_Component):
+    """一阶差分，第一个值为NaN"""
+
+    def __init__(self):
+        self.prev = NAN
+        self._undo = None
+
+    def push(self, value: float) -> float:
+        self._undo = (self.prev,)
+        result = value - self.prev
+        self.prev = value
+        return result
+
+    def undo(self) -> None:
+        self.prev, = self._undo
+        self._undo = None
+
+
+class _RollingSum(_Component):
+    """滚动窗口的和与平方和，用于滚动均值和标准差
+
+    窗口中有NaN或窗口未满时结果为NaN，与pandas的rolling一致。累加的是相对锚点的偏差，
+    并定期从窗口数据重新求和，以控制浮点误差；窗口内全部为同一个值时结果精确为该值，标准差为0。
+    """
+
+    _deques = ("values",)
+    RESUM_INTERVAL = 1000
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.anchor = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nan_count = 0
+        self.same_run = 0  # 末尾连续相同值的个数
+        self.pushes = 0
+        self._undo = None
+
+    def _add(self, value: float, sign: int) -> None:
+        if _is_nan(value):
+            self.nan_count += sign
+        else:
+            deviation = value - self.anchor
+            self.total += sign * deviation
+            self.total_sq += sign * deviation * deviation
+
+    def _resum(self) -> None:
+        valid = [value for value in self.values if not _is_nan(value)]
+        if not valid:
+            return
+        self.anchor = math.fsum(valid) / len(valid)
+        self.total = math.fsum(value - self.anchor for value in valid)
+        self.total_sq = math.fsum((value - self.anchor) ** 2 for value in valid)
+
+    def push(self, value: float) -> None:
+        if self.anchor is None and not _is_nan(value):
+            self.anchor = value
+        previous_run = self.same_run
+        self.same_run = self.same_run + 1 if self.values and self.values[-1] == value else 1
+        self.values.append(value)
+        self._add(value, 1)
+        removed = None
+        if len(self.values) > self.window:
+            removed = self.values.popleft()
+            self._add(removed, -1)
+        self._undo = (removed, previous_run)
+        self.pushes += 1
+        if self.pushes % self.RESUM_INTERVAL == 0:
+            self._resum()
+
+    def undo(self) -> None:
+        removed, self.same_run = self._undo
+        self._add(self.values.pop(), -1)
+        if removed is not None:
+            self.values.appendleft(removed)
+            self._add(removed, 1)
+        self.pushes -= 1
+        self._undo = None
+
+    def ready(self) -> bool:
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def mean(self) -> float:
+        if not self.ready():
+            return NAN
+        if self.same_run >= self.window:
+            return self.values[-1]
+        return self.anchor + self.total / self.window
+
+    def std(self) -> float:
+        if not self.ready() or self.window < 2:
+            return NAN
+        if self.same_run >= self.window:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.window) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _Cumulative(_Component):
+    """累计和"""
+
+    def __init__(self):
+        self.total = 0.0
+        self._undo = None
+
+    def push(self, value: float) -> float:
+        self._undo = (self.total,)
+        self.total += value
+        return self.total
+
+    def undo(self) -> None:
+        self.total, = self._undo
+        self._undo = None
+
+
+class _RollingExtreme(_Component):
+    """基于单调队列的滚动最小/最大值，每次更新均摊O(1)"""
+
+    _deques = ("values", "monotonic")
+
+    def __init__(self, window: int, mode: str):
+        self.window = window
+        self.mode = mode
+        self.values = deque()
+        self.monotonic = deque()  # [序号, 值]，队首为当前窗口的极值
+        self.index = 0
+        self.nan_count = 0
+        self._undo = None
+
+    def _dominated(self, existing: float, value: float) -> bool:
+        return existing >= value if self.mode == "min" else existing <= value
+
+    def push(self, value: float) -> None:
+        removed_value = None
+        self.values.append(value)
+        if _is_nan(value):
+            self.nan_count += 1
+        if len(self.values) > self.window:
+            removed_value = self.values.popleft()
+            if _is_nan(removed_value):
+                self.nan_count -= 1
+
+        popped_back = []
+        if not _is_nan(value):
+            while self.monotonic and self._dominated(self.monotonic[-1][1], value):
+                popped_back.append(self.monotonic.pop())
+            self.monotonic.append([self.index, value])
+        popped_front = None
+        if self.monotonic and self.monotonic[0][0] <= self.index - self.window:
+            popped_front = self.monotonic.popleft()
+        self._undo = (removed_value, popped_back, popped_front, not _is_nan(value))
+        self.index += 1
+
+    def undo(self) -> None:
+        removed_value, popped_back, popped_front, appended = self._undo
+        self.index -= 1
+        if popped_front is not None:
+            self.monotonic.appendleft(popped_front)
+        if appended:
+            self.monotonic.pop()
+        self.monotonic.extend(reversed(popped_back))
+        value = self.values.pop()
+        if _is_nan(value):
+            self.nan_count -= 1
+        if removed_value is not None:
+            self.values.appendleft(removed_value)
+            if _is_nan(removed_value):
+                self.nan_count += 1
+        self._undo = None
+
+    def value(self) -> float:
+        if len(self.values) < self.window or self.nan_count or not self.monotonic:
+            return NAN
+        return self.monotonic[0][1]
+
+
+class _EMA(_Component):
+    """指数加权平均（adjust=False），对NaN的处理与pandas的ewm一致"""
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        self.alpha = alpha
+        self.min_periods = max(min_periods, 1)
+        self.weighted = None
+        self.old_wt = 1.0
+        self.nobs = 0
+        self._undo = None
+
+    def push(self, value: float) -> float:
+        self._undo = (self.weighted, self.old_wt, self.nobs)
+        is_observation = not _is_nan(value)
+        self.nobs += is_observation
+        if self.weighted is None:
+            self.weighted = value
+        elif not _is_nan(self.weighted):
+            self.old_wt *= 1 - self.alpha
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * value) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = value
+        return self.value()
+
+    def undo(self) -> None:
+        self.weighted, self.old_wt, self.nobs = self._undo
+        self._undo = None
+
+    def value(self) -> float:
+        if self.weighted is None or self.nobs < self.min_periods:
+            return NAN
+        return self.weighted
+
+
+def _span_alpha(span: int) -> float:
+    return 2 / (span + 1)
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    # 与NumPy的除法语义一致：x/0为±inf，0/0为NaN
+    if denominator == 0:
+        if numerator == 0 or _is_nan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1, denominator)
+    return numerator / denominator
+
+
+_COMPONENT_TYPES = {cls.__name__: cls for cls in (_Diff, _RollingSum, _Cumulative, _RollingExtreme, _EMA)}
+
+
+class _StreamingIndicator:
+    """单个指标的增量计算器，由若干组件组成"""
+
+    def __init__(self, suffix: str, **params: Any):
+        self.suffix = suffix
+        self.params = params
+        self.components: Dict[str, _Component] = {}
+        self.build(**params)
+
+    def build(self, **params: Any) -> None:
+        raise NotImplementedError
+
+    def update(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def undo(self) -> None:
+        for component in self.components.values():
+            if component._undo is not None:
+                component.undo()
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            name: {"type": type(component).__name__, "state": component.to_state()}
+            for name, component in self.components.items()
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self.components = {
+            name: _COMPONENT_TYPES[item["type"]].from_state(item["state"])
+            for name, item in state.items()
+        }
+
+
+class _StreamingMA(_StreamingIndicator):
+    source = "close"
+    prefix = "MA"
+
+    def build(self, periods: List[int]) -> None:
+        for period in periods:
+            self.components[f"{self.prefix}{period}"] = _RollingSum(period)
+
+    def update(self, bar):
+        result = {}
+        for name, rolling in self.components.items():
+            rolling.push(bar[self.source])
+            result[name] = rolling.mean()
+        return result
+
+
+class _StreamingVolumeMA(_StreamingMA):
+    source = "volume"
+    prefix = "Volume_MA"
+
+
+class _StreamingMACD(_StreamingIndicator):
+    def build(self, fast: int, slow: int, signal: int) -> None:
+        self.components["fast"] = _EMA(_span_alpha(fast))
+        self.components["slow"] = _EMA(_span_alpha(slow))
+        self.components["signal"] = _EMA(_span_alpha(signal))
+
+    def update(self, bar):
+        macd = self.components["fast"].push(bar["close"]) - self.components["slow"].push(bar["close"])
+        signal = self.components["signal"].push(macd)
+        s = self.suffix
+        return {f"MACD{s}": macd, f"Signal{s}": signal, f"MACD_Hist{s}": macd - signal}
+
+
+class _StreamingRSI(_StreamingIndicator):
+    def build(self, period: int) -> None:
+        self.components["diff"] = _Diff()
+        self.components["gain"] = _RollingSum(period)
+        self.components["loss"] = _RollingSum(period)
+
+    def update(self, bar):
+        # 第一个差分为NaN，按0计入涨跌幅
+        delta = self.components["diff"].push(bar["close"])
+        self.components["gain"].push(delta if delta > 0 else 0.0)
+        self.components["loss"].push(-delta if delta < 0 else 0.0)
+        rs = _divide(self.components["gain"].mean(), self.components["loss"].mean())
+        return {f"RSI{self.suffix}": 100 - 100 / (1 + rs)}
+
+
+class _StreamingBB(_StreamingIndicator):
+    def build(self, period: int, std: float) -> None:
+        self.components["close"] = _RollingSum(period)
+
+    def update(self, bar):
+        rolling = self.components["close"]
+        rolling.push(bar["close"])
+        middle, deviation = rolling.mean(), rolling.std()
+        width = deviation * self.params["std"]
+        s = self.suffix
+        return {
+            f"BB_Middle{s}": middle,
+            f"BB_Std{s}": deviation,
+            f"BB_Upper{s}": middle + width,
+            f"BB_Lower{s}": middle - width,
+        }
+
+
+class _StreamingKDJ(_StreamingIndicator):
+    def build(self, n: int, m1: int, m2: int) -> None:
+        self.components["low"] = _RollingExtreme(n, "min")
+        self.components["high"] = _RollingExtreme(n, "max")
+        self.components["k"] = _EMA(1 / m1)
+        self.components["d"] = _EMA(1 / m2)
+
+    def update(self, bar):
+        self.components["low"].push(bar["low"])
+        self.components["high"].push(bar["high"])
+        low_n, high_n = self.components["low"].value(), self.components["high"].value()
+        rsv = _divide(bar["close"] - low_n, high_n - low_n) * 100
+        k = self.components["k"].push(rsv)
+        d = self.components["d"].push(k)
+        s = self.suffix
+        return {f"K{s}": k, f"D{s}": d, f"J{s}": 3 * k - 2 * d}
+
+
+def _true_range(bar, prev_close: float) -> float:
+    ranges = [bar["high"] - bar["low"], abs(bar["high"] - prev_close), abs(bar["low"] - prev_close)]
+    valid = [value for value in ranges if not _is_nan(value)]
+    return max(valid) if valid else NAN
+
+
+class _StreamingATR(_StreamingIndicator):
+    def build(self, period: int) -> None:
+        self.components["close"] = _Diff()
+        self.components["atr"] = _EMA(1 / period, min_periods=period)
+
+    def update(self, bar):
+        prev_close = self.components["close"].prev
+        self.components["close"].push(bar["close"])
+        return {f"ATR{self.suffix}": self.components["atr"].push(_true_range(bar, prev_close))}
+
+
+class _StreamingOBV(_StreamingIndicator):
+    def build(self) -> None:
+        self.components["diff"] = _Diff()
+        self.components["total"] = _Cumulative()
+
+    def update(self, bar):
+        delta = self.components["diff"].push(bar["close"])
+        direction = 0.0 if _is_nan(delta) or delta == 0 else math.copysign(1.0, delta)
+        return {"OBV": self.components["total"].push(direction * bar["volume"])}
+
+
+class _StreamingADX(_StreamingIndicator):
+    def build(self, period: int) -> None:
+        alpha = 1 / period
+        self.components["high"] = _Diff()
+        self.components["low"] = _Diff()
+        self.components["close"] = _Diff()
+        self.components["atr"] = _EMA(alpha, min_periods=period)
+        self.components["plus_dm"] = _EMA(alpha, min_periods=period)
+        self.components["minus_dm"] = _EMA(alpha, min_periods=period)
+        self.components["adx"] = _EMA(alpha, min_periods=period)
+
+    def update(self, bar):
+        c = self.components
+        up = c["high"].push(bar["high"])
+        down = -c["low"].push(bar["low"])
+        prev_close = c["close"].prev
+        c["close"].push(bar["close"])
+        atr = c["atr"].push(_true_range(bar, prev_close))
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+        plus_di = 100 * _divide(c["plus_dm"].push(plus_dm), atr)
+        minus_di = 100 * _divide(c["minus_dm"].push(minus_dm), atr)
+        dx = 100 * _divide(abs(plus_di - minus_di), plus_di + minus_di)
+        s = self.suffix
+        return {f"PDI{s}": plus_di, f"MDI{s}": minus_di, f"ADX{s}": c["adx"].push(dx)}
+
+
+# 与technical_analysis.INDICATORS中的指标一一对应
+STREAMING_INDICATORS = {
+    "MA": _StreamingMA,
+    "MACD": _StreamingMACD,
+    "RSI": _StreamingRSI,
+    "BB": _StreamingBB,
+    "KDJ": _StreamingKDJ,
+    "VOLUME_MA": _StreamingVolumeMA,
+    "ATR": _StreamingATR,
+    "OBV": _StreamingOBV,
+    "ADX": _StreamingADX,
+}
+
+
+class StreamingIndicators:
+    """技术指标的增量计算器
+
+    每根新K线调用update()，盘中最后一根K线变化时调用revise_last()，两者都是O(1)，
+    结果与technical_analysis.compute_indicators对同一序列的最后一行一致。
+    状态可以通过to_state()/from_state()保存和恢复。
+    """
+
+    def __init__(self, indicators: List[Any] = None):
+        """
+        Args:
+            indicators: 指标请求列表，格式见technical_analysis.parse_indicator_spec，
+                默认与calculate_all_indicators相同
+        """
+        self.indicators = list(indicators or DEFAULT_INDICATORS)
+        self._calculators: List[_StreamingIndicator] = []
+        for spec in self.indicators:
+            indicator, params = parse_indicator_spec(spec)
+            calculator_class = STREAMING_INDICATORS[indicator.name.upper()]
+            self._calculators.append(calculator_class(indicator.suffix(params), **params))
+        self.count = 0
+        self.last: Dict[str, float] = {}
+
+    def update(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        """追加一根新K线
+
+        Args:
+            bar: 包含open/high/low/close/volume的K线
+
+        Returns:
+            最新一根K线的指标值
+        """
+        bar = {key: float(bar[key]) for key in ("high", "low", "close", "volume")}
+        result = {}
+        for calculator in self._calculators:
+            result.update(calculator.update(bar))
+        self.count += 1
+        self.last = result
+        return result
+
+    def revise_last(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        """用新的数据替换最后一根K线（例如盘中最新价变化）
+
+        Args:
+            bar: 包含open/high/low/close/volume的K线
+
+        Returns:
+            修正后最后一根K线的指标值
+        """
+        if self.count == 0:
+            raise ValueError("还没有K线，无法修正最后一根")
+        for calculator in self._calculators:
+            calculator.undo()
+        self.count -= 1
+        return self.update(bar)
+
+    def to_state(self) -> Dict[str, Any]:
+        """导出可JSON序列化的状态"""
+        return {
+            "indicators": self.indicators,
+            "count": self.count,
+            "last": self.last,
+            "calculators": [calculator.to_state() for calculator in self._calculators],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "StreamingIndicators":
+        """从to_state()导出的状态恢复"""
+        streaming = cls(state["indicators"])
+        for calculator, calculator_state in zip(streaming._calculators, state["calculators"]):
+            calculator.load_state(calculator_state)
+        streaming.count = state["count"]
+        streaming.last = state["last"]
+        return streaming
+
+    @classmethod
+    def from_history(cls, data: pd.DataFrame, indicators: List[Any] = None) -> "StreamingIndicators":
+        """用历史K线预热
+
+        Args:
+            data: 包含OHLCV数据的DataFrame
+            indicators: 指标请求列表
+
+        Returns:
+            预热完成的增量计算器
+        """
+        streaming = cls(indicators)
+        for bar in data[["high", "low", "close", "volume"]].to_dict(orient="records"):
+            streaming.update(bar)
+        return streaming
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Any, List, Tuple
 
 def calculate_ma(data: pd.DataFrame, periods: List[int] = [5, 10, 20, 60]) -> pd.DataFrame:
     """计算移动平均线
@@ -110,6 +111,356 @@ def calculate_volume_ma(data: pd.DataFrame, periods: List[int] = [5, 10, 20]) ->
         df[f'Volume_MA{period}'] = df['volume'].rolling(window=period).mean()
     return df
 
+class IndicatorContext:
+    """指标计算上下文
+
+    OHLCV列只读取一次为连续的NumPy数组。滚动均值、EMA、滚动最高/最低价等中间结果
+    都按(运算, 输入, 参数)记忆化，被多个指标共用时只计算一次；只有被请求的指标
+    用到的中间结果才会被计算。
+
+    所有运算都沿第0维（时间）进行，因此既可以是单个合约的一维序列，
+    也可以是(时间 × 合约)的二维面板。
+    """
+
+    def __init__(self, data: Any, dtype: Any = np.float64, valid: np.ndarray = None):
+        """
+        Args:
+            data: 包含OHLCV数据的DataFrame，或{列名: 数组}的面板
+            dtype: 数值类型
+            valid: 与数据同形状的布尔数组，标记该位置是否有K线，默认全部有效
+        """
+        self.data = data
+        self.dtype = dtype
+        self.n = len(data) if isinstance(data, pd.DataFrame) else len(next(iter(data.values())))
+        self._memo: Dict[Any, np.ndarray] = {}
+        self._valid = valid
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.series('close').shape if 'close' in self.data else (self.n,)
+
+    @property
+    def valid(self) -> Any:
+        """K线是否存在的掩码；单个合约时为True"""
+        return True if self._valid is None else self._valid
+
+    def empty(self) -> np.ndarray:
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def _cached(self, key: Any, compute) -> np.ndarray:
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def series(self, name: str) -> np.ndarray:
+        """读取原始列或已登记的派生序列"""
+        return self._cached(name, lambda: np.ascontiguousarray(self.data[name], dtype=self.dtype))
+
+    def derive(self, name: str, compute) -> np.ndarray:
+        """登记派生序列，之后可以作为其它运算的输入"""
+        return self._cached(name, compute)
+
+    def diff(self, source: str) -> np.ndarray:
+        """一阶差分，第一个值为NaN"""
+        def compute():
+            values = self.series(source)
+            out = self.empty()
+            out[:1] = np.nan
+            np.subtract(values[1:], values[:-1], out=out[1:])
+            return out
+        return self._cached(("diff", source), compute)
+
+    def _rolling(self, op: str, source: str, window: int, func, **kwargs) -> np.ndarray:
+        # 窗口不满或包含NaN的位置为NaN，与pandas的rolling一致
+        def compute():
+            values = self.series(source)
+            out = self.empty()
+            out[:window - 1] = np.nan
+            if self.n >= window:
+                func(sliding_window_view(values, window, axis=0), axis=-1, out=out[window - 1:], **kwargs)
+            return out
+        return self._cached((op, source, window), compute)
+
+    def sma(self, source: str, window: int) -> np.ndarray:
+        """滚动均值"""
+        return self._rolling("sma", source, window, np.mean)
+
+    def rolling_std(self, source: str, window: int) -> np.ndarray:
+        """滚动样本标准差"""
+        return self._rolling("std", source, window, np.std, ddof=1)
+
+    def rolling_min(self, source: str, window: int) -> np.ndarray:
+        """滚动最小值"""
+        return self._rolling("min", source, window, np.min)
+
+    def rolling_max(self, source: str, window: int) -> np.ndarray:
+        """滚动最大值"""
+        return self._rolling("max", source, window, np.max)
+
+    def ema(self, source: str, span: int = None, alpha: float = None, min_periods: int = 0) -> np.ndarray:
+        """指数加权平均（adjust=False），与pandas的ewm一致"""
+        def compute():
+            values = self.series(source)
+            values = pd.Series(values, copy=False) if values.ndim == 1 else pd.DataFrame(values, copy=False)
+            ewm = values.ewm(span=span, alpha=alpha, adjust=False, min_periods=min_periods)
+            return ewm.mean().to_numpy(dtype=self.dtype)
+        return self._cached(("ema", source, span, alpha, min_periods), compute)
+
+
+def _is_positive_int(value: Any) -> bool:
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.integer, np.floating)):
+        return False
+    return bool(np.isfinite(value)) and float(value).is_integer() and value > 0
+
+
+class IndicatorSpec:
+    """已注册的技术指标"""
+
+    def __init__(
+        self,
+        name: str,
+        func,
+        inputs: List[str],
+        defaults: Dict[str, Any],
+        warmup,
+        description: str,
+        windows: List[str] = None
+    ):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.defaults = defaults
+        self.warmup = warmup
+        self.description = description
+        self.windows = list(defaults) if windows is None else windows
+
+    def resolve_params(self, args: List[Any] = None, kwargs: Dict[str, Any] = None) -> Dict[str, Any]:
+        """合并默认参数、位置参数和关键字参数
+
+        唯一参数为列表（如MA的periods）时，所有位置参数都归入该列表。
+        周期类参数必须为正整数，否则抛出ValueError。
+        """
+        params = {key: list(value) if isinstance(value, list) else value for key, value in self.defaults.items()}
+        if args:
+            keys = list(self.defaults)
+            if len(keys) == 1 and isinstance(self.defaults[keys[0]], list):
+                params[keys[0]] = list(args)
+            else:
+                if len(args) > len(keys):
+                    raise ValueError(f"{self.name}最多接受{len(keys)}个参数")
+                params.update(zip(keys, args))
+        for key, value in (kwargs or {}).items():
+            if key not in self.defaults:
+                raise ValueError(f"{self.name}不支持参数{key}")
+            params[key] = value
+        for key in self.windows:
+            values = params[key] if isinstance(params[key], list) else [params[key]]
+            if not values or not all(_is_positive_int(value) for value in values):
+                raise ValueError(f"{self.name}的参数必须为正整数")
+            values = [int(value) for value in values]
+            params[key] = values if isinstance(params[key], list) else values[0]
+        return params
+
+    def suffix(self, params: Dict[str, Any]) -> str:
+        """非默认参数时追加到列名后的后缀，默认参数保持原有列名"""
+        if params == self.defaults:
+            return ""
+        return "_" + "_".join(str(params[key]) for key in self.defaults)
+
+
+# 技术指标注册表
+INDICATORS: Dict[str, IndicatorSpec] = {}
+
+def register_indicator(
+    name: str,
+    inputs: List[str],
+    defaults: Dict[str, Any],
+    warmup,
+    description: str = "",
+    windows: List[str] = None
+):
+    """注册技术指标
+
+    Args:
+        name: 指标名称
+        inputs: 需要的原始列
+        defaults: 默认参数
+        warmup: 根据参数返回预热所需K线数的函数
+        description: 指标说明
+        windows: 周期类参数名，必须为正整数，默认全部参数
+
+    Returns:
+        装饰器，被装饰函数签名为func(ctx, **params)，返回{列名: 数组}
+    """
+    def decorator(func):
+        INDICATORS[name.upper()] = IndicatorSpec(name, func, inputs, defaults, warmup, description, windows)
+        return func
+    return decorator
+
+@register_indicator("MA", ["close"], {"periods": [5, 10, 20, 60]}, lambda p: max(p["periods"]), "收盘价移动平均线")
+def _ma(ctx: IndicatorContext, periods: List[int]) -> Dict[str, np.ndarray]:
+    return {f'MA{period}': ctx.sma('close', period) for period in periods}
+
+@register_indicator("MACD", ["close"], {"fast": 12, "slow": 26, "signal": 9}, lambda p: 3 * p["slow"] + p["signal"], "MACD")
+def _macd(ctx: IndicatorContext, fast: int, slow: int, signal: int) -> Dict[str, np.ndarray]:
+    line = f"macd:{fast},{slow}"
+    macd = ctx.derive(line, lambda: ctx.ema('close', span=fast) - ctx.ema('close', span=slow))
+    signal_line = ctx.ema(line, span=signal)
+    suffix = INDICATORS["MACD"].suffix({"fast": fast, "slow": slow, "signal": signal})
+    return {f'MACD{suffix}': macd, f'Signal{suffix}': signal_line, f'MACD_Hist{suffix}': macd - signal_line}
+
+@register_indicator("RSI", ["close"], {"period": 14}, lambda p: p["period"] + 1, "相对强弱指标")
+def _rsi(ctx: IndicatorContext, period: int) -> Dict[str, np.ndarray]:
+    # 第一个差分为NaN，按0计入涨跌幅
+    # 没有K线的位置（面板中尚未上市的合约）不计入
+    delta = ctx.diff('close')
+    ctx.derive("gain", lambda: np.where(ctx.valid, np.where(delta > 0, delta, 0), np.nan).astype(ctx.dtype))
+    ctx.derive("loss", lambda: np.where(ctx.valid, np.where(delta < 0, -delta, 0), np.nan).astype(ctx.dtype))
+    gain = ctx.sma("gain", period)
+    loss = ctx.sma("loss", period)
+    suffix = INDICATORS["RSI"].suffix({"period": period})
+    return {f'RSI{suffix}': 100 - (100 / (1 + gain / loss))}
+
+@register_indicator("BB", ["close"], {"period": 20, "std": 2}, lambda p: p["period"], "布林带", windows=["period"])
+def _bollinger_bands(ctx: IndicatorContext, period: int, std: float) -> Dict[str, np.ndarray]:
+    middle = ctx.sma('close', period)
+    deviation = ctx.rolling_std('close', period)
+    suffix = INDICATORS["BB"].suffix({"period": period, "std": std})
+    return {
+        f'BB_Middle{suffix}': middle,
+        f'BB_Std{suffix}': deviation,
+        f'BB_Upper{suffix}': middle + deviation * std,
+        f'BB_Lower{suffix}': middle - deviation * std,
+    }
+
+@register_indicator("KDJ", ["high", "low", "close"], {"n": 9, "m1": 3, "m2": 3}, lambda p: p["n"] + 3 * (p["m1"] + p["m2"]), "随机指标")
+def _kdj(ctx: IndicatorContext, n: int, m1: int, m2: int) -> Dict[str, np.ndarray]:
+    rsv = f"rsv:{n}"
+    ctx.derive(rsv, lambda: (ctx.series('close') - ctx.rolling_min('low', n))
+               / (ctx.rolling_max('high', n) - ctx.rolling_min('low', n)) * 100)
+    k_line = f"kdj_k:{n},{m1}"
+    k = ctx.derive(k_line, lambda: ctx.ema(rsv, alpha=1 / m1))
+    d = ctx.ema(k_line, alpha=1 / m2)
+    suffix = INDICATORS["KDJ"].suffix({"n": n, "m1": m1, "m2": m2})
+    return {f'K{suffix}': k, f'D{suffix}': d, f'J{suffix}': 3 * k - 2 * d}
+
+@register_indicator("VOLUME_MA", ["volume"], {"periods": [5, 10, 20]}, lambda p: max(p["periods"]), "成交量移动平均")
+def _volume_ma(ctx: IndicatorContext, periods: List[int]) -> Dict[str, np.ndarray]:
+    return {f'Volume_MA{period}': ctx.sma('volume', period) for period in periods}
+
+def _true_range(ctx: IndicatorContext) -> np.ndarray:
+    def compute():
+        high, low, close = ctx.series('high'), ctx.series('low'), ctx.series('close')
+        prev_close = np.full_like(close, np.nan)
+        prev_close[1:] = close[:-1]
+        return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return ctx.derive("true_range", compute)
+
+@register_indicator("ATR", ["high", "low", "close"], {"period": 14}, lambda p: 3 * p["period"], "平均真实波幅（Wilder平滑）")
+def _atr(ctx: IndicatorContext, period: int) -> Dict[str, np.ndarray]:
+    _true_range(ctx)
+    suffix = INDICATORS["ATR"].suffix({"period": period})
+    return {f'ATR{suffix}': ctx.ema("true_range", alpha=1 / period, min_periods=period)}
+
+@register_indicator("OBV", ["close", "volume"], {}, lambda p: 0, "能量潮")
+def _obv(ctx: IndicatorContext) -> Dict[str, np.ndarray]:
+    direction = np.nan_to_num(np.sign(ctx.diff('close')))
+    flow = np.where(ctx.valid, direction * ctx.series('volume'), 0)
+    return {'OBV': np.where(ctx.valid, np.cumsum(flow, axis=0), np.nan).astype(ctx.dtype)}
+
+@register_indicator("ADX", ["high", "low", "close"], {"period": 14}, lambda p: 6 * p["period"], "平均趋向指标")
+def _adx(ctx: IndicatorContext, period: int) -> Dict[str, np.ndarray]:
+    _true_range(ctx)
+    up = ctx.diff('high')
+    down = -ctx.diff('low')
+    ctx.derive("plus_dm", lambda: np.where(ctx.valid, np.where((up > down) & (up > 0), up, 0), np.nan).astype(ctx.dtype))
+    ctx.derive("minus_dm", lambda: np.where(ctx.valid, np.where((down > up) & (down > 0), down, 0), np.nan).astype(ctx.dtype))
+    atr = ctx.ema("true_range", alpha=1 / period, min_periods=period)
+    plus_di = 100 * ctx.ema("plus_dm", alpha=1 / period, min_periods=period) / atr
+    minus_di = 100 * ctx.ema("minus_dm", alpha=1 / period, min_periods=period) / atr
+    dx = f"dx:{period}"
+    ctx.derive(dx, lambda: 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di))
+    suffix = INDICATORS["ADX"].suffix({"period": period})
+    return {
+        f'PDI{suffix}': plus_di,
+        f'MDI{suffix}': minus_di,
+        f'ADX{suffix}': ctx.ema(dx, alpha=1 / period, min_periods=period),
+    }
+
+# calculate_all_indicators计算的指标，列顺序与逐个调用calculate_*函数的结果一致
+DEFAULT_INDICATORS = ["MA", "MACD", "RSI", "BB", "KDJ", "VOLUME_MA"]
+
+def parse_indicator_spec(spec: Any) -> Tuple[IndicatorSpec, Dict[str, Any]]:
+    """解析指标请求
+
+    支持 "RSI"、"RSI:6"、"MA:5,30"、"MACD:6,13,5" 形式的字符串，
+    以及 {"name": "BB", "period": 10} 形式的字典。
+
+    Args:
+        spec: 指标请求
+
+    Returns:
+        (指标, 参数)
+    """
+    if isinstance(spec, dict):
+        kwargs = dict(spec)
+        name = str(kwargs.pop("name"))
+        args = []
+    else:
+        name, _, raw_args = str(spec).partition(":")
+        try:
+            args = [float(value) if "." in value else int(value) for value in raw_args.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"{name.strip()}的参数必须为数字: {raw_args}") from None
+        kwargs = {}
+    indicator = INDICATORS.get(name.strip().upper())
+    if indicator is None:
+        raise ValueError(f"未知的技术指标: {name}，可选: {', '.join(INDICATORS)}")
+    return indicator, indicator.resolve_params(args, kwargs)
+
+def warmup_bars(indicators: List[Any] = None) -> int:
+    """所请求指标中最长的预热K线数，预热期内的值尚未收敛或为NaN
+
+    Args:
+        indicators: 指标请求列表，格式见parse_indicator_spec，默认与calculate_all_indicators相同
+
+    Returns:
+        K线根数
+    """
+    bars = 0
+    for spec in indicators or DEFAULT_INDICATORS:
+        indicator, params = parse_indicator_spec(spec)
+        bars = max(bars, int(indicator.warmup(params)))
+    return bars
+
+def compute_indicators(data: pd.DataFrame, indicators: List[Any] = None, dtype: Any = np.float64) -> pd.DataFrame:
+    """按需计算技术指标
+
+    只计算请求的指标及其依赖的中间结果，共享的中间结果（如MA20与布林带中轨）只计算一次，
+    结果写入一个预分配的二维数组后一次性拼接成DataFrame。
+
+    Args:
+        data: 包含OHLCV数据的DataFrame
+        indicators: 指标请求列表，格式见parse_indicator_spec，默认与calculate_all_indicators相同
+        dtype: 指标的数值类型，可选np.float32以节省内存
+
+    Returns:
+        添加了所请求技术指标的DataFrame
+    """
+    ctx = IndicatorContext(data, dtype)
+    columns: Dict[str, np.ndarray] = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for spec in indicators or DEFAULT_INDICATORS:
+            indicator, params = parse_indicator_spec(spec)
+            columns.update(indicator.func(ctx, **params))
+
+    result = np.empty((ctx.n, len(columns)), dtype=dtype, order='F')
+    for i, values in enumerate(columns.values()):
+        result[:, i] = values
+    frame = pd.DataFrame(result, index=data.index, columns=list(columns), copy=False)
+    base = data.drop(columns=[c for c in columns if c in data.columns])
+    return pd.concat([base, frame], axis=1)
+
 def calculate_all_indicators(data: pd.DataFrame) -> pd.DataFrame:
     """计算所有技术指标
     
@@ -119,11 +470,4 @@ def calculate_all_indicators(data: pd.DataFrame) -> pd.DataFrame:
     Returns:
         添加了所有技术指标的DataFrame
     """
-    df = data.copy()
-    df = calculate_ma(df)
-    df = calculate_macd(df)
-    df = calculate_rsi(df)
-    df = calculate_bollinger_bands(df)
-    df = calculate_kdj(df)
-    df = calculate_volume_ma(df)
-    return df 
\ No newline at end of file
+    return compute_indicators(data)
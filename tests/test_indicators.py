@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from technical_analysis import (
+    calculate_bollinger_bands,
+    calculate_kdj,
+    calculate_ma,
+    calculate_macd,
+    calculate_rsi,
+    calculate_volume_ma,
+    compute_indicators,
+    parse_indicator_spec,
+)
+
+# (dtype, rtol, atol)
+TOLERANCES = [(np.float64, 1e-9, 1e-9), (np.float32, 1e-3, 1e-2)]
+
+
+def make_ohlcv(rows: int, seed: int = 0, flat: slice = None) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 20, rows))
+    high = close + np.abs(rng.normal(0, 10, rows))
+    low = close - np.abs(rng.normal(0, 10, rows))
+    if flat is not None:
+        # 停板行情：最高价等于最低价，涨跌为零
+        close[flat] = high[flat] = low[flat] = close[flat][0]
+    return pd.DataFrame({
+        "date": pd.bdate_range("2024-01-02", periods=rows),
+        "open": close + rng.normal(0, 5, rows),
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": rng.integers(1000, 50000, rows).astype(float),
+    })
+
+
+def reference_indicators(data: pd.DataFrame) -> pd.DataFrame:
+    # 逐个调用calculate_*函数的原始实现
+    df = calculate_ma(data)
+    df = calculate_macd(df)
+    df = calculate_rsi(df)
+    df = calculate_bollinger_bands(df)
+    df = calculate_kdj(df)
+    return calculate_volume_ma(df)
+
+
+def assert_equivalent(data: pd.DataFrame, dtype, rtol: float, atol: float) -> None:
+    expected = reference_indicators(data)
+    actual = compute_indicators(data, dtype=dtype)
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns.difference(data.columns):
+        assert actual[column].dtype == dtype, column
+        np.testing.assert_allclose(
+            actual[column].to_numpy(dtype=np.float64), expected[column].to_numpy(dtype=np.float64),
+            rtol=rtol, atol=atol, equal_nan=True, err_msg=f"{np.dtype(dtype).name} {column}"
+        )
+
+
+@pytest.mark.parametrize("dtype, rtol, atol", TOLERANCES)
+def test_matches_reference(dtype, rtol, atol):
+    assert_equivalent(make_ohlcv(500), dtype, rtol, atol)
+
+
+@pytest.mark.parametrize("dtype, rtol, atol", TOLERANCES)
+def test_limit_locked_segment(dtype, rtol, atol):
+    # 连续停板超过KDJ和RSI的窗口，最高最低价区间和涨跌幅都为零
+    data = make_ohlcv(200, flat=slice(100, 130))
+    assert_equivalent(data, dtype, rtol, atol)
+    actual = compute_indicators(data, dtype=dtype)
+    assert actual["RSI"].iloc[125:130].isna().all()
+    assert actual["BB_Std"].iloc[125:130].abs().max() < atol
+
+
+@pytest.mark.parametrize("dtype, rtol, atol", TOLERANCES)
+def test_flat_series(dtype, rtol, atol):
+    assert_equivalent(make_ohlcv(80, flat=slice(0, 80)), dtype, rtol, atol)
+
+
+@pytest.mark.parametrize("rows", [1, 8, 25, 59])
+@pytest.mark.parametrize("dtype, rtol, atol", TOLERANCES)
+def test_short_series(rows, dtype, rtol, atol):
+    # K线数少于最长的窗口（MA60）
+    data = make_ohlcv(rows)
+    assert_equivalent(data, dtype, rtol, atol)
+    assert compute_indicators(data, dtype=dtype)["MA60"].isna().all()
+
+
+@pytest.mark.parametrize("spec", ["MA:0", "MA:5.5", "MA:-3", "RSI:0", "KDJ:9,0,3", {"name": "BB", "period": 2.5}])
+def test_rejects_invalid_windows(spec):
+    with pytest.raises(ValueError, match="参数必须为正整数"):
+        parse_indicator_spec(spec)
+
+
+def test_window_params_are_integers():
+    assert parse_indicator_spec("MA:5.0,30")[1] == {"periods": [5, 30]}
+    # 布林带的标准差倍数不是周期，可以是小数
+    assert parse_indicator_spec("BB:10,2.5")[1] == {"period": 10, "std": 2.5}
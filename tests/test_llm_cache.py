@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pandas as pd
+
+from llm_cache import LLMCache, cache_key
+from prompt_builder import analysis_snapshot, price_band
+from technical_analysis import calculate_all_indicators
+
+NOW = datetime(2025, 3, 4, 10, 30)
+
+
+def make_history(end: str = "2025-03-03") -> pd.DataFrame:
+    dates = pd.bdate_range(end=end, periods=80)
+    close = pd.Series(range(len(dates)), dtype=float) % 7 + 3000
+    return pd.DataFrame({
+        "date": dates, "open": close - 2, "high": close + 5, "low": close - 5, "close": close, "volume": 1000.0,
+    })
+
+
+def make_quote(ticktime: str, trade: float) -> dict:
+    return {
+        "name": "豆粕2505", "symbol": "M2505", "trade": trade, "open": 3001.0, "high": trade + 3, "low": 2995.0,
+        "presettlement": 3000.0, "volume": 12345 + trade, "position": 54321.0, "ticktime": ticktime,
+    }
+
+
+def snapshot_key(quote: dict, history: pd.DataFrame) -> str:
+    snapshot = analysis_snapshot("豆粕", quote, history, calculate_all_indicators(history), None, now=NOW)
+    return cache_key("deepseek-chat", 0.7, snapshot)
+
+
+def test_same_bar_different_ticks_hit_cache(tmp_path):
+    cache = LLMCache(root=str(tmp_path), ttl=60, max_entries=10)
+    history = make_history()
+    first = snapshot_key(make_quote("10:15:01", 3010.0), history)
+    cache.set(first, {"analysis": "偏多"})
+
+    second = snapshot_key(make_quote("10:29:58", 3014.0), history)
+    assert second == first
+    assert cache.get(second)["analysis"] == "偏多"
+    assert cache.stats()["hits"] == 1
+
+
+def test_material_price_move_misses_cache(tmp_path):
+    cache = LLMCache(root=str(tmp_path), ttl=60, max_entries=10)
+    history = make_history()
+    cache.set(snapshot_key(make_quote("10:15:01", 3010.0), history), {"analysis": "偏多"})
+
+    # 涨停（+5%）后同一根K线上的请求重新分析
+    assert cache.get(snapshot_key(make_quote("10:29:58", 3150.0), history)) is None
+    assert cache.get(snapshot_key(make_quote("10:29:58", 3020.0), history)) is None
+
+
+def test_price_band():
+    assert price_band({"trade": 3010.0, "presettlement": 3000.0}, band=0.5) == "0%"
+    assert price_band({"trade": 3036.0, "presettlement": 3000.0}, band=0.5) == "1%"
+    assert price_band({"trade": 2990.0, "presettlement": 3000.0}, band=0.5) == "-0.5%"
+    assert price_band({"trade": 3150.0, "presettlement": 3000.0}, band=0.5) == "5%"
+    # 缺少昨结算价时相对参考价计算
+    assert price_band({"trade": 3150.0}, reference=3000.0, band=1) == "5%"
+    assert price_band({"trade": 3010.5, "presettlement": 3000.0}, band=0) == "3010.5"
+    assert price_band({"presettlement": 3000.0}) is None
+
+
+def test_unfinished_bar_is_ignored():
+    quote = make_quote("10:15:01", 3010.0)
+    history = make_history()
+    today = pd.DataFrame([{
+        "date": pd.Timestamp(NOW.date()), "open": 3001.0, "high": 3013.0, "low": 2995.0, "close": 3010.0, "volume": 500.0,
+    }])
+    assert snapshot_key(quote, pd.concat([history, today], ignore_index=True)) == snapshot_key(quote, history)
+
+
+def test_new_completed_bar_changes_key():
+    quote = make_quote("10:15:01", 3010.0)
+    assert snapshot_key(quote, make_history("2025-03-03")) != snapshot_key(quote, make_history("2025-02-28"))
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from ohlcv_store import OHLCVStore, normalize_date
+
+DATES = pd.bdate_range("2024-01-02", "2024-06-28")
+
+
+class FakeUpstream:
+    """按区间返回日线的假上游，empty为True时返回空结果"""
+
+    def __init__(self):
+        self.calls = []
+        self.empty = False
+
+    def __call__(self, contract, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        if self.empty:
+            return pd.DataFrame()
+        dates = DATES[(DATES >= pd.Timestamp(start_date)) & (DATES <= pd.Timestamp(end_date))]
+        return pd.DataFrame({"date": dates, "close": 3000.0})
+
+
+def test_normalize_date():
+    assert normalize_date("2025-01-01") == "20250101"
+    assert normalize_date("20250101") == "20250101"
+    with pytest.raises(ValueError):
+        normalize_date("2025/01/01")
+
+
+def test_dashed_dates_do_not_corrupt_manifest(tmp_path):
+    store, upstream = OHLCVStore(str(tmp_path)), FakeUpstream()
+    store.get_daily("M0", "20240301", "20240329", upstream)
+    df = store.get_daily("M0", "2024-01-02", "2024-03-29", upstream)
+    assert df["date"].min() == pd.Timestamp("2024-01-02")
+    assert store.coverage("M0") == ("20240102", "20240329")
+    with pytest.raises(ValueError):
+        store.get_daily("M0", "2024.01.02", "20240329", upstream)
+    assert store.coverage("M0") == ("20240102", "20240329")
+
+
+def test_empty_tail_is_not_covered(tmp_path):
+    store, upstream = OHLCVStore(str(tmp_path)), FakeUpstream()
+    store.get_daily("M0", "20240102", "20240329", upstream)
+    upstream.empty = True
+    store.get_daily("M0", "20240102", "20240628", upstream)
+    assert store.coverage("M0") == ("20240102", "20240329")
+
+    upstream.empty = False
+    upstream.calls.clear()
+    df = store.get_daily("M0", "20240102", "20240628", upstream)
+    assert upstream.calls == [("20240330", "20240628")]
+    assert df["date"].max() == pd.Timestamp("2024-06-28")
+
+
+def test_coverage_ends_at_last_returned_date(tmp_path):
+    store, upstream = OHLCVStore(str(tmp_path)), FakeUpstream()
+    # 2024-06-29/30是周末，覆盖区间只到上游返回的最后一个交易日
+    store.get_daily("M0", "20240102", "20240630", upstream)
+    assert store.coverage("M0") == ("20240102", "20240628")
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from prompt_builder import _fmt, format_bars
+
+
+def test_fmt_keeps_integer_zeros():
+    assert _fmt(1000.0, 0) == "1000"
+    assert _fmt(250.0, 0) == "250"
+    assert _fmt(50.0, 0) == "50"
+
+
+def test_fmt_strips_fraction_zeros():
+    assert _fmt(0.0, 2) == "0"
+    assert _fmt(-0.001, 2) == "0"
+    assert _fmt(3050.50, 2) == "3050.5"
+    assert _fmt(3050.0, 2) == "3050"
+
+
+def test_format_bars_volume():
+    history = pd.DataFrame({
+        "date": pd.to_datetime(["2025-01-02"]),
+        "open": [3000.0], "high": [3010.0], "low": [2990.0], "close": [3005.0], "volume": [1000.0],
+    })
+    assert format_bars(history, 1).splitlines()[1] == "01-02,3000,3010,2990,3005,1000"